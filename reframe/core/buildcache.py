@@ -0,0 +1,207 @@
+# Copyright 2016-2020 Swiss National Supercomputing Centre (CSCS/ETH Zurich)
+# ReFrame Project Developers. See the top-level LICENSE file for details.
+#
+# SPDX-License-Identifier: BSD-3-Clause
+
+#
+# Content-addressed cache of build directories
+#
+
+import hashlib
+import json
+import os
+import shutil
+
+import reframe.utility.os_ext as os_ext
+from reframe.core.logging import getlogger
+
+
+class BuildCache:
+    '''A content-addressed cache of the stage directories of built tests.
+
+    Each cache entry is a copy of the stage directory of a test after a
+    successful build. Entries are keyed by the name of the test, the location
+    and the contents of its staged sources, including the targets of any
+    symbolic links, the build commands and the modules and variables of its
+    build environments. The location is part of the key, since builds often
+    record absolute paths.
+
+    :arg prefix: The directory where the cache entries are stored.
+    :arg max_size: The maximum size of the cache in bytes.
+        If adding a new entry makes the cache exceed this size, the least
+        recently used entries are evicted.
+        If :class:`None`, the cache size is unlimited.
+    '''
+
+    def __init__(self, prefix, max_size=None):
+        self._prefix = os.path.abspath(prefix)
+        self._max_size = max_size
+
+    @property
+    def prefix(self):
+        return self._prefix
+
+    @property
+    def max_size(self):
+        return self._max_size
+
+    def _entry_path(self, key):
+        return os.path.join(self._prefix, key)
+
+    def _info_path(self, key):
+        return os.path.join(self._prefix, key + '.json')
+
+    def key(self, name, stagedir, build_commands, environs):
+        '''Compute the key of a build.
+
+        :arg name: The name of the test.
+        :arg stagedir: The stage directory of the test containing only the
+            staged sources.
+        :arg build_commands: The list of build commands.
+        :arg environs: The list of environments the build is performed with.
+        '''
+        h = hashlib.sha256()
+
+        def _update(*items):
+            for item in items:
+                h.update(str(item).encode())
+                h.update(b'\0')
+
+        _update(name, os.path.abspath(stagedir))
+        for dirpath, dirnames, filenames in os.walk(stagedir):
+            # Walk the tree in a deterministic order
+            dirnames.sort()
+            for f in sorted(dirnames + filenames):
+                path = os.path.join(dirpath, f)
+                if os.path.islink(path):
+                    # Links to the sources are resolved by the build
+                    _update(os.path.relpath(path, stagedir),
+                            os.readlink(path))
+
+                if f in dirnames or not os.path.isfile(path):
+                    continue
+
+                _update(os.path.relpath(path, stagedir))
+                with open(path, 'rb') as fp:
+                    for chunk in iter(lambda: fp.read(1 << 20), b''):
+                        h.update(chunk)
+
+        _update(*build_commands)
+        for e in environs:
+            _update(e.name, *e.modules)
+            _update(*('%s=%s' % v for v in e.variables.items()))
+
+        return h.hexdigest()
+
+    def restore(self, key, stagedir):
+        '''Restore the stage directory of the build ``key``.
+
+        :returns: :class:`True` if the build was found in the cache,
+            :class:`False` otherwise.
+        '''
+        entry = self._entry_path(key)
+        if not os.path.isdir(entry):
+            return False
+
+        # Copy to a temporary directory next to the stage directory first and
+        # swap them only when the copy is complete, so that the stage
+        # directory is left intact if anything fails
+        stagedir = os.path.abspath(stagedir)
+        tmpdir = '%s.restore%s' % (stagedir, os.getpid())
+        olddir = '%s.old%s' % (stagedir, os.getpid())
+        try:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+            shutil.copytree(entry, tmpdir, symlinks=True)
+            if os.path.exists(stagedir):
+                os.rename(stagedir, olddir)
+
+            try:
+                os.rename(tmpdir, stagedir)
+            except OSError:
+                if os.path.exists(olddir):
+                    os.rename(olddir, stagedir)
+
+                raise
+
+            # Mark the entry as recently used
+            os.utime(self._info_path(key))
+        except OSError as e:
+            getlogger().debug('could not restore build %s from cache: %s' %
+                              (key, e))
+            return False
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+            shutil.rmtree(olddir, ignore_errors=True)
+
+        return True
+
+    def store(self, key, stagedir):
+        '''Store the stage directory of the build ``key`` in the cache.'''
+        size = _dirsize(stagedir)
+        if self._max_size is not None and size > self._max_size:
+            getlogger().debug('build %s is too large to be cached' % key)
+            return
+
+        entry = self._entry_path(key)
+        if os.path.exists(entry):
+            return
+
+        # Copy to a temporary directory first, so that a partially copied
+        # entry is never visible in the cache
+        tmpdir = '%s.tmp%s' % (entry, os.getpid())
+        try:
+            os.makedirs(self._prefix, exist_ok=True)
+            os_ext.copytree(os.path.abspath(stagedir), tmpdir, symlinks=True)
+            with open(self._info_path(key), 'w') as fp:
+                json.dump({'size': size}, fp)
+
+            os.rename(tmpdir, entry)
+        except OSError as e:
+            getlogger().debug('could not store build %s in cache: %s' %
+                              (key, e))
+            shutil.rmtree(tmpdir, ignore_errors=True)
+            return
+
+        self._evict()
+
+    def _evict(self):
+        if self._max_size is None:
+            return
+
+        entries = []
+        total_size = 0
+        for f in os.listdir(self._prefix):
+            key, ext = os.path.splitext(f)
+            if ext != '.json' or not os.path.isdir(self._entry_path(key)):
+                continue
+
+            try:
+                with open(self._info_path(key)) as fp:
+                    size = json.load(fp)['size']
+
+                entries.append((os.path.getmtime(self._info_path(key)),
+                                key, size))
+            except (OSError, ValueError, KeyError):
+                continue
+
+            total_size += size
+
+        # Evict the least recently used entries first
+        entries.sort()
+        for _, key, size in entries:
+            if total_size <= self._max_size:
+                break
+
+            getlogger().debug('evicting build %s from cache' % key)
+            shutil.rmtree(self._entry_path(key), ignore_errors=True)
+            os_ext.force_remove_file(self._info_path(key))
+            total_size -= size
+
+
+def _dirsize(path):
+    ret = 0
+    for dirpath, _, filenames in os.walk(path):
+        for f in filenames:
+            ret += os.lstat(os.path.join(dirpath, f)).st_size
+
+    return ret
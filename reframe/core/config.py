@@ -200,6 +200,9 @@ class SiteConfiguration:
                 part_access = partconfig.get('access', [])
                 part_resources = partconfig.get('resources', {})
                 part_max_jobs = partconfig.get('max_jobs', 1)
+                part_max_nodes = partconfig.get('max_nodes', None)
+                part_max_tasks = partconfig.get('max_tasks', None)
+                part_max_gpus = partconfig.get('max_gpus', None)
                 part = SystemPartition(name=part_name,
                                        descr=part_descr,
                                        scheduler=part_scheduler,
@@ -208,7 +211,10 @@ class SiteConfiguration:
                                        environs=part_environs,
                                        resources=part_resources,
                                        local_env=part_local_env,
-                                       max_jobs=part_max_jobs)
+                                       max_jobs=part_max_jobs,
+                                       max_nodes=part_max_nodes,
+                                       max_tasks=part_max_tasks,
+                                       max_gpus=part_max_gpus)
 
                 container_platforms = partconfig.get('container_platforms', {})
                 for cp, env_spec in container_platforms.items():
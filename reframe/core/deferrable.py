@@ -4,11 +4,20 @@
 # SPDX-License-Identifier: BSD-3-Clause
 
 import builtins
+import collections.abc
+import contextlib
 import functools
+import itertools
+import threading
 
 from reframe.core.exceptions import user_deprecation_warning
 
 
+# The results of the expressions evaluated by the current thread; it is set
+# only while an evaluation or an evaluation session is in progress
+_thread_context = threading.local()
+
+
 def deferrable(func):
     '''Function decorator for converting a function to a deferred
     expression.'''
@@ -45,21 +54,12 @@ class _DeferredExpression:
         self._kwargs = kwargs
 
     def evaluate(self):
-        fn_args = []
-        for arg in self._args:
-            fn_args.append(
-                arg.evaluate() if isinstance(arg, type(self)) else arg)
-
-        fn_kwargs = {}
-        for k, v in self._kwargs.items():
-            fn_kwargs[k] = (
-                v.evaluate() if isinstance(v, type(self)) else v)
-
-        ret = self._fn(*fn_args, **fn_kwargs)
-        if isinstance(ret, type(self)):
-            return ret.evaluate()
-        else:
-            return ret
+        memo = getattr(_thread_context, 'memo', None)
+        if memo is not None:
+            return _evaluate(self, memo)
+
+        with evaluation_session():
+            return _evaluate(self, _thread_context.memo)
 
     def __bool__(self):
         '''The truthy value of a deferred expression.
@@ -340,6 +340,112 @@ class _DeferredExpression:
         return ~a
 
 
+@contextlib.contextmanager
+def evaluation_session(memo=None):
+    '''Evaluate each deferred expression at most once inside this context.
+
+    The results of the deferred expressions evaluated by the current thread
+    inside this context are stored in the dictionary ``memo`` and they are
+    reused whenever the same expression is evaluated again, either directly or
+    as part of another expression.
+    Expressions that evaluate to iterators, such as generators, are always
+    evaluated again, since their result may only be consumed once.
+    Passing the same ``memo`` to different sessions extends the session over
+    them.
+
+    Outside an evaluation session, each evaluation of a deferred expression
+    is a session of its own.
+    '''
+    orig_memo = getattr(_thread_context, 'memo', None)
+    _thread_context.memo = {} if memo is None else memo
+    try:
+        yield
+    finally:
+        _thread_context.memo = orig_memo
+
+
+# Pending actions of the expressions during their evaluation
+_EXPAND, _CALL, _RESOLVE = range(3)
+
+
+def _evaluate(expr, memo):
+    '''Evaluate ``expr`` iteratively, so that arbitrarily deep expressions
+    do not exhaust the interpreter stack.
+
+    The results of the subexpressions are looked up in and stored to
+    ``memo``, which is keyed by the identity of the expressions.
+    The expressions themselves are stored along with their results, so that
+    their identity may not be reused while ``memo`` is alive.
+    '''
+    # Results of the subexpressions that may not be memoized; they are
+    # consumed by the first expression that uses them
+    transient = {}
+
+    def done(node):
+        key = id(node)
+        return ((key in memo and memo[key][0] is node) or
+                (key in transient and transient[key][0] is node))
+
+    def result(node):
+        if not isinstance(node, _DeferredExpression):
+            return node
+
+        key = id(node)
+        try:
+            cached, value = memo[key]
+            if cached is node:
+                return value
+        except KeyError:
+            pass
+
+        try:
+            cached, value = transient.pop(key)
+            if cached is node:
+                return value
+        except KeyError:
+            pass
+
+        # The result was consumed already; evaluate the node again
+        return _evaluate(node, memo)
+
+    def store(node, value):
+        if isinstance(value, collections.abc.Iterator):
+            transient[id(node)] = (node, value)
+        else:
+            memo[id(node)] = (node, value)
+
+    # Each entry of the stack is an expression and its pending action:
+    # `_EXPAND' pushes its arguments, `_CALL' calls its function and
+    # `_RESOLVE' stores the result of the expression returned by its function
+    stack = [(_EXPAND, expr, None)]
+    while stack:
+        action, node, ret = stack.pop()
+        if action == _EXPAND:
+            if done(node):
+                continue
+
+            stack.append((_CALL, node, None))
+            # Push the arguments in reverse, so that they are evaluated in
+            # order
+            args = itertools.chain(node._args, node._kwargs.values())
+            for arg in reversed(list(args)):
+                if isinstance(arg, _DeferredExpression) and not done(arg):
+                    stack.append((_EXPAND, arg, None))
+        elif action == _CALL:
+            fn_args = [result(arg) for arg in node._args]
+            fn_kwargs = {k: result(v) for k, v in node._kwargs.items()}
+            ret = node._fn(*fn_args, **fn_kwargs)
+            if isinstance(ret, _DeferredExpression):
+                stack.append((_RESOLVE, node, ret))
+                stack.append((_EXPAND, ret, None))
+            else:
+                store(node, ret)
+        else:
+            store(node, result(ret))
+
+    return result(expr)
+
+
 def evaluate(expr):
     user_deprecation_warning('evaluate() is deprecated: '
                              'please use reframe.utility.sanity.evaluate')
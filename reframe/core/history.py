@@ -0,0 +1,124 @@
+# Copyright 2016-2020 Swiss National Supercomputing Centre (CSCS/ETH Zurich)
+# ReFrame Project Developers. See the top-level LICENSE file for details.
+#
+# SPDX-License-Identifier: BSD-3-Clause
+
+#
+# Persistent history of the runtimes of the test cases
+#
+
+import os
+import sqlite3
+import time
+
+from reframe.core.exceptions import ReframeError
+
+
+class RuntimeHistory:
+    '''A persistent history of the time spent by test cases in their build,
+    queuing and run phases.
+
+    The history is stored in an SQLite database. Every run of a test case is
+    recorded separately and it is identified by the name of its check, the
+    full name of its partition and the name of its programming environment.
+
+    The history may be used as a context manager, in which case its database
+    is closed on exit.
+
+    :arg filename: The database file; it is created if it does not exist.
+    '''
+
+    #: The phases whose duration is recorded.
+    PHASES = ('build', 'queue', 'run')
+
+    def __init__(self, filename):
+        self._filename = filename
+        try:
+            dirname = os.path.dirname(filename)
+            if dirname:
+                os.makedirs(dirname, exist_ok=True)
+
+            self._conn = sqlite3.connect(filename)
+            with self._conn:
+                self._conn.execute(
+                    'CREATE TABLE IF NOT EXISTS runs ('
+                    'check_name TEXT NOT NULL, '
+                    'partition TEXT NOT NULL, '
+                    'environ TEXT NOT NULL, '
+                    'timestamp REAL NOT NULL, '
+                    'build REAL, queue REAL, run REAL)'
+                )
+                self._conn.execute(
+                    'CREATE INDEX IF NOT EXISTS runs_by_case ON runs '
+                    '(check_name, partition, environ, timestamp)'
+                )
+        except (OSError, sqlite3.Error) as e:
+            raise ReframeError('could not open runtime history %s: %s' %
+                               (filename, e)) from e
+
+    @property
+    def filename(self):
+        return self._filename
+
+    def record(self, check_name, partname, envname, timestamp=None,
+               **durations):
+        '''Record the durations of a run of a test case.
+
+        :arg durations: The duration in seconds of any of the
+            :attr:`PHASES`; unknown durations may be omitted or set to
+            :class:`None`.
+        '''
+        for phase in durations:
+            if phase not in self.PHASES:
+                raise ValueError('unknown phase: %s' % phase)
+
+        if timestamp is None:
+            timestamp = time.time()
+
+        values = [durations.get(p) for p in self.PHASES]
+        with self._conn:
+            self._conn.execute(
+                'INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (check_name, partname, envname, timestamp, *values)
+            )
+
+    def estimate(self, check_name, partname, envname, phase='run',
+                 last=10):
+        '''Estimate the duration of a phase of a test case.
+
+        :arg last: The number of the most recent runs to take into account.
+        :returns: The average duration in seconds of ``phase`` in the ``last``
+            runs where it was recorded or :class:`None` if there are no such
+            runs.
+        '''
+        if phase not in self.PHASES:
+            raise ValueError('unknown phase: %s' % phase)
+
+        # The phase name is validated above, so it is safe to interpolate it
+        cursor = self._conn.execute(
+            'SELECT AVG(duration) FROM ('
+            'SELECT %s AS duration FROM runs WHERE check_name = ? AND '
+            'partition = ? AND environ = ? AND %s IS NOT NULL '
+            'ORDER BY timestamp DESC LIMIT ?)' % (phase, phase),
+            (check_name, partname, envname, last)
+        )
+        return cursor.fetchone()[0]
+
+    def num_runs(self, check_name, partname, envname):
+        '''Return the number of the recorded runs of a test case.'''
+        cursor = self._conn.execute(
+            'SELECT COUNT(*) FROM runs WHERE check_name = ? AND '
+            'partition = ? AND environ = ?',
+            (check_name, partname, envname)
+        )
+        return cursor.fetchone()[0]
+
+    def close(self):
+        '''Close the database of the history.'''
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -5,7 +5,7 @@
 
 from reframe.core.launchers import JobLauncher
 from reframe.core.launchers.registry import register_launcher
-from reframe.utility import seconds_to_hms
+from reframe.utility import compress_hostlist, seconds_to_hms
 
 
 @register_launcher('srun')
@@ -111,3 +111,32 @@ class SrunAllocationLauncher(JobLauncher):
             ret.append(opt)
 
         return ret
+
+
+class SrunStepLauncher(SrunAllocationLauncher):
+    '''Launch a job as a step of an existing Slurm allocation.
+
+    The job step is placed exclusively on the given nodes of the allocation.
+    Options that refer to the allocation as a whole, such as the partition or
+    the account, are not passed to ``srun``.
+
+    :arg allocation_id: The job id of the allocation.
+    :arg nodes: The list of names of the nodes to place the job step on.
+    '''
+
+    _allocation_options = ('--output=', '--error=', '--partition=',
+                           '--account=', '--nodelist=', '--exclude=',
+                           '--exclusive')
+
+    def __init__(self, allocation_id, nodes):
+        super().__init__()
+        self.allocation_id = allocation_id
+        self.nodes = list(nodes)
+
+    def command(self, job):
+        ret = ['srun', '--jobid=%s' % self.allocation_id, '--exclusive',
+               '--nodes=%s' % len(self.nodes),
+               '--nodelist=%s' % compress_hostlist(self.nodes)]
+        ret += [opt for opt in super().command(job)[1:]
+                if not opt.startswith(self._allocation_options)]
+        return ret
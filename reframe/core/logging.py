@@ -14,6 +14,7 @@ import re
 import shutil
 import sys
 import socket
+import threading
 import time
 
 import reframe
@@ -532,22 +533,22 @@ _logger = None
 _perf_logger = None
 _context_logger = null_logger
 
+# The logging contexts are kept per thread, so that checks may be processed
+# concurrently without mixing up their log records
+_thread_context = threading.local()
+
 
 class logging_context:
     def __init__(self, check=None, level=DEBUG):
-        global _context_logger
-
         self._level = level
-        self._orig_logger = _context_logger
+        self._orig_logger = getattr(_thread_context, 'logger', None)
         if check is not None:
-            _context_logger = LoggerAdapter(_logger, check)
+            _thread_context.logger = LoggerAdapter(_logger, check)
 
     def __enter__(self):
-        return _context_logger
+        return getlogger()
 
     def __exit__(self, exc_type, exc_value, traceback):
-        global _context_logger
-
         # Log any exceptions thrown with the current context logger
         if exc_type is not None:
             msg = 'caught {0}: {1}'
@@ -555,12 +556,13 @@ class logging_context:
             getlogger().log(self._level, msg.format(exc_fullname, exc_value))
 
         # Restore context logger
-        _context_logger = self._orig_logger
+        _thread_context.logger = self._orig_logger
 
 
 def configure_logging(loggin_config):
     global _logger, _context_logger
 
+    _thread_context.logger = None
     if loggin_config is None:
         _logger = None
         _context_logger = null_logger
@@ -584,7 +586,7 @@ def save_log_files(dest):
 
 
 def getlogger():
-    return _context_logger
+    return getattr(_thread_context, 'logger', None) or _context_logger
 
 
 def getperflogger(check):
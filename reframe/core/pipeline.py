@@ -27,9 +27,10 @@ import reframe.utility as util
 import reframe.utility.os_ext as os_ext
 import reframe.utility.sanity as sn
 import reframe.utility.typecheck as typ
+from reframe.core.buildcache import BuildCache
 from reframe.core.buildsystems import BuildSystemField
 from reframe.core.containers import ContainerPlatform, ContainerPlatformField
-from reframe.core.deferrable import _DeferredExpression
+from reframe.core.deferrable import _DeferredExpression, evaluation_session
 from reframe.core.exceptions import (BuildError, DependencyError,
                                      PipelineError, SanityError,
                                      PerformanceError)
@@ -235,6 +236,19 @@ class RegressionTest(metaclass=RegressionTestMeta):
     #: .. versionadded:: 2.14
     build_system = BuildSystemField('build_system', type(None))
 
+    #: The cache to reuse the builds of earlier runs of this test from.
+    #:
+    #: If set, the stage directory of the test is restored from the cache
+    #: instead of building the test, if an identical build is found, and it
+    #: is stored in the cache after a successful build otherwise.
+    #: The framework sets this from the ``--build-cache`` command line option.
+    #:
+    #: :type: :class:`reframe.core.buildcache.BuildCache` or :class:`None`.
+    #: :default: :class:`None`.
+    #:
+    #: .. versionadded:: 3.0
+    build_cache = fields.TypedField('build_cache', BuildCache, type(None))
+
     #: List of shell commands to be executed before compiling.
     #:
     #: These commands are executed during the compilation phase and from
@@ -699,6 +713,11 @@ class RegressionTest(metaclass=RegressionTestMeta):
         self._perfvalues = {}
         self.container_platform = None
 
+        # Contents of the output files and results of the deferred
+        # expressions shared by the sanity and performance checking phases
+        self._file_cache = {}
+        self._eval_memo = {}
+
         # Strict performance check, if applicable
         self.strict_check = True
 
@@ -755,6 +774,11 @@ class RegressionTest(metaclass=RegressionTestMeta):
         self._compile_proc = None
         self.build_system = None
 
+        # Build cache
+        self.build_cache = None
+        self._build_cache_key = None
+        self._build_cached = False
+
         # Performance logging
         self._perf_logger = logging.null_logger
 
@@ -847,6 +871,19 @@ class RegressionTest(metaclass=RegressionTestMeta):
         '''
         return self._stagedir
 
+    @property
+    def build_cached(self):
+        '''Whether the build of the test was restored from the
+        :attr:`build_cache`.
+
+        This is set during the :func:`compile` phase.
+
+        .. versionadded:: 3.0
+
+        :type: :class:`bool`.
+        '''
+        return self._build_cached
+
     @property
     def outputdir(self):
         '''The output directory of the test.
@@ -1108,6 +1145,13 @@ class RegressionTest(metaclass=RegressionTestMeta):
         environs = [self._current_partition.local_env, self._current_environ,
                     user_environ, self._cdt_environ]
 
+        self._build_cached = False
+        if self.build_cache is not None:
+            self._build_cache_key = self.build_cache.key(
+                self.name, self._stagedir, build_commands, environs)
+            self._build_cached = self.build_cache.restore(
+                self._build_cache_key, self._stagedir)
+
         self._build_job = Job.create(getscheduler('local')(),
                                      launcher=getlauncher('local')(),
                                      name='rfm_%s_build' % self.name,
@@ -1119,7 +1163,29 @@ class RegressionTest(metaclass=RegressionTestMeta):
             except OSError as e:
                 raise PipelineError('failed to prepare build job') from e
 
-            self._build_job.submit()
+            if self._build_cached:
+                self.logger.info('%s: reusing cached build %s' %
+                                 (self.name, self._build_cache_key))
+            else:
+                self._build_job.submit()
+
+    def compile_complete(self):
+        '''Check if the compilation phase has finished.
+
+        This call is non-blocking.
+
+        :returns: :class:`True` if the associated build job has finished,
+            :class:`False` otherwise.
+
+            If no build job is associated with this test, :class:`True` is
+            returned.
+
+        .. versionadded:: 3.0
+        '''
+        if not self._build_job or self._build_cached:
+            return True
+
+        return self._build_job.finished()
 
     @_run_hooks('post_compile')
     def compile_wait(self):
@@ -1127,6 +1193,9 @@ class RegressionTest(metaclass=RegressionTestMeta):
 
         .. versionadded:: 2.13
         '''
+        if self._build_cached:
+            return
+
         self._build_job.wait()
         self.logger.debug('compilation finished')
 
@@ -1134,6 +1203,9 @@ class RegressionTest(metaclass=RegressionTestMeta):
         if self._build_job.exitcode != 0:
             raise BuildError(self._build_job.stdout, self._build_job.stderr)
 
+        if self.build_cache is not None:
+            self.build_cache.store(self._build_cache_key, self._stagedir)
+
     @_run_hooks('pre_run')
     def run(self):
         '''The run phase of the regression test pipeline.
@@ -1249,7 +1321,12 @@ class RegressionTest(metaclass=RegressionTestMeta):
 
     @_run_hooks()
     def sanity(self):
-        self.check_sanity()
+        try:
+            self.check_sanity()
+        except BaseException:
+            # The output files will not be examined any further
+            self._clear_evaluation_state()
+            raise
 
     @_run_hooks()
     def performance(self):
@@ -1258,6 +1335,13 @@ class RegressionTest(metaclass=RegressionTestMeta):
         except PerformanceError:
             if self.strict_check:
                 raise
+        finally:
+            # The output files will not be examined any further
+            self._clear_evaluation_state()
+
+    def _clear_evaluation_state(self):
+        self._file_cache.clear()
+        self._eval_memo.clear()
 
     def check_sanity(self):
         '''The sanity checking phase of the regression test pipeline.
@@ -1267,7 +1351,10 @@ class RegressionTest(metaclass=RegressionTestMeta):
         if self.sanity_patterns is None:
             raise SanityError('sanity_patterns not set')
 
-        with os_ext.change_dir(self._stagedir):
+        with sn.working_directory(self._stagedir), \
+             sn.file_cache(self._file_cache), \
+             evaluation_session(self._eval_memo), \
+             sn.combined_scan([self.sanity_patterns]):
             success = sn.evaluate(self.sanity_patterns)
             if not success:
                 raise SanityError()
@@ -1281,7 +1368,10 @@ class RegressionTest(metaclass=RegressionTestMeta):
         if self.perf_patterns is None:
             return
 
-        with os_ext.change_dir(self._stagedir):
+        with sn.working_directory(self._stagedir), \
+             sn.file_cache(self._file_cache), \
+             evaluation_session(self._eval_memo), \
+             sn.combined_scan(self.perf_patterns.values()):
             # Check if default reference perf values are provided and
             # store all the variables  tested in the performance check
             has_default = False
@@ -1386,6 +1476,7 @@ class RegressionTest(metaclass=RegressionTestMeta):
         :arg remove_files: If :class:`True`, the stage directory associated
             with this test will be removed.
         '''
+        self._clear_evaluation_state()
         aliased = os.path.samefile(self._stagedir, self._outputdir)
         if aliased:
             self.logger.debug('skipping copy to output dir '
@@ -8,12 +8,15 @@
 #
 
 import abc
+import concurrent.futures
+import os
 import time
 
 import reframe.core.environments as env
 import reframe.core.fields as fields
 import reframe.core.shell as shell
 import reframe.utility.typecheck as typ
+from reframe.core.config import settings
 from reframe.core.exceptions import JobError, JobNotStartedError
 from reframe.core.launchers import JobLauncher
 from reframe.core.logging import getlogger
@@ -26,6 +29,11 @@ class JobScheduler(abc.ABC):
         '''
         pass
 
+    def start_time(self, job):
+        '''The time this job started running expressed in seconds from the
+        Epoch or :class:`None` if it is not known.'''
+        return None
+
     @abc.abstractmethod
     def emit_preamble(self, job):
         pass
@@ -46,6 +54,25 @@ class JobScheduler(abc.ABC):
     def wait(self, job):
         pass
 
+    def poll(self, *jobs):
+        '''Update the state of multiple jobs at once.
+
+        Backends that can query the state of many jobs with a single request
+        to the workload manager should override this method and hand back the
+        retrieved state to each of the ``jobs``, so that a subsequent call to
+        :func:`finished` does not have to query it again.
+        The default implementation does nothing, in which case each job is
+        polled separately by :func:`finished`.
+        '''
+
+    def submission_deferred(self, job):
+        '''Check if the submission of the job is deferred and it has not
+        taken place yet.
+
+        Such jobs have no job id yet, but they may still be cancelled.
+        '''
+        return False
+
     @abc.abstractmethod
     def cancel(self, job):
         pass
@@ -54,6 +81,86 @@ class JobScheduler(abc.ABC):
     def finished(self, job):
         pass
 
+    def started(self, job):
+        '''Check if the job has started running.
+
+        :returns: :class:`True` if the job has started running,
+            :class:`False` if it is still pending or :class:`None` if this is
+            not known.
+        '''
+        return None
+
+
+class AdaptivePollInterval:
+    '''Compute the intervals between the successive polls of a job.
+
+    If the runtime of the job can be estimated, the job is polled frequently
+    close to its expected completion and rarely otherwise. If not, the
+    polling interval grows with the time the job has been running, but it is
+    kept short close to its time limit.
+    In any case, the interval never exceeds ``max_interval``, which bounds
+    the delay until a finished job is noticed.
+
+    :arg job: The job to poll.
+    :arg min_interval: The minimum polling interval in seconds.
+        If :class:`None`, the shortest of the configured
+        ``job_poll_intervals`` is used.
+    :arg max_interval: The maximum polling interval in seconds.
+        If :class:`None`, the configured ``job_poll_max_interval`` is used or
+        :attr:`default_max_interval`, if this is not set.
+    '''
+
+    #: The maximum polling interval in seconds, if it is not configured.
+    default_max_interval = 5
+
+    #: The fraction of the elapsed time of a job of unknown runtime to wait
+    #: before polling it again.
+    backoff = 0.25
+
+    def __init__(self, job, min_interval=None, max_interval=None):
+        if min_interval is None:
+            min_interval = min(settings().job_poll_intervals)
+
+        if max_interval is None:
+            # Older settings files do not define the maximum interval
+            max_interval = getattr(settings(), 'job_poll_max_interval',
+                                   self.default_max_interval)
+
+        self._job = job
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        self._t_submit = time.time()
+        self._t_start = None
+
+    def __call__(self, started=None):
+        '''Return the time in seconds until the next poll of the job.
+
+        :arg started: Whether the job has started running, as returned by
+            :func:`JobScheduler.started`. If this is not known, the job is
+            assumed to be running since its submission.
+        '''
+        t_now = time.time()
+        if started and self._t_start is None:
+            self._t_start = t_now
+
+        t_start = self._t_start or self._t_submit
+        expected = self._job.expected_runtime
+        if expected is None:
+            interval = (t_now - t_start) * self.backoff
+        elif started is False:
+            # The job cannot finish before it has run for the expected time
+            interval = expected / 2
+        else:
+            interval = abs(t_start + expected - t_now) / 2
+
+        time_limit = self._job.time_limit
+        if time_limit is not None and started is not False:
+            t_left = t_start + time_limit.total_seconds() - t_now
+            if t_left > 0:
+                interval = min(interval, t_left)
+
+        return min(max(interval, self._min_interval), self._max_interval)
+
 
 class Job:
     '''A job descriptor.
@@ -196,6 +303,14 @@ class Job:
         self.state = None
         self.nodelist = None
 
+        # The expected runtime of the job in seconds, if known
+        self.expected_runtime = None
+        self._poll_interval = None
+
+        # Set if the submission of the job is deferred to a JobSubmissionPool
+        self._submission_pool = None
+        self._submit_dir = None
+
         self._name = name
         self._workdir = workdir
         self._script_filename = script_filename or '%s.sh' % name
@@ -276,6 +391,10 @@ class Job:
     def completion_time(self):
         return self.scheduler.completion_time(self) or self._completion_time
 
+    @property
+    def start_time(self):
+        return self.scheduler.start_time(self)
+
     def prepare(self, commands, environs=None, **gen_opts):
         environs = environs or []
         if self.num_tasks <= 0:
@@ -331,9 +450,43 @@ class Job:
 
         return len(available_nodes) * num_tasks_per_node
 
+    @property
+    def submit_dir(self):
+        '''The directory the job is submitted from.
+
+        If :class:`None`, the job is submitted from the current working
+        directory.
+        '''
+        return self._submit_dir
+
+    def defer_submission(self, pool):
+        '''Defer the submission of the job to ``pool``.
+
+        :func:`submit` will then return immediately and the
+        :attr:`jobid` will be set as soon as the submission finishes.
+
+        :arg pool: A :class:`JobSubmissionPool`.
+        '''
+        self._submission_pool = pool
+
     def submit(self):
+        self._poll_interval = AdaptivePollInterval(self)
+        if self._submission_pool is not None:
+            return self._submission_pool.submit(self)
+
         return self.scheduler.submit(self)
 
+    def next_poll_interval(self):
+        '''Return the time in seconds until this job should be polled again.
+
+        The polling interval adapts to the expected runtime of the job, its
+        time limit and whether it has started running.
+        '''
+        if self._poll_interval is None:
+            self._poll_interval = AdaptivePollInterval(self)
+
+        return self._poll_interval(self.scheduler.started(self))
+
     def wait(self):
         if self.jobid is None:
             raise JobNotStartedError('cannot wait an unstarted job')
@@ -342,7 +495,8 @@ class Job:
         self._completion_time = self._completion_time or time.time()
 
     def cancel(self):
-        if self.jobid is None:
+        if (self.jobid is None and
+            not self.scheduler.submission_deferred(self)):
             raise JobNotStartedError('cannot cancel an unstarted job')
 
         return self.scheduler.cancel(self)
@@ -358,7 +512,76 @@ class Job:
         return done
 
 
+class JobSubmissionPool:
+    '''Submit jobs concurrently using a bounded pool of threads.
+
+    Submitting a job to a batch scheduler may take several seconds if the
+    workload manager is under load. Jobs submitted through this pool are
+    handed over to one of at most ``max_workers`` threads, so that the caller
+    does not have to wait for the submission to finish. The job is submitted
+    from the working directory of the caller at the time of the call to
+    :func:`submit`.
+
+    :arg max_workers: The maximum number of concurrent submissions.
+    '''
+
+    def __init__(self, max_workers=4):
+        self._max_workers = max_workers
+        self._executor = None
+
+        # Futures of the submissions in progress indexed by job
+        self._pending = {}
+
+    @property
+    def max_workers(self):
+        return self._max_workers
+
+    @property
+    def num_pending(self):
+        return len(self._pending)
+
+    def is_pending(self, job):
+        '''Check if the submission of ``job`` has not been collected yet.'''
+        return job in self._pending
+
+    def submit(self, job):
+        if self._executor is None:
+            self._executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self._max_workers
+            )
+
+        job._submit_dir = os.getcwd()
+        self._pending[job] = self._executor.submit(job.scheduler.submit, job)
+
+    def completed(self, wait=False):
+        '''Collect the finished submissions.
+
+        :arg wait: Wait for all the pending submissions to finish.
+        :returns: A list of ``(job, exc)`` tuples for every finished
+            submission, where ``exc`` is the exception raised by the
+            submission or :class:`None` if it was successful.
+        '''
+        if wait:
+            concurrent.futures.wait(self._pending.values())
+
+        ret = []
+        for job, future in list(self._pending.items()):
+            if future.done():
+                del self._pending[job]
+                ret.append((job, future.exception()))
+
+        return ret
+
+    def shutdown(self):
+        '''Wait for the pending submissions and stop the worker threads.'''
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
 class Node(abc.ABC):
+    __slots__ = ()
+
     @abc.abstractmethod
     def is_available(self):
         '''Return ``True`` if this node is available, ``False`` otherwise.'''
@@ -164,6 +164,9 @@ class LocalJobScheduler(sched.JobScheduler):
             self._f_stdout.close()
             self._f_stderr.close()
 
+    def started(self, job):
+        return True
+
     def finished(self, job):
         '''Check if the spawned process has finished.
 
@@ -10,26 +10,51 @@
 #
 
 import functools
+import json
 import os
-import itertools
 import re
 import time
-from datetime import datetime
 
 import reframe.core.schedulers as sched
 import reframe.utility.os_ext as os_ext
 from reframe.core.config import settings
-from reframe.core.exceptions import SpawnedProcessError, JobError
+from reframe.core.exceptions import JobError
 from reframe.core.logging import getlogger
 from reframe.core.schedulers.registry import register_scheduler
 from reframe.utility import seconds_to_hms
 
 
-# Time to wait after a job is finished for its standard output/error to be
-# written to the corresponding files.
+# Time to wait after the output files of a job that is no longer reported
+# by qstat have appeared, so that PBS finishes writing them back
 PBS_OUTPUT_WRITEBACK_WAIT = 3
 
 
+# The job states reported by qstat
+_job_states = {
+    'B': 'BEGUN',
+    'E': 'EXITING',
+    'F': 'FINISHED',
+    'H': 'HELD',
+    'M': 'MOVED',
+    'Q': 'QUEUED',
+    'R': 'RUNNING',
+    'S': 'SUSPENDED',
+    'T': 'TRANSIT',
+    'U': 'SUSPENDED',
+    'W': 'WAITING',
+    'X': 'EXPIRED'
+}
+
+
+def pbs_state_completed(state):
+    # `COMPLETED' is set for jobs that are no longer reported by qstat
+    return state in {'COMPLETED', 'FINISHED', 'EXPIRED'}
+
+
+def pbs_state_pending(state):
+    return state in {'HELD', 'QUEUED', 'TRANSIT', 'WAITING'}
+
+
 _run_strict = functools.partial(os_ext.run_command, check=True)
 
 
@@ -37,13 +62,33 @@ _run_strict = functools.partial(os_ext.run_command, check=True)
 class PbsJobScheduler(sched.JobScheduler):
     def __init__(self):
         self._prefix = '#PBS'
-        self._time_finished = None
+        self._start_time = None
+        self._completion_time = None
 
         # Optional part of the job id refering to the PBS server
         self._pbs_server = None
 
+        # Set when the state of the job has been retrieved by a batched poll
+        # and not consumed yet by finished()
+        self._polled = False
+        self._poll_error = None
+
+        # Time when the output files of the job were first found
+        self._time_finished = None
+
+    def _jobspec(self, job):
+        '''Return the full PBS job id of the job.'''
+        jobid = str(job.jobid)
+        if self._pbs_server:
+            jobid += '.' + self._pbs_server
+
+        return jobid
+
     def completion_time(self, job):
-        return None
+        return self._completion_time
+
+    def start_time(self, job):
+        return self._start_time
 
     def _emit_lselect_option(self, job):
         num_tasks_per_node = job.num_tasks_per_node or 1
@@ -106,7 +151,8 @@ class PbsJobScheduler(sched.JobScheduler):
         # Slurm wrappers.
         cmd = 'qsub -o %s -e %s %s' % (job.stdout, job.stderr,
                                        job.script_filename)
-        completed = _run_strict(cmd, timeout=settings().job_submit_timeout)
+        completed = _run_strict(cmd, timeout=settings().job_submit_timeout,
+                                cwd=job.submit_dir)
         jobid_match = re.search(r'^(?P<jobid>\S+)', completed.stdout)
         if not jobid_match:
             raise JobError('could not retrieve the job id '
@@ -118,26 +164,168 @@ class PbsJobScheduler(sched.JobScheduler):
             self._pbs_server = info[0]
 
     def wait(self, job):
-        intervals = itertools.cycle(settings().job_poll_intervals)
         while not self.finished(job):
-            time.sleep(next(intervals))
+            time.sleep(job.next_poll_interval())
 
     def cancel(self, job):
-        # Recreate the full job id
-        jobid = str(job.jobid)
-        if self._pbs_server:
-            jobid += '.' + self._pbs_server
-
+        jobid = self._jobspec(job)
         getlogger().debug('cancelling job (id=%s)' % jobid)
         _run_strict('qdel %s' % jobid, timeout=settings().job_submit_timeout)
 
+    def _query_states(self, jobids):
+        '''Retrieve the information of ``jobids`` with a single ``qstat``
+        call and return its raw output.
+
+        Finished jobs are included, so that their exit status is known.
+        '''
+        # qstat fails if any of the jobs is unknown to the server, but it
+        # still reports the rest of them
+        completed = os_ext.run_command(
+            'qstat -x -f -F json %s' % ' '.join(jobids)
+        )
+        return completed.stdout
+
+    def _match_states(self, qstat_output):
+        '''Return the job information of ``qstat_output`` by job id.
+
+        If the output cannot be parsed, e.g., because ``qstat`` does not
+        support JSON output, as is the case with Torque, no job is reported.
+        '''
+        try:
+            # qstat does not escape control characters in job variables
+            jobs_info = json.loads(qstat_output, strict=False).get('Jobs', {})
+        except (ValueError, AttributeError):
+            getlogger().debug('could not parse the output of qstat '
+                              '(stdout follows)\n%s' % qstat_output)
+            return {}
+
+        ret = {}
+        for jobid, info in jobs_info.items():
+            jobid_match = re.match(r'\d+(?=\.|$)', jobid)
+            if jobid_match:
+                ret[int(jobid_match.group(0))] = info
+
+        return ret
+
+    def poll(self, *jobs):
+        '''Update the state of ``jobs`` with a single ``qstat`` call.
+
+        The parsed state is handed back to the scheduler of each job, so that
+        the next call to :func:`finished` for that job does not query PBS
+        again.
+        '''
+        jobs = [j for j in jobs if j.jobid is not None]
+        if not jobs:
+            return
+
+        try:
+            jobs_info = self._match_states(self._query_states(
+                [j.scheduler._jobspec(j) for j in jobs]
+            ))
+        except JobError as e:
+            # Each job will query its own state when finished() is called
+            getlogger().debug('batched polling failed: %s' % e)
+            return
+
+        getlogger().debug('polled %s job(s) with a single qstat call' %
+                          len(jobs))
+        for job in jobs:
+            job.scheduler._hand_over_state(job, jobs_info.get(job.jobid))
+
+    def _hand_over_state(self, job, info):
+        self._polled = True
+        self._poll_error = None
+        try:
+            self._update_state_from_info(job, info)
+        except JobError as e:
+            self._poll_error = e
+
+    def _update_state(self, job):
+        jobs_info = self._match_states(
+            self._query_states([self._jobspec(job)])
+        )
+        self._update_state_from_info(job, jobs_info.get(job.jobid))
+
+    def _update_state_from_info(self, job, info):
+        if info is None:
+            getlogger().debug('job %s not reported by qstat' % job.jobid)
+            self._update_state_from_output(job)
+            return
+
+        state = info.get('job_state')
+        if state not in _job_states:
+            raise JobError('unknown state of job %s: %s' % (job.jobid, state))
+
+        job.state = _job_states[state]
+        if job.nodelist is None and info.get('exec_host'):
+            # The execution hosts are reported as `host/cpu[*n]+...`
+            job.nodelist = list(dict.fromkeys(
+                h.split('/')[0] for h in info['exec_host'].split('+')
+            ))
+
+        if not pbs_state_completed(job.state):
+            return
+
+        try:
+            job.exitcode = int(info['Exit_status'])
+        except (KeyError, TypeError, ValueError):
+            # The job never run, e.g., it was deleted while queued
+            job.exitcode = None
+
+        self._start_time = _parse_time(info.get('stime'))
+        self._completion_time = _parse_time(info.get('obittime'))
+
+    def _update_state_from_output(self, job):
+        '''Consider a job that is not reported by ``qstat`` finished once its
+        output files have been written back.
+
+        This is the case for jobs that have been purged from the server after
+        finishing and for all jobs with a ``qstat`` that does not support JSON
+        output.
+        '''
+        done = all(os.path.exists(os.path.join(job.workdir, f))
+                   for f in (job.stdout, job.stderr))
+        if not done:
+            return
+
+        t_now = time.time()
+        self._time_finished = self._time_finished or t_now
+        if t_now - self._time_finished > PBS_OUTPUT_WRITEBACK_WAIT:
+            job.state = 'COMPLETED'
+
+    def _consume_polled_state(self, job):
+        self._polled = False
+        if self._poll_error is not None:
+            error, self._poll_error = self._poll_error, None
+            raise error
+
+    def started(self, job):
+        if job.state is None:
+            return None
+
+        return not pbs_state_pending(job.state)
+
     def finished(self, job):
-        with os_ext.change_dir(job.workdir):
-            done = os.path.exists(job.stdout) and os.path.exists(job.stderr)
+        try:
+            if self._polled:
+                self._consume_polled_state(job)
+            else:
+                self._update_state(job)
+        except JobError as e:
+            # We ignore these exceptions at this point and we simply mark the
+            # job as unfinished.
+            getlogger().debug('ignoring error during polling: %s' % e)
+            return False
+        else:
+            return pbs_state_completed(job.state)
 
-        if done:
-            t_now = datetime.now()
-            self._time_finished = self._time_finished or t_now
-            time_from_finish = (t_now - self._time_finished).total_seconds()
 
-        return done and time_from_finish > PBS_OUTPUT_WRITEBACK_WAIT
+def _parse_time(timestamp):
+    '''Convert a timestamp reported by qstat to seconds since the epoch.'''
+    if not timestamp:
+        return None
+
+    try:
+        return time.mktime(time.strptime(timestamp, '%a %b %d %H:%M:%S %Y'))
+    except ValueError:
+        return None
@@ -38,3 +38,4 @@ def getscheduler(name):
 import reframe.core.schedulers.local  # noqa: F401, F403
 import reframe.core.schedulers.slurm  # noqa: F401, F403
 import reframe.core.schedulers.pbs    # noqa: F401, F403
+import reframe.core.schedulers.slurmrest  # noqa: F401, F403
@@ -5,8 +5,10 @@
 
 import functools
 import glob
-import itertools
+import os
 import re
+import shlex
+import threading
 import time
 from argparse import ArgumentParser
 from contextlib import suppress
@@ -14,13 +16,15 @@ from datetime import datetime
 
 import reframe.core.environments as env
 import reframe.core.schedulers as sched
+import reframe.core.shell as shell
 import reframe.utility.os_ext as os_ext
 from reframe.core.config import settings
 from reframe.core.exceptions import (SpawnedProcessError,
                                      JobBlockedError, JobError)
 from reframe.core.logging import getlogger
 from reframe.core.schedulers.registry import register_scheduler
-from reframe.utility import seconds_to_hms
+from reframe.utility import (compress_hostlist, expand_hostlist,
+                             seconds_to_hms)
 
 
 def slurm_state_completed(state):
@@ -103,6 +107,32 @@ class SlurmJobScheduler(sched.JobScheduler):
         self._is_job_array = None
         self._update_state_count = 0
         self._completion_time = None
+        self._start_time = None
+
+        # Set when the state of the job has been retrieved by a batched poll
+        # and not consumed yet by finished()
+        self._polled = False
+        self._poll_error = None
+
+        # Set if the submission of the job is deferred to a JobArrayBatcher
+        self._batcher = None
+
+        # The index of the job in the job array it was submitted with
+        self._array_task_id = None
+
+        # The job ids of the jobs that must complete successfully before
+        # this job may start
+        self._dependencies = []
+
+        # The node information is shared by all the jobs of the session
+        self._node_inventory = node_inventory()
+
+    def _jobspec(self, job):
+        '''Return the Slurm job id of the job.'''
+        if self._array_task_id is None:
+            return str(job.jobid)
+
+        return '%s_%s' % (job.jobid, self._array_task_id)
 
     def completion_time(self, job):
         if (self._completion_time or
@@ -111,20 +141,29 @@ class SlurmJobScheduler(sched.JobScheduler):
 
         with env.temp_environment(variables={'SLURM_TIME_FORMAT': '%s'}):
             completed = os_ext.run_command(
-                'sacct -S %s -P -j %s -o jobid,end' %
-                (datetime.now().strftime('%F'), job.jobid),
+                'sacct -S %s -P -j %s -o jobid,start,end' %
+                (datetime.now().strftime('%F'), self._jobspec(job)),
                 log=False
             )
 
-        state_match = list(re.finditer(
-            r'^(?P<jobid>%s)\|(?P<end>\S+)' % self._state_patt,
-            completed.stdout, re.MULTILINE))
+        state_match = self._select_array_task(list(re.finditer(
+            r'^(?P<jobid>%s)\|(?P<start>\S+)\|(?P<end>\S+)' %
+            self._state_patt, completed.stdout, re.MULTILINE)))
         if not state_match:
             return None
 
+        with suppress(ValueError):
+            self._start_time = min(float(s.group('start'))
+                                   for s in state_match)
+
         self._completion_time = max(float(s.group('end')) for s in state_match)
         return self._completion_time
 
+    def start_time(self, job):
+        # The start time is retrieved along with the completion time
+        self.completion_time(job)
+        return self._start_time
+
     def _format_option(self, var, option):
         if var is not None:
             return self._prefix + ' ' + option.format(var)
@@ -149,6 +188,11 @@ class SlurmJobScheduler(sched.JobScheduler):
             self._format_option(job.sched_reservation, '--reservation={0}')
         ]
 
+        if self._dependencies:
+            preamble.append(self._format_option(
+                ':'.join(['afterok'] + self._dependencies), '--dependency={0}'
+            ))
+
         # Slurm replaces '%a' by the corresponding SLURM_ARRAY_TASK_ID
         outfile_fmt = '--output={0}' + ('_%a' if self.is_array(job) else '')
         errfile_fmt = '--error={0}' + ('_%a' if self.is_array(job) else '')
@@ -185,34 +229,61 @@ class SlurmJobScheduler(sched.JobScheduler):
         # Filter out empty statements before returning
         return list(filter(None, preamble))
 
-    def submit(self, job):
-        cmd = 'sbatch %s' % job.script_filename
-        completed = _run_strict(cmd, timeout=settings().job_submit_timeout)
+    def defer_submission(self, batcher):
+        '''Defer the submission of the job to ``batcher``.
+
+        The job may then be submitted as part of a job array together with
+        other compatible jobs.
+
+        :arg batcher: A :class:`JobArrayBatcher`.
+        '''
+        self._batcher = batcher
+
+    @property
+    def dependencies(self):
+        '''The job ids of the jobs that must complete successfully before
+        this job may start.'''
+        return self._dependencies
+
+    def add_dependencies(self, *jobs):
+        '''Hold the job until ``jobs`` have completed successfully.
+
+        The ``jobs`` must be submitted Slurm jobs and this method must be
+        called before the job script is generated.
+        '''
+        self._dependencies += [j.scheduler._jobspec(j) for j in jobs]
+
+    def _submit_script(self, script_filename, cwd=None):
+        '''Submit ``script_filename`` with ``sbatch`` from ``cwd`` and return
+        the job id.
+        '''
+        cmd = 'sbatch %s' % script_filename
+        completed = _run_strict(cmd, timeout=settings().job_submit_timeout,
+                                cwd=cwd)
         jobid_match = re.search(r'Submitted batch job (?P<jobid>\d+)',
                                 completed.stdout)
         if not jobid_match:
             raise JobError(
                 'could not retrieve the job id of the submitted job')
 
-        job.jobid = int(jobid_match.group('jobid'))
+        return int(jobid_match.group('jobid'))
 
-    def allnodes(self):
-        try:
-            completed = _run_strict('scontrol -a show -o nodes')
-        except SpawnedProcessError as e:
-            raise JobError('could not retrieve node information') from e
+    def submit(self, job):
+        if self._batcher is not None and self._batcher.accepts(job):
+            self._batcher.add(job)
+        else:
+            job.jobid = self._submit_script(job.script_filename,
+                                            cwd=job.submit_dir)
 
-        node_descriptions = completed.stdout.splitlines()
-        return _create_nodes(node_descriptions)
+    def _submitted_as_array_task(self, job, jobid, array_task_id):
+        job.jobid = jobid
+        self._array_task_id = array_task_id
 
-    def _get_default_partition(self):
-        completed = _run_strict('scontrol -a show -o partitions')
-        partition_match = re.search(r'PartitionName=(?P<partition>\S+)\s+'
-                                    r'.*Default=YES.*', completed.stdout)
-        if partition_match:
-            return partition_match.group('partition')
+    def allnodes(self):
+        return set(self._node_inventory.nodes())
 
-        return None
+    def _get_default_partition(self):
+        return self._node_inventory.default_partition()
 
     def _merge_files(self, job):
         with os_ext.change_dir(job.workdir):
@@ -270,14 +341,14 @@ class SlurmJobScheduler(sched.JobScheduler):
             getlogger().debug('flex_alloc_nodes: default partition: %s' %
                               default_partition)
 
-        nodes = {n for n in nodes if n.partitions >= partitions}
+        nodes &= self._node_inventory.select(partitions=partitions)
         getlogger().debug(
             'flex_alloc_nodes: filtering nodes by partition(s) %s: '
             'available nodes now: %s' % (partitions, len(nodes)))
 
         if constraints:
             constraints = set(constraints.strip().split(','))
-            nodes = {n for n in nodes if n.active_features >= constraints}
+            nodes &= self._node_inventory.select(features=constraints)
             getlogger().debug(
                 'flex_alloc_nodes: filtering nodes by constraint(s) %s: '
                 'available nodes now: %s' % (constraints, len(nodes)))
@@ -299,47 +370,127 @@ class SlurmJobScheduler(sched.JobScheduler):
         return nodes
 
     def _get_reservation_nodes(self, reservation):
-        completed = _run_strict('scontrol -a show res %s' % reservation)
-        node_match = re.search(r'(Nodes=\S+)', completed.stdout)
-        if node_match:
-            reservation_nodes = node_match[1]
-        else:
-            raise JobError("could not extract the node names for "
-                           "reservation '%s'" % reservation)
-
-        completed = _run_strict('scontrol -a show -o %s' % reservation_nodes)
-        node_descriptions = completed.stdout.splitlines()
-        return _create_nodes(node_descriptions)
+        return self._node_inventory.reservation_nodes(reservation)
 
     def _get_nodes_by_name(self, nodespec):
-        completed = os_ext.run_command('scontrol -a show -o node %s' %
-                                       nodespec)
-        node_descriptions = completed.stdout.splitlines()
-        return _create_nodes(node_descriptions)
+        return self._node_inventory.nodes_by_name(nodespec)
+
+    def _get_current_nodes_by_name(self, nodespec):
+        return self._node_inventory.current_nodes_by_name(nodespec)
 
     def _set_nodelist(self, job, nodespec):
         if job.nodelist is not None:
             return
 
         if nodespec and nodespec != 'None assigned':
-            job.nodelist = [n.name for n in self._get_nodes_by_name(nodespec)]
+            job.nodelist = list(dict.fromkeys(expand_hostlist(nodespec)))
+
+    def _query_states(self, jobids):
+        '''Retrieve the accounting information of ``jobids`` with a single
+        ``sacct`` call and return its raw output.'''
+        completed = _run_strict(
+            'sacct -S %s -P -j %s -o jobid,state,exitcode,nodelist' %
+            (datetime.now().strftime('%F'), ','.join(map(str, jobids)))
+        )
+        return completed.stdout
+
+    def _match_states(self, sacct_output):
+        '''Group the state lines of ``sacct_output`` by job id.'''
+        state_matches = {}
+        for s in re.finditer(
+                r'^(?P<jobid>%s)\|(?P<state>\S+)([^\|]*)\|(?P<exitcode>\d+)\:'
+                r'(?P<signal>\d+)\|(?P<nodespec>.*)' % self._state_patt,
+                sacct_output, re.MULTILINE):
+            # Job array elements are accounted to their parent job
+            jobid = int(re.match(r'\d+', s.group('jobid')).group(0))
+            state_matches.setdefault(jobid, []).append(s)
+
+        return state_matches
+
+    def poll(self, *jobs):
+        '''Update the state of ``jobs`` with a single ``sacct`` call.
+
+        The parsed state is handed back to the scheduler of each job, so that
+        the next call to :func:`finished` for that job does not query Slurm
+        again.
+        '''
+        jobs = [j for j in jobs if j.jobid is not None]
+        if not jobs:
+            return
+
+        try:
+            # Jobs submitted as a job array share the same job id
+            sacct_output = self._query_states(
+                sorted({j.jobid for j in jobs})
+            )
+        except (JobError, SpawnedProcessError) as e:
+            # Each job will query its own state when finished() is called
+            getlogger().debug('batched polling failed: %s' % e)
+            return
+
+        state_matches = self._match_states(sacct_output)
+        getlogger().debug('polled %s job(s) with a single sacct call' %
+                          len(jobs))
+        for job in jobs:
+            job.scheduler._hand_over_state(
+                job, state_matches.get(job.jobid, []), sacct_output
+            )
+
+    def _hand_over_state(self, job, state_match, raw_output):
+        '''Update ``job`` with a state retrieved by a batched poll.
+
+        Any error raised while updating the state is kept and reraised at the
+        next call to :func:`finished`.
+        '''
+        self._polled = True
+        self._poll_error = None
+        try:
+            self._update_state_from_match(job, state_match, raw_output)
+        except JobError as e:
+            self._poll_error = e
 
     def _update_state(self, job):
         '''Check the status of the job.'''
 
-        completed = _run_strict(
-            'sacct -S %s -P -j %s -o jobid,state,exitcode,nodelist' %
-            (datetime.now().strftime('%F'), job.jobid)
+        sacct_output = self._query_states([job.jobid])
+        self._update_state_from_match(
+            job, self._match_states(sacct_output).get(job.jobid, []),
+            sacct_output
         )
-        self._update_state_count += 1
 
-        state_match = list(re.finditer(
-            r'^(?P<jobid>%s)\|(?P<state>\S+)([^\|]*)\|(?P<exitcode>\d+)\:'
-            r'(?P<signal>\d+)\|(?P<nodespec>.*)' % self._state_patt,
-            completed.stdout, re.MULTILINE))
+    def _select_array_task(self, state_match):
+        '''Select the state lines that refer to the job array task of the job.
+
+        Pending tasks of a job array are reported in a single line using the
+        ``<job_id>_[<array_task_id_start>-<array_task_id_end>]`` format.
+        '''
+        if self._array_task_id is None:
+            return state_match
+
+        ret = []
+        for s in state_match:
+            task_match = re.match(
+                r'\d+_(?:(?P<task>\d+)|\[(?P<first>\d+)-(?P<last>\d+)\])$',
+                s.group('jobid')
+            )
+            if not task_match:
+                continue
+
+            if task_match.group('task') is not None:
+                if int(task_match.group('task')) == self._array_task_id:
+                    ret.append(s)
+            elif (int(task_match.group('first')) <=
+                  self._array_task_id <= int(task_match.group('last'))):
+                ret.append(s)
+
+        return ret
+
+    def _update_state_from_match(self, job, state_match, raw_output):
+        state_match = self._select_array_task(state_match)
+        self._update_state_count += 1
         if not state_match:
             getlogger().debug('job state not matched (stdout follows)\n%s' %
-                              completed.stdout)
+                              raw_output)
             return
 
         # Join the states with ',' in case of job arrays
@@ -360,7 +511,8 @@ class SlurmJobScheduler(sched.JobScheduler):
         if self._is_cancelling or not slurm_state_pending(job.state):
             return
 
-        completed = _run_strict('squeue -h -j %s -o %%r' % job.jobid)
+        completed = _run_strict('squeue -h -j %s -o %%r' %
+                                self._jobspec(job))
         if not completed.stdout:
             # Can't retrieve job's state. Perhaps it has finished already and
             # does not show up in the output of squeue
@@ -390,9 +542,10 @@ class SlurmJobScheduler(sched.JobScheduler):
                 if node_match:
                     node_names = node_match['node_names']
                     if node_names:
-                        # Retrieve the info of the unavailable nodes
-                        # and check if they are indeed down
-                        nodes = self._get_nodes_by_name(node_names)
+                        # Retrieve the current info of the unavailable nodes
+                        # and check if they are indeed down; the cached node
+                        # info may be too old to decide on cancelling
+                        nodes = self._get_current_nodes_by_name(node_names)
                         if not any(n.is_down() for n in nodes):
                             return
                     else:
@@ -416,24 +569,50 @@ class SlurmJobScheduler(sched.JobScheduler):
 
             return
 
-        intervals = itertools.cycle(settings().job_poll_intervals)
         self._update_state(job)
         while not slurm_state_completed(job.state):
-            time.sleep(next(intervals))
+            time.sleep(job.next_poll_interval())
             self._update_state(job)
 
         if self.is_array(job):
             self._merge_files(job)
 
+    def submission_deferred(self, job):
+        return self._batcher is not None and self._batcher.is_pending(job)
+
     def cancel(self, job):
-        getlogger().debug('cancelling job (id=%s)' % job.jobid)
-        _run_strict('scancel %s' % job.jobid,
+        if job.jobid is None:
+            # The job is still waiting to be submitted with a job array
+            getlogger().debug('withdrawing unsubmitted job %s' % job.name)
+            if self._batcher is not None:
+                self._batcher.discard(job)
+
+            self._is_cancelling = True
+            return
+
+        getlogger().debug('cancelling job (id=%s)' % self._jobspec(job))
+        _run_strict('scancel %s' % self._jobspec(job),
                     timeout=settings().job_submit_timeout)
         self._is_cancelling = True
 
+    def _consume_polled_state(self, job):
+        self._polled = False
+        if self._poll_error is not None:
+            error, self._poll_error = self._poll_error, None
+            raise error
+
+    def started(self, job):
+        if job.state is None:
+            return None
+
+        return job.state not in ('PENDING', 'CONFIGURING', 'REQUEUED')
+
     def finished(self, job):
         try:
-            self._update_state(job)
+            if self._polled:
+                self._consume_polled_state(job)
+            else:
+                self._update_state(job)
         except JobBlockedError:
             # Job blocked forever; reraise the exception to notify our caller
             raise
@@ -477,19 +656,70 @@ class SqueueJobScheduler(SlurmJobScheduler):
         super().submit(job)
         self._submit_time = datetime.now()
 
+    def _submitted_as_array_task(self, job, jobid, array_task_id):
+        super()._submitted_as_array_task(job, jobid, array_task_id)
+        self._submit_time = datetime.now()
+
+    def poll(self, *jobs):
+        '''Update the state of ``jobs`` with a single ``squeue`` call.
+
+        Jobs that were submitted too recently to be reliably reported by
+        ``squeue`` are left unchanged in this round.
+        '''
+        jobs = [j for j in jobs if j.jobid is not None]
+        t_now = datetime.now()
+        recent_jobs = [
+            j for j in jobs
+            if ((t_now - j.scheduler._submit_time).total_seconds() <
+                self._squeue_delay)
+        ]
+        for job in recent_jobs:
+            job.scheduler._polled = True
+            job.scheduler._poll_error = None
+
+        jobs = [j for j in jobs if j not in recent_jobs]
+        if not jobs:
+            return
+
+        squeue_output = self._query_states(sorted({j.jobid for j in jobs}))
+        state_matches = {}
+        for s in self._find_states(squeue_output):
+            jobid = int(re.match(r'\d+', s.group('jobid')).group(0))
+            state_matches.setdefault(jobid, []).append(s)
+
+        getlogger().debug('polled %s job(s) with a single squeue call' %
+                          len(jobs))
+        for job in jobs:
+            job.scheduler._hand_over_state(
+                job, state_matches.get(job.jobid, []), squeue_output
+            )
+
+    def _query_states(self, jobids):
+        # We don't run the command with check=True, because if the job has
+        # finished already, squeue might return an error about an invalid
+        # job id.
+        completed = os_ext.run_command('squeue -h -j %s -o "%%i|%%T|%%N|%%r"' %
+                                       ','.join(map(str, jobids)))
+        return completed.stdout
+
+    def _find_states(self, squeue_output):
+        return list(re.finditer(
+            r'^(?P<jobid>%s)\|(?P<state>\S+)\|(?P<nodespec>\S*)\|'
+            r'(?P<reason>.+)' % self._state_patt, squeue_output, re.MULTILINE
+        ))
+
     def _update_state(self, job):
         time_from_submit = datetime.now() - self._submit_time
         rem_wait = self._squeue_delay - time_from_submit.total_seconds()
         if rem_wait > 0:
             time.sleep(rem_wait)
 
-        # We don't run the command with check=True, because if the job has
-        # finished already, squeue might return an error about an invalid
-        # job id.
-        completed = os_ext.run_command('squeue -h -j %s -o "%%T|%%N|%%r"' %
-                                       job.jobid)
-        state_match = list(re.finditer(r'^(?P<state>\S+)\|(?P<nodespec>\S*)\|'
-                                       r'(?P<reason>.+)', completed.stdout))
+        squeue_output = self._query_states([job.jobid])
+        self._update_state_from_match(job, self._find_states(squeue_output),
+                                      squeue_output)
+
+    def _update_state_from_match(self, job, state_match, raw_output):
+        state_match = self._select_array_task(state_match)
         if not state_match:
             # Assume that job has finished
             job.state = 'CANCELLED' if self._cancelled else 'COMPLETED'
@@ -520,6 +750,423 @@ class SqueueJobScheduler(SlurmJobScheduler):
         self._cancelled = True
 
 
+class JobArrayBatcher:
+    '''Submit compatible Slurm jobs together as job arrays.
+
+    Jobs whose submission is deferred to the batcher are collected until
+    :func:`flush` is called. Two jobs are compatible if their job script
+    preambles are the same apart from the job name, the output files and the
+    time limit, and if their time limits fall in the same class of
+    :attr:`TIME_LIMIT_CLASSES`. Each group of compatible jobs is submitted as
+    a single job array with the maximum time limit of the group. The
+    dispatcher script of the job array runs the job script of each job
+    according to ``SLURM_ARRAY_TASK_ID`` and redirects its output to the
+    output files of the job, so that each job can be treated as if it was
+    submitted on its own.
+    '''
+
+    #: The upper bounds in seconds of the time limit classes.
+    TIME_LIMIT_CLASSES = [600, 3600, 4*3600, 12*3600, 24*3600]
+
+    #: The maximum number of jobs in a single job array.
+    MAX_ARRAY_SIZE = 1000
+
+    # Preamble options that may differ among the jobs of a job array
+    _array_options = ('--job-name=', '--output=', '--error=', '--time=')
+
+    def __init__(self):
+        # Pending jobs along with the directory they were submitted from
+        self._pending = []
+        self._num_arrays = 0
+
+    @property
+    def num_pending(self):
+        return len(self._pending)
+
+    def accepts(self, job):
+        return not job.scheduler.is_array(job)
+
+    def add(self, job):
+        self._pending.append((job, os.getcwd()))
+
+    def is_pending(self, job):
+        '''Check if ``job`` has not been submitted yet.'''
+        return any(j is job for j, _ in self._pending)
+
+    def discard(self, job):
+        '''Remove ``job`` from the pending jobs, so that it is never
+        submitted.'''
+        self._pending = [(j, jobdir) for j, jobdir in self._pending
+                         if j is not job]
+
+    def _time_limit_class(self, job):
+        if job.time_limit is None:
+            return None
+
+        secs = job.time_limit.total_seconds()
+        for limit in self.TIME_LIMIT_CLASSES:
+            if secs <= limit:
+                return limit
+
+        return secs
+
+    def _group_key(self, job):
+        prefix = job.scheduler._prefix + ' '
+        preamble = tuple(
+            opt for opt in job.scheduler.emit_preamble(job)
+            if not opt.startswith(tuple(prefix + o
+                                        for o in self._array_options))
+        )
+        return (type(job.scheduler), preamble, self._time_limit_class(job))
+
+    def flush(self):
+        '''Submit all pending jobs.
+
+        :returns: A list of ``(job, exc)`` tuples for the jobs that could
+            not be submitted.
+        '''
+        groups = {}
+        for job, jobdir in self._pending:
+            groups.setdefault(self._group_key(job), []).append((job, jobdir))
+
+        self._pending = []
+        failures = []
+        for group in groups.values():
+            for i in range(0, len(group), self.MAX_ARRAY_SIZE):
+                chunk = group[i:i + self.MAX_ARRAY_SIZE]
+                try:
+                    self._submit(chunk)
+                except (JobError, SpawnedProcessError, OSError) as e:
+                    failures += [(job, e) for job, _ in chunk]
+
+        return failures
+
+    def _submit(self, group):
+        job, jobdir = group[0]
+        if len(group) == 1:
+            with os_ext.change_dir(jobdir):
+                job.jobid = job.scheduler._submit_script(job.script_filename)
+
+            return
+
+        self._num_arrays += 1
+        script_filename = os.path.join(
+            jobdir, 'rfm_array_%s_%s.sh' % (os.getpid(), self._num_arrays)
+        )
+        self._write_dispatcher(script_filename, group)
+        jobid = job.scheduler._submit_script(script_filename)
+        getlogger().debug('submitted %s job(s) as job array %s' %
+                          (len(group), jobid))
+        for array_task_id, (job, _) in enumerate(group):
+            job.scheduler._submitted_as_array_task(job, jobid, array_task_id)
+
+    def _write_dispatcher(self, script_filename, group):
+        job = group[0][0]
+        prefix = job.scheduler._prefix
+        time_limits = [j.time_limit for j, _ in group
+                       if j.time_limit is not None]
+        preamble = [
+            '%s --job-name="rfm_array_%s"' % (prefix, self._num_arrays),
+            '%s --array=0-%s' % (prefix, len(group) - 1),
+            '%s --output=/dev/null' % prefix,
+            '%s --error=/dev/null' % prefix
+        ]
+        if time_limits:
+            h, m, s = seconds_to_hms(max(time_limits).total_seconds())
+            preamble.append('%s --time=%d:%d:%d' % (prefix, h, m, s))
+
+        preamble += self._group_key(job)[1]
+        with shell.generate_script(script_filename) as builder:
+            builder.write_prolog(preamble)
+            builder.write_body('case $SLURM_ARRAY_TASK_ID in')
+            for array_task_id, (job, jobdir) in enumerate(group):
+                workdir = os.path.abspath(jobdir)
+                builder.write_body(
+                    '    %s) cd %s && bash %s >%s 2>%s ;;' %
+                    (array_task_id, shlex.quote(workdir),
+                     shlex.quote(job.script_filename),
+                     shlex.quote(job.stdout), shlex.quote(job.stderr))
+                )
+
+            builder.write_body('esac')
+
+
+class SlurmAllocation:
+    '''A Slurm allocation whose nodes are handed out to job steps.
+
+    The allocation is obtained with ``salloc --no-shell``, so that it does
+    not run any commands by itself. Its nodes are then distributed to job
+    steps, which are launched with the ``--jobid`` option of ``srun``.
+
+    :arg num_nodes: The number of nodes to allocate.
+    :arg options: Additional options to pass to ``salloc``.
+    '''
+
+    def __init__(self, num_nodes, options=None):
+        self._num_nodes = num_nodes
+        self._options = list(options or [])
+        self._jobid = None
+        self._nodes = []
+        self._free_nodes = []
+
+        # The salloc process of a pending request
+        self._salloc = None
+        self._revoked = False
+        self._lock = threading.Lock()
+
+    @property
+    def jobid(self):
+        return self._jobid
+
+    @property
+    def nodes(self):
+        return self._nodes
+
+    @property
+    def num_free_nodes(self):
+        return len(self._free_nodes)
+
+    def _submit_allocation(self):
+        cmd = 'salloc --no-shell --nodes=%s %s' % (self._num_nodes,
+                                                   ' '.join(self._options))
+        with self._lock:
+            if self._revoked:
+                raise JobError('the allocation request was revoked')
+
+            self._salloc = os_ext.run_command_async(cmd,
+                                                    start_new_session=True)
+
+        stdout, stderr = self._salloc.communicate()
+        if self._salloc.returncode != 0:
+            raise SpawnedProcessError(shlex.split(cmd), stdout, stderr,
+                                      self._salloc.returncode)
+
+        # salloc reports the job id of the allocation in its standard error
+        jobid_match = re.search(r'Granted job allocation (?P<jobid>\d+)',
+                                stdout + stderr)
+        if not jobid_match:
+            raise JobError(
+                'could not retrieve the job id of the allocation')
+
+        return int(jobid_match.group('jobid'))
+
+    def _allocated_nodes(self):
+        completed = _run_strict('squeue -h -j %s -o %%N' % self._jobid)
+        return expand_hostlist(completed.stdout)
+
+    def acquire(self):
+        '''Obtain the allocation.
+
+        This call blocks until the allocation is granted.
+        '''
+        self._jobid = self._submit_allocation()
+        try:
+            self._nodes = self._allocated_nodes()
+        except (JobError, SpawnedProcessError):
+            self.release()
+            raise
+
+        self._free_nodes = list(self._nodes)
+        getlogger().debug('acquired allocation %s with nodes: %s' %
+                          (self._jobid, compress_hostlist(self._nodes)))
+
+    def revoke(self):
+        '''Withdraw the request for the allocation.
+
+        This may be called from another thread while :func:`acquire` waits
+        for the allocation to be granted, in which case :func:`acquire`
+        fails. An allocation that has already been granted must still be
+        cancelled with :func:`release`.
+        '''
+        with self._lock:
+            self._revoked = True
+            if self._salloc is not None and self._salloc.poll() is None:
+                # salloc withdraws its pending request when terminated
+                self._salloc.terminate()
+
+    def release(self):
+        '''Cancel the allocation.'''
+        if self._jobid is None:
+            return
+
+        getlogger().debug('releasing allocation %s' % self._jobid)
+        _run_strict('scancel %s' % self._jobid,
+                    timeout=settings().job_submit_timeout)
+        self._jobid = None
+        self._free_nodes = []
+
+    def allocate(self, num_nodes):
+        '''Reserve ``num_nodes`` free nodes of the allocation.
+
+        :returns: The list of the reserved nodes or :class:`None` if there
+            are not enough free nodes.
+        '''
+        if num_nodes > len(self._free_nodes):
+            return None
+
+        ret = self._free_nodes[:num_nodes]
+        self._free_nodes = self._free_nodes[num_nodes:]
+        return ret
+
+    def deallocate(self, nodes):
+        '''Return ``nodes`` to the free nodes of the allocation.'''
+        if self._jobid is None:
+            return
+
+        # Keep the free nodes in allocation order, so that job steps are
+        # placed on adjacent nodes as much as possible
+        free = set(self._free_nodes) | set(nodes)
+        self._free_nodes = [n for n in self._nodes if n in free]
+
+
+class _NodeInventory:
+    '''A cache of the node information of the cluster.
+
+    The output of ``scontrol`` is parsed once and reused until it becomes
+    older than :attr:`ttl` seconds. The nodes are indexed by name, partition,
+    active feature and state, so that all the flexible jobs of a session can
+    select their nodes without querying Slurm again.
+
+    :arg ttl: The time in seconds that the node information remains valid.
+    '''
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._cache = {}
+        self._by_name = {}
+        self._by_partition = {}
+        self._by_feature = {}
+        self._by_state = {}
+
+    def invalidate(self):
+        '''Discard all the cached node information.'''
+        self._cache.clear()
+
+    def _cached(self, key, query):
+        now = time.time()
+        entry = self._cache.get(key)
+        if entry is None or now - entry[0] >= self.ttl:
+            entry = (now, query())
+            self._cache[key] = entry
+
+        return entry[1]
+
+    def _query_nodes(self):
+        try:
+            completed = _run_strict('scontrol -a show -o nodes')
+        except SpawnedProcessError as e:
+            raise JobError('could not retrieve node information') from e
+
+        return completed.stdout.splitlines()
+
+    def _query_nodes_by_name(self, nodespec):
+        try:
+            completed = _run_strict('scontrol -a show -o node %s' % nodespec)
+        except SpawnedProcessError as e:
+            raise JobError('could not retrieve the information of nodes %s' %
+                           nodespec) from e
+
+        return completed.stdout.splitlines()
+
+    def _query_partitions(self):
+        return _run_strict('scontrol -a show -o partitions').stdout
+
+    def _query_reservation(self, reservation):
+        completed = _run_strict('scontrol -a show res %s' % reservation)
+        node_match = re.search(r'Nodes=(\S+)', completed.stdout)
+        if not node_match:
+            raise JobError("could not extract the node names for "
+                           "reservation '%s'" % reservation)
+
+        return node_match[1]
+
+    def _load_nodes(self):
+        return _create_nodes(self._query_nodes())
+
+    def _index_nodes(self):
+        nodes = self._load_nodes()
+        self._by_name = {n.name: n for n in nodes}
+        self._by_partition = {}
+        self._by_feature = {}
+        self._by_state = {}
+        for n in nodes:
+            for p in n.partitions:
+                self._by_partition.setdefault(p, set()).add(n)
+
+            for f in n.active_features:
+                self._by_feature.setdefault(f, set()).add(n)
+
+            for s in n.states:
+                self._by_state.setdefault(s, set()).add(n)
+
+        return frozenset(nodes)
+
+    def nodes(self):
+        '''Return all the nodes of the cluster.'''
+        return self._cached('nodes', self._index_nodes)
+
+    def default_partition(self):
+        '''Return the name of the default partition or :class:`None`.'''
+        partition_match = re.search(r'PartitionName=(?P<partition>\S+)\s+'
+                                    r'.*Default=YES.*',
+                                    self._cached('partitions',
+                                                 self._query_partitions))
+        if partition_match:
+            return partition_match.group('partition')
+
+        return None
+
+    def select(self, partitions=(), features=(), states=()):
+        '''Return the nodes that belong to all of ``partitions`` and have
+        all of the active ``features`` and ``states``.'''
+        ret = set(self.nodes())
+        for index, keys in ((self._by_partition, partitions),
+                            (self._by_feature, features),
+                            (self._by_state, states)):
+            for k in keys:
+                ret &= index.get(k, set())
+
+        return ret
+
+    def nodes_by_name(self, nodespec):
+        '''Return the nodes of the Slurm node list ``nodespec``.'''
+        try:
+            names = expand_hostlist(nodespec)
+        except ValueError as e:
+            raise JobError('could not retrieve the nodes of %s' %
+                           nodespec) from e
+
+        self.nodes()
+        return {self._by_name[n] for n in names if n in self._by_name}
+
+    def current_nodes_by_name(self, nodespec):
+        '''Return the nodes of the Slurm node list ``nodespec`` with their
+        current state.
+
+        Unlike :func:`nodes_by_name`, the node information is always
+        retrieved from Slurm and it is not cached.
+        '''
+        return _create_nodes(self._query_nodes_by_name(nodespec))
+
+    def reservation_nodes(self, reservation):
+        '''Return the nodes of the Slurm reservation ``reservation``.'''
+        nodespec = self._cached(('reservation', reservation),
+                                lambda: self._query_reservation(reservation))
+        return self.nodes_by_name(nodespec)
+
+
+_node_inventory = None
+
+
+def node_inventory():
+    '''Return the node inventory shared by all the Slurm jobs.'''
+    global _node_inventory
+    if _node_inventory is None:
+        _node_inventory = _NodeInventory()
+
+    return _node_inventory
+
+
 def _create_nodes(descriptions):
     nodes = set()
     for descr in descriptions:
@@ -532,17 +1179,34 @@ def _create_nodes(descriptions):
 class _SlurmNode(sched.Node):
     '''Class representing a Slurm node.'''
 
+    __slots__ = ('_name', '_partitions', '_active_features', '_states')
+
+    # Matches all the `key=value` pairs of a node description
+    _attr_patt = re.compile(r'(?<!\S)(\w+)=(\S*)')
+
     def __init__(self, node_descr):
-        self._name = self._extract_attribute('NodeName', node_descr)
+        attrs = {}
+        for m in self._attr_patt.finditer(node_descr):
+            attrs.setdefault(m.group(1), m.group(2))
+
+        self._name = attrs.get('NodeName')
         if not self._name:
             raise JobError('could not extract NodeName from node description')
 
-        self._partitions = self._extract_attribute(
-            'Partitions', node_descr, sep=',') or set()
-        self._active_features = self._extract_attribute(
-            'ActiveFeatures', node_descr, sep=',') or set()
-        self._states = self._extract_attribute(
-            'State', node_descr, sep='+') or set()
+        self._partitions = _split_attribute(attrs.get('Partitions'), ',')
+        self._active_features = _split_attribute(attrs.get('ActiveFeatures'),
+                                                 ',')
+        self._states = _split_attribute(attrs.get('State'), '+')
+
+    @classmethod
+    def create(cls, name, partitions=(), active_features=(), states=()):
+        '''Create a node from its already parsed attributes.'''
+        ret = cls.__new__(cls)
+        ret._name = name
+        ret._partitions = set(partitions)
+        ret._active_features = set(active_features)
+        ret._states = set(states)
+        return ret
 
     def __eq__(self, other):
         if not isinstance(other, type(self)):
@@ -576,13 +1240,9 @@ class _SlurmNode(sched.Node):
     def states(self):
         return self._states
 
-    def _extract_attribute(self, attr_name, node_descr, sep=None):
-        attr_match = re.search(r'%s=(\S+)' % attr_name, node_descr)
-        if attr_match:
-            attr = attr_match.group(1)
-            return set(attr_match.group(1).split(sep)) if sep else attr
-
-        return None
-
     def __str__(self):
         return self._name
+
+
+def _split_attribute(value, sep):
+    return set(value.split(sep)) if value else set()
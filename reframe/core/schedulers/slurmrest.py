@@ -0,0 +1,753 @@
+# Copyright 2016-2020 Swiss National Supercomputing Centre (CSCS/ETH Zurich)
+# ReFrame Project Developers. See the top-level LICENSE file for details.
+#
+# SPDX-License-Identifier: BSD-3-Clause
+
+#
+# Slurm backend talking to the Slurm REST API daemon (slurmrestd)
+#
+
+import getpass
+import http.client
+import json
+import os
+import re
+import select
+import shlex
+import socket
+import threading
+import time
+import urllib.parse
+from argparse import ArgumentParser
+
+from reframe.core.config import settings
+from reframe.core.exceptions import (ConfigError, JobError,
+                                     SpawnedProcessError)
+from reframe.core.logging import getlogger
+from reframe.core.schedulers.registry import register_scheduler
+from reframe.core.schedulers.slurm import (SlurmJobScheduler, _NodeInventory,
+                                           _SlurmNode, slurm_state_completed,
+                                           slurm_state_pending)
+from reframe.utility import expand_hostlist
+
+
+# Error number reported by slurmctld if no job has changed since the time
+# given in the query
+_SLURM_NO_CHANGE_IN_DATA = 1900
+
+# The requests that may be sent again if their connection fails
+_IDEMPOTENT_METHODS = ('GET', 'DELETE')
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    '''An HTTP connection over a Unix domain socket.'''
+
+    def __init__(self, path, timeout=None):
+        super().__init__('localhost', timeout=timeout)
+        self._path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self._path)
+
+
+def _connection_dropped(conn):
+    '''Check if the server has closed the idle connection ``conn``.
+
+    Nothing is expected to be read from an idle connection, so if its socket
+    is readable, the server has either closed it or sent garbage.
+    '''
+    if conn.sock is None:
+        return True
+
+    try:
+        readable, *_ = select.select([conn.sock], [], [], 0)
+    except (OSError, ValueError):
+        return True
+
+    return bool(readable)
+
+
+class SlurmRestClient:
+    '''A client of the Slurm REST API.
+
+    Connections to ``slurmrestd`` are kept alive and reused by subsequent
+    requests; up to ``max_connections`` idle connections are kept open, so
+    that concurrent submissions do not have to wait for each other.
+
+    :arg url: The URL of ``slurmrestd``; either ``http://host:port`` or
+        ``unix:///path/to/socket``.
+    :arg token: The JWT token to authenticate with or :class:`None` if
+        ``slurmrestd`` authenticates its clients through the Unix socket.
+    :arg user: The user name to authenticate as.
+    :arg api_version: The version of the REST API.
+    :arg max_connections: The maximum number of idle connections to keep.
+    '''
+
+    def __init__(self, url, token=None, user=None, api_version='v0.0.38',
+                 max_connections=4):
+        parsed = urllib.parse.urlsplit(url)
+        if parsed.scheme == 'unix':
+            self._socket_path = parsed.path
+        elif parsed.scheme in ('http', 'https'):
+            self._socket_path = None
+        else:
+            raise ConfigError('invalid slurmrestd URL: %s' % url)
+
+        self._url = parsed
+        self._api_version = api_version
+        self._max_connections = max_connections
+        self._headers = {'Accept': 'application/json',
+                         'Content-Type': 'application/json'}
+        if user is not None:
+            self._headers['X-SLURM-USER-NAME'] = user
+
+        if token is not None:
+            self._headers['X-SLURM-USER-TOKEN'] = token
+
+        self._idle = []
+        self._lock = threading.Lock()
+        self._num_connections = 0
+
+    @property
+    def url(self):
+        return urllib.parse.urlunsplit(self._url)
+
+    @property
+    def num_connections(self):
+        '''The number of connections opened so far.'''
+        return self._num_connections
+
+    def _connect(self):
+        timeout = settings().job_submit_timeout
+        if self._socket_path is not None:
+            conn = _UnixHTTPConnection(self._socket_path, timeout=timeout)
+        elif self._url.scheme == 'https':
+            conn = http.client.HTTPSConnection(self._url.netloc,
+                                               timeout=timeout)
+        else:
+            conn = http.client.HTTPConnection(self._url.netloc,
+                                              timeout=timeout)
+
+        with self._lock:
+            self._num_connections += 1
+
+        return conn
+
+    def _acquire(self):
+        with self._lock:
+            while self._idle:
+                conn = self._idle.pop()
+                if not _connection_dropped(conn):
+                    return conn, True
+
+                conn.close()
+
+        return self._connect(), False
+
+    def _release(self, conn):
+        with self._lock:
+            if len(self._idle) < self._max_connections:
+                self._idle.append(conn)
+                return
+
+        conn.close()
+
+    def close(self):
+        '''Close all the idle connections.'''
+        with self._lock:
+            idle, self._idle = self._idle, []
+
+        for conn in idle:
+            conn.close()
+
+    def request(self, method, path, body=None, ignore_errors=()):
+        '''Send a request to ``slurmrestd`` and return its decoded response.
+
+        :arg path: The path of the endpoint relative to the API version,
+            e.g., ``jobs``.
+        :arg body: An object to send JSON-encoded or :class:`None`.
+        :arg ignore_errors: The Slurm error numbers that are not considered
+            a failure, if they are the only errors reported.
+        :raises reframe.core.exceptions.JobError: If the request fails or
+            ``slurmrestd`` reports any error.
+        '''
+        url = '%s/slurm/%s/%s' % (self._url.path.rstrip('/')
+                                  if self._socket_path is None else '',
+                                  self._api_version, path)
+        data = json.dumps(body).encode() if body is not None else None
+        while True:
+            conn, reused = self._acquire()
+            sent = False
+            try:
+                conn.request(method, url, body=data, headers=self._headers)
+                sent = True
+                response = conn.getresponse()
+                payload = response.read()
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+
+                # An idle connection may have been closed by the server in
+                # the meantime; retry with a new one, unless the server may
+                # have received a request that must not be sent twice, e.g.,
+                # a job submission
+                if (reused and not isinstance(e, socket.timeout) and
+                    (not sent or method in _IDEMPOTENT_METHODS)):
+                    continue
+
+                raise JobError('slurmrestd request %s %s failed: %s' %
+                               (method, url, e)) from e
+
+            if response.will_close:
+                conn.close()
+            else:
+                self._release(conn)
+
+            break
+
+        try:
+            ret = json.loads(payload.decode()) if payload else {}
+        except ValueError as e:
+            raise JobError('could not decode the response of slurmrestd '
+                           'to %s %s' % (method, url)) from e
+
+        errors = ret.get('errors', [])
+        if errors and all(err.get('error_number') in ignore_errors
+                          for err in errors):
+            return ret
+
+        errors = [err.get('error') or err.get('description') or str(err)
+                  for err in errors]
+        if response.status >= 400 or errors:
+            raise JobError('slurmrestd request %s %s failed (HTTP %s): %s' %
+                           (method, url, response.status,
+                            '; '.join(errors) or response.reason))
+
+        return ret
+
+    def submit(self, script, properties):
+        '''Submit ``script`` with the job ``properties`` and return the job
+        id.'''
+        ret = self.request('POST', 'job/submit',
+                           {'script': script, 'job': properties})
+        try:
+            return int(ret['job_id'])
+        except (KeyError, TypeError, ValueError):
+            raise JobError('could not retrieve the job id of the '
+                           'submitted job') from None
+
+    def jobs(self, update_time=None):
+        '''Return the information of the jobs known to ``slurmctld``.
+
+        :arg update_time: If not :class:`None`, only the jobs that have
+            changed since this time are returned.
+        :returns: A tuple of the jobs and the time of their information
+            according to ``slurmctld`` or :class:`None` if it is not
+            reported.
+        '''
+        path = 'jobs'
+        if update_time is not None:
+            path += '?update_time=%d' % update_time
+
+        ret = self.request('GET', path,
+                           ignore_errors={_SLURM_NO_CHANGE_IN_DATA})
+        last_update = ret.get('last_update')
+        if isinstance(last_update, dict):
+            last_update = last_update.get('number')
+
+        return ret.get('jobs', []), last_update
+
+    def cancel(self, jobid):
+        self.request('DELETE', 'job/%s' % jobid)
+
+    def nodes(self):
+        return self.request('GET', 'nodes').get('nodes', [])
+
+    def node(self, name):
+        return self.request('GET', 'node/%s' % name).get('nodes', [])
+
+    def partitions(self):
+        return self.request('GET', 'partitions').get('partitions', [])
+
+    def reservation(self, name):
+        reservations = self.request(
+            'GET', 'reservation/%s' % name).get('reservations', [])
+        if not reservations:
+            raise JobError("no such reservation: '%s'" % name)
+
+        return reservations[0]
+
+
+_rest_client = None
+
+
+def rest_client():
+    '''Return the client of ``slurmrestd`` shared by all the jobs.
+
+    The client is configured from the ``SLURMRESTD_URL``,
+    ``SLURMRESTD_API_VERSION`` and ``SLURM_JWT`` environment variables.
+    '''
+    global _rest_client
+    if _rest_client is None:
+        _rest_client = SlurmRestClient(
+            os.getenv('SLURMRESTD_URL', 'unix:///var/run/slurmrestd.socket'),
+            token=os.getenv('SLURM_JWT'), user=getpass.getuser(),
+            api_version=os.getenv('SLURMRESTD_API_VERSION', 'v0.0.38')
+        )
+
+    return _rest_client
+
+
+class _RestNodeInventory(_NodeInventory):
+    '''A node inventory filled from ``slurmrestd``.'''
+
+    def __init__(self, client, ttl=60):
+        super().__init__(ttl)
+        self._client = client
+
+    def _load_nodes(self):
+        return self._create_nodes(self._client.nodes())
+
+    def _create_nodes(self, nodes_info):
+        nodes = set()
+        for info in nodes_info:
+            if not info.get('name'):
+                continue
+
+            features = info.get('active_features') or []
+            if isinstance(features, str):
+                features = features.split(',')
+
+            states = set(_as_list(info.get('state')))
+            states.update(info.get('state_flags', []))
+            nodes.add(_SlurmNode.create(
+                info['name'], info.get('partitions') or [], features,
+                (s.upper() for s in states if s)
+            ))
+
+        return nodes
+
+    def current_nodes_by_name(self, nodespec):
+        try:
+            names = expand_hostlist(nodespec)
+        except ValueError as e:
+            raise JobError('could not retrieve the nodes of %s' %
+                           nodespec) from e
+
+        nodes_info = []
+        for name in dict.fromkeys(names):
+            nodes_info += self._client.node(name)
+
+        return self._create_nodes(nodes_info)
+
+    def default_partition(self):
+        for p in self._cached('partitions', self._client.partitions):
+            flags = {f.upper() for f in _as_list(p.get('flags'))}
+            if 'DEFAULT' in flags:
+                return p.get('name')
+
+        return None
+
+    def _query_reservation(self, reservation):
+        nodespec = self._client.reservation(reservation).get('node_list')
+        if not nodespec:
+            raise JobError("could not extract the node names for "
+                           "reservation '%s'" % reservation)
+
+        return nodespec
+
+
+class _RestJobTable:
+    '''The state of the jobs submitted through ``slurmrestd``.
+
+    The jobs are retrieved with a single request per polling cycle and only
+    the jobs that have changed since the previous request are transferred.
+    Jobs that are not tracked by the table, e.g., the jobs of other users,
+    are discarded.
+    All the jobs are retrieved at least every :attr:`full_query_interval`
+    seconds, so that the jobs purged by ``slurmctld`` are noticed.
+
+    :arg client: The :class:`SlurmRestClient` to query.
+    :arg full_query_interval: The maximum time in seconds between two
+        queries of all the jobs.
+    '''
+
+    def __init__(self, client, full_query_interval=60):
+        self.full_query_interval = full_query_interval
+        self._client = client
+
+        # The job records indexed by the job id of the job or of its job
+        # array and then by their own job id
+        self._jobs = {}
+        self._update_time = None
+        self._last_full_query = None
+        self._lock = threading.Lock()
+
+    def track(self, jobid):
+        '''Keep the state of job ``jobid``.'''
+        with self._lock:
+            self._jobs.setdefault(jobid, {})
+
+    def _query(self, full):
+        t_query = time.time()
+        jobs, last_update = self._client.jobs(
+            None if full else self._update_time
+        )
+        with self._lock:
+            if full:
+                for records in self._jobs.values():
+                    records.clear()
+
+            for info in jobs:
+                jobid = info.get('array_job_id') or info.get('job_id')
+                if jobid in self._jobs:
+                    self._jobs[jobid][info.get('job_id')] = info
+
+        # Prefer the time of slurmctld, so that the clocks do not matter
+        self._update_time = last_update or int(t_query)
+        if full:
+            self._last_full_query = t_query
+
+    def query(self, jobids):
+        '''Update the state of the jobs.
+
+        :returns: A tuple of the information of ``jobids`` and the job ids
+            that are no longer known to ``slurmctld``.
+        '''
+        for jobid in jobids:
+            self.track(jobid)
+
+        full = (self._last_full_query is None or
+                time.time() - self._last_full_query >=
+                self.full_query_interval)
+        self._query(full)
+        if not full and not all(self._jobs[j] for j in jobids):
+            # The jobs may have been purged since the last full query
+            self._query(True)
+
+        infos, missing = [], []
+        for jobid in jobids:
+            if self._jobs[jobid]:
+                infos += self._jobs[jobid].values()
+            else:
+                missing.append(jobid)
+
+        return infos, missing
+
+
+_rest_job_table = None
+
+
+def rest_job_table():
+    '''Return the table of the jobs shared by all the ``slurmrest`` jobs.'''
+    global _rest_job_table
+    if _rest_job_table is None:
+        _rest_job_table = _RestJobTable(rest_client())
+
+    return _rest_job_table
+
+
+_rest_node_inventory = None
+
+
+def rest_node_inventory():
+    '''Return the node inventory shared by all the ``slurmrest`` jobs.'''
+    global _rest_node_inventory
+    if _rest_node_inventory is None:
+        _rest_node_inventory = _RestNodeInventory(rest_client())
+
+    return _rest_node_inventory
+
+
+def _as_list(value):
+    if value is None:
+        return []
+
+    if isinstance(value, str):
+        return [value]
+
+    return list(value)
+
+
+def _time_limit_minutes(timespec):
+    '''Convert a Slurm time specification to minutes, rounding up.'''
+    days, _, hms = timespec.rpartition('-')
+    fields = [int(f) for f in hms.split(':')]
+    if days:
+        # days-hours[:minutes[:seconds]]
+        fields += [0] * (3 - len(fields))
+        hours, minutes, seconds = fields
+        hours += 24 * int(days)
+    elif len(fields) == 1:
+        hours, minutes, seconds = 0, fields[0], 0
+    elif len(fields) == 2:
+        hours, (minutes, seconds) = 0, fields
+    else:
+        hours, minutes, seconds = fields
+
+    return 60*hours + minutes + (1 if seconds else 0)
+
+
+def _memory_mb(memspec):
+    units = {'K': 1/1024, 'M': 1, 'G': 1024, 'T': 1024**2}
+    unit = memspec[-1].upper()
+    if unit in units:
+        return int(float(memspec[:-1]) * units[unit])
+
+    return int(memspec)
+
+
+class _JobRecord:
+    '''The state of a job as reported by ``slurmrestd``.
+
+    It offers the ``group()`` interface of the state lines matched from the
+    output of ``sacct``, so that the state handling of
+    :class:`SlurmJobScheduler` applies unchanged.
+    '''
+
+    __slots__ = ('_fields',)
+
+    def __init__(self, info):
+        jobid = str(info['job_id'])
+        if info.get('array_job_id'):
+            # Pending array tasks are reported as a single job
+            task_id = info.get('array_task_id')
+            if task_id is None or info.get('array_task_string'):
+                jobid = '%s_[%s]' % (info['array_job_id'],
+                                     info.get('array_task_string'))
+            else:
+                jobid = '%s_%s' % (info['array_job_id'], task_id)
+
+        exitcode = info.get('exit_code') or 0
+        if isinstance(exitcode, dict):
+            exitcode = exitcode.get('return_code') or 0
+
+        self._fields = {
+            'jobid': jobid,
+            'state': ','.join(_as_list(info.get('job_state'))),
+            'exitcode': str(exitcode),
+            'nodespec': info.get('nodes') or '',
+            'reason': info.get('state_reason') or '',
+            'start': info.get('start_time') or None,
+            'end': info.get('end_time') or None
+        }
+
+    def group(self, name):
+        return self._fields[name]
+
+    def __repr__(self):
+        return '%s(%r)' % (type(self).__name__, self._fields)
+
+
+@register_scheduler('slurmrest')
+class SlurmRestJobScheduler(SlurmJobScheduler):
+    '''A Slurm backend that talks to ``slurmrestd`` instead of spawning the
+    Slurm commands.
+
+    The job properties are taken from the ``#SBATCH`` directives of the job
+    script, so that the job script is the same as with the ``slurm``
+    backend.
+    '''
+
+    # The sbatch options that are translated to job properties of the REST
+    # API along with the conversion of their values
+    _job_properties = [
+        (('-J', '--job-name'), 'name', str),
+        (('-n', '--ntasks'), 'tasks', int),
+        (('--ntasks-per-node',), 'tasks_per_node', int),
+        (('--ntasks-per-core',), 'tasks_per_core', int),
+        (('--ntasks-per-socket',), 'tasks_per_socket', int),
+        (('-c', '--cpus-per-task'), 'cpus_per_task', int),
+        (('-N', '--nodes'), 'nodes', str),
+        (('-p', '--partition'), 'partition', str),
+        (('-A', '--account'), 'account', str),
+        (('-q', '--qos'), 'qos', str),
+        (('-w', '--nodelist'), 'required_nodes', expand_hostlist),
+        (('-x', '--exclude'), 'excluded_nodes', expand_hostlist),
+        (('--reservation',), 'reservation', str),
+        (('-o', '--output'), 'standard_output', str),
+        (('-e', '--error'), 'standard_error', str),
+        (('-t', '--time'), 'time_limit', _time_limit_minutes),
+        (('-C', '--constraint'), 'constraints', str),
+        (('-d', '--dependency'), 'dependency', str),
+        (('-a', '--array'), 'array', str),
+        (('--gres',), 'tres_per_node', lambda v: 'gres:' + v),
+        (('--mem',), 'memory_per_node', _memory_mb),
+    ]
+
+    def __init__(self):
+        super().__init__()
+        self._client = rest_client()
+        self._job_table = rest_job_table()
+        self._node_inventory = rest_node_inventory()
+
+        # The state records of the job retrieved by the last poll
+        self._records = []
+
+    def _job_description(self, script, cwd):
+        '''Translate the ``#SBATCH`` directives of ``script`` to the job
+        properties of the REST API.'''
+        args = []
+        for line in script.splitlines():
+            if line.startswith('#!') or not line.strip():
+                continue
+
+            # Like sbatch, stop at the first command of the script
+            if not line.startswith('#'):
+                break
+
+            if line.startswith(self._prefix + ' '):
+                args += shlex.split(line[len(self._prefix):])
+
+        parser = ArgumentParser(add_help=False)
+        for flags, prop, _ in self._job_properties:
+            parser.add_argument(*flags, dest=prop)
+
+        parser.add_argument('--exclusive', action='store_true')
+        parser.add_argument('--hint')
+        parsed_args, unknown = parser.parse_known_args(args)
+        if unknown:
+            getlogger().warning('ignoring job options not supported by '
+                                'slurmrest: %s' % ' '.join(unknown))
+
+        ret = {
+            'current_working_directory': os.path.abspath(cwd),
+            'environment': dict(os.environ)
+        }
+        for _, prop, convert in self._job_properties:
+            value = getattr(parsed_args, prop)
+            if value is None:
+                continue
+
+            try:
+                ret[prop] = convert(value)
+            except ValueError:
+                raise JobError('invalid value for job property %s: %s' %
+                               (prop, value)) from None
+
+        if parsed_args.exclusive:
+            ret['exclusive'] = 'true'
+
+        if parsed_args.hint == 'nomultithread':
+            ret['threads_per_core'] = 1
+        elif parsed_args.hint is not None:
+            getlogger().warning('ignoring job option not supported by '
+                                'slurmrest: --hint=%s' % parsed_args.hint)
+
+        return ret
+
+    def _submit_script(self, script_filename, cwd=None):
+        '''Submit ``script_filename`` through ``slurmrestd`` as if it was
+        submitted from ``cwd`` and return the job id.'''
+        cwd = cwd or os.getcwd()
+        with open(os.path.join(cwd, script_filename)) as fp:
+            script = fp.read()
+
+        jobid = self._client.submit(script,
+                                    self._job_description(script, cwd))
+        self._job_table.track(jobid)
+        return jobid
+
+    def _query_states(self, jobids):
+        '''Retrieve the information of ``jobids``.
+
+        The jobs are retrieved with a single request, which transfers only
+        the jobs that have changed since the previous one.
+        Jobs that are no longer known to ``slurmctld`` are looked up with
+        ``sacct``.
+        '''
+        ret, missing = self._job_table.query(jobids)
+        if missing:
+            ret += self._accounting_records(missing)
+
+        return ret
+
+    def _query_accounting(self, jobids):
+        '''Retrieve the accounting information of ``jobids`` with ``sacct``
+        and return its raw output.'''
+        return SlurmJobScheduler._query_states(self, jobids)
+
+    def _accounting_records(self, jobids):
+        '''Retrieve the information of the finished ``jobids`` from the
+        accounting.
+
+        If the accounting information is not available either, the jobs are
+        reported as completed, since ``slurmctld`` forgets the jobs only after
+        they have finished.
+        '''
+        try:
+            sacct_output = self._query_accounting(jobids)
+        except (JobError, SpawnedProcessError, OSError) as e:
+            getlogger().debug('could not query the accounting information '
+                              'of jobs %s: %s' % (jobids, e))
+            sacct_output = ''
+
+        state_matches = SlurmJobScheduler._match_states(self, sacct_output)
+        ret = []
+        for jobid in jobids:
+            if jobid not in state_matches:
+                ret.append({'job_id': jobid, 'job_state': 'COMPLETED',
+                            'exit_code': 0})
+                continue
+
+            for s in state_matches[jobid]:
+                info = {'job_id': jobid, 'job_state': s.group('state'),
+                        'exit_code': int(s.group('exitcode')),
+                        'nodes': s.group('nodespec')}
+                task = re.match(r'\d+_(?:(\d+)|\[(.*)\])$', s.group('jobid'))
+                if task:
+                    info['array_job_id'] = jobid
+                    if task.group(1) is not None:
+                        info['array_task_id'] = int(task.group(1))
+                    else:
+                        info['array_task_string'] = task.group(2)
+
+                ret.append(info)
+
+        return ret
+
+    def _match_states(self, jobs_info):
+        state_matches = {}
+        for info in jobs_info:
+            record = _JobRecord(info)
+
+            # Job array elements are accounted to their parent job
+            jobid = info.get('array_job_id') or info['job_id']
+            state_matches.setdefault(jobid, []).append(record)
+
+        return state_matches
+
+    def _update_state_from_match(self, job, state_match, raw_output):
+        self._records = self._select_array_task(state_match)
+        super()._update_state_from_match(job, state_match, raw_output)
+
+    def _cancel_if_blocked(self, job):
+        if self._is_cancelling or not slurm_state_pending(job.state):
+            return
+
+        # The reasons are reported along with the job state
+        for r in self._records:
+            if r.group('reason'):
+                self._check_and_cancel(job, r.group('reason'))
+
+    def completion_time(self, job):
+        if (self._completion_time or
+            not slurm_state_completed(job.state)):
+            return self._completion_time
+
+        end_times = [r.group('end') for r in self._records]
+        if not end_times or None in end_times:
+            return None
+
+        start_times = [r.group('start') for r in self._records]
+        if None not in start_times:
+            self._start_time = float(min(start_times))
+
+        self._completion_time = float(max(end_times))
+        return self._completion_time
+
+    def cancel(self, job):
+        getlogger().debug('cancelling job (id=%s)' % self._jobspec(job))
+        self._client.cancel(self._jobspec(job))
+        self._is_cancelling = True
@@ -30,9 +30,14 @@ class SystemPartition:
     # maximum concurrent jobs
     _max_jobs  = fields.TypedField('_max_jobs', int)
 
+    # maximum nodes, tasks and GPUs requested by the concurrent jobs
+    _max_nodes = fields.TypedField('_max_nodes', int, type(None))
+    _max_tasks = fields.TypedField('_max_tasks', int, type(None))
+    _max_gpus  = fields.TypedField('_max_gpus', int, type(None))
+
     def __init__(self, name, descr=None, scheduler=None, launcher=None,
                  access=[], environs=[], resources={}, local_env=None,
-                 max_jobs=1):
+                 max_jobs=1, max_nodes=None, max_tasks=None, max_gpus=None):
         self._name  = name
         self._descr = descr or name
         self._scheduler = scheduler
@@ -41,6 +46,9 @@ class SystemPartition:
         self._environs  = list(environs)
         self._resources = dict(resources)
         self._max_jobs  = max_jobs
+        self._max_nodes = max_nodes
+        self._max_tasks = max_tasks
+        self._max_gpus  = max_gpus
         self._local_env = local_env
         self._container_environs = {}
 
@@ -86,6 +94,24 @@ class SystemPartition:
     def max_jobs(self):
         return self._max_jobs
 
+    @property
+    def max_nodes(self):
+        '''The maximum number of nodes that the concurrent jobs of this
+        partition may request or :class:`None` if there is no limit.'''
+        return self._max_nodes
+
+    @property
+    def max_tasks(self):
+        '''The maximum number of tasks that the concurrent jobs of this
+        partition may request or :class:`None` if there is no limit.'''
+        return self._max_tasks
+
+    @property
+    def max_gpus(self):
+        '''The maximum number of GPUs that the concurrent jobs of this
+        partition may request or :class:`None` if there is no limit.'''
+        return self._max_gpus
+
     @property
     def name(self):
         '''The name of this partition.
@@ -19,12 +19,17 @@ import reframe.frontend.argparse as argparse
 import reframe.frontend.check_filters as filters
 import reframe.frontend.dependency as dependency
 import reframe.utility.os_ext as os_ext
+from reframe.core.buildcache import BuildCache
 from reframe.core.exceptions import (EnvironError, ConfigError, ReframeError,
                                      ReframeFatalError, format_exception,
                                      SystemAutodetectionError)
+from reframe.core.history import RuntimeHistory
+from reframe.core.schedulers.slurm import node_inventory
+from reframe.core.schedulers.slurmrest import rest_node_inventory
 from reframe.frontend.executors import Runner, generate_testcases
 from reframe.frontend.executors.policies import (SerialExecutionPolicy,
-                                                 AsynchronousExecutionPolicy)
+                                                 AsynchronousExecutionPolicy,
+                                                 PilotJobExecutionPolicy)
 from reframe.frontend.loader import RegressionCheckLoader
 from reframe.frontend.printer import PrettyPrinter
 
@@ -107,6 +112,14 @@ def main():
     locate_options.add_argument(
         '--ignore-check-conflicts', action='store_true',
         help='Skip checks with conflicting names')
+    locate_options.add_argument(
+        '--load-workers', action='store', metavar='NUM', type=int, default=1,
+        help='Load checks in parallel using NUM workers (default: 1)')
+    locate_options.add_argument(
+        '--discovery-cache', action='store', metavar='FILE', nargs='?',
+        const='~/.cache/reframe/discovery.json',
+        help=('Cache the test discovery results in FILE '
+              '(default: ~/.cache/reframe/discovery.json)'))
 
     # Select options
     select_options.add_argument(
@@ -179,9 +192,75 @@ def main():
         help='Skip prog. environment check')
     run_options.add_argument(
         '--exec-policy', metavar='POLICY', action='store',
-        choices=['async', 'serial'], default='async',
+        choices=['async', 'serial', 'pilot'], default='async',
         help='Specify the execution policy for running the regression tests. '
-             'Available policies: "async" (default), "serial"')
+             'Available policies: "async" (default), "serial", "pilot"')
+    run_options.add_argument(
+        '--pilot-nodes', metavar='NUM', action='store', type=int, default=1,
+        help='Number of nodes to allocate on every partition with the '
+             '"pilot" execution policy (default: 1)')
+    run_options.add_argument(
+        '--pilot-time-limit', metavar='TIME', action='store',
+        help='Time limit of the allocations of the "pilot" execution policy')
+    run_options.add_argument(
+        '--build-cache', action='store', metavar='DIR',
+        help='Reuse the builds of earlier runs cached in DIR; builds are '
+             'only reused if the stage directory is the same')
+    run_options.add_argument(
+        '--build-cache-size', action='store', metavar='MB', type=int,
+        default=4096,
+        help='Maximum size of the build cache in MB (default: 4096)')
+    run_options.add_argument(
+        '--runtime-history', action='store', metavar='FILE', nargs='?',
+        const='',
+        help='Record the runtimes of the tests in FILE and use them for '
+             'scheduling (default: runtime_history.db in the performance '
+             'log prefix)')
+    run_options.add_argument(
+        '--max-build-jobs', metavar='NUM', action='store', type=int,
+        help='Maximum number of concurrent build jobs of the asynchronous '
+             'execution policy (default: number of CPUs)')
+    run_options.add_argument(
+        '--max-submit-jobs', metavar='NUM', action='store', type=int,
+        help='Maximum number of concurrent job submissions of the '
+             'asynchronous execution policy; 0 submits the jobs one at a '
+             'time (default: 4)')
+    run_options.add_argument(
+        '--max-finalize-jobs', metavar='NUM', action='store', type=int,
+        help='Maximum number of concurrent sanity and performance '
+             'evaluations of the asynchronous execution policy; 0 evaluates '
+             'the tests one at a time (default: 4)')
+    run_options.add_argument(
+        '--max-jobs', metavar='NUM', action='store', type=int,
+        help='Maximum number of concurrent jobs across all partitions '
+             '(asynchronous execution policy only)')
+    run_options.add_argument(
+        '--max-nodes', metavar='NUM', action='store', type=int,
+        help='Maximum number of nodes requested by the concurrent jobs '
+             'across all partitions (asynchronous execution policy only)')
+    run_options.add_argument(
+        '--max-tasks', metavar='NUM', action='store', type=int,
+        help='Maximum number of tasks requested by the concurrent jobs '
+             'across all partitions (asynchronous execution policy only)')
+    run_options.add_argument(
+        '--max-gpus', metavar='NUM', action='store', type=int,
+        help='Maximum number of GPUs requested by the concurrent jobs '
+             'across all partitions (asynchronous execution policy only)')
+    run_options.add_argument(
+        '--job-arrays', action='store_true',
+        help='Submit compatible Slurm jobs as job arrays '
+             '(asynchronous execution policy only)')
+    run_options.add_argument(
+        '--job-dependencies', action='store_true',
+        help='Submit the Slurm jobs of tests before the jobs of their '
+             'dependencies have finished (asynchronous execution policy '
+             'only)')
+    run_options.add_argument(
+        '--node-inventory-ttl', metavar='SECS', action='store', type=int,
+        default=60,
+        help='Reuse the Slurm node information for flexible node allocation '
+             'for SECS seconds; applies to both the slurm and the slurmrest '
+             'backends (default: 60)')
     run_options.add_argument(
         '--mode', action='store', help='Execution mode to use')
     run_options.add_argument(
@@ -414,6 +493,12 @@ def main():
                         'please check documentation')
 
     # Setup the check loader
+    if options.discovery_cache:
+        cache_file = os_ext.expandvars(
+            os.path.expanduser(options.discovery_cache))
+    else:
+        cache_file = None
+
     if options.checkpath:
         load_path = []
         for d in options.checkpath.split(':'):
@@ -429,12 +514,14 @@ def main():
                                             prune_children=options.recursive)
         loader = RegressionCheckLoader(
             load_path, recurse=options.recursive,
-            ignore_conflicts=options.ignore_check_conflicts)
+            ignore_conflicts=options.ignore_check_conflicts,
+            num_workers=options.load_workers, cache_file=cache_file)
     else:
         loader = RegressionCheckLoader(
             load_path=settings.checks_path,
             prefix=reframe.INSTALL_PREFIX,
-            recurse=settings.checks_path_recurse)
+            recurse=settings.checks_path_recurse,
+            num_workers=options.load_workers, cache_file=cache_file)
 
     printer.debug(argparse.format_options(options))
 
@@ -458,37 +545,27 @@ def main():
         '    Perf. logging prefix : %s' %
         os.path.abspath(logging.LOG_CONFIG_OPTS['handlers.filelog.prefix']))
     try:
-        # Locate and load checks
-        try:
-            checks_found = loader.load_all()
-        except OSError as e:
-            raise ReframeError from e
-
         # Filter checks by name
-        checks_matched = checks_found
+        check_filters = []
         if options.exclude_names:
             for name in options.exclude_names:
-                checks_matched = filter(filters.have_not_name(name),
-                                        checks_matched)
+                check_filters.append(filters.have_not_name(name))
 
         if options.names:
-            checks_matched = filter(filters.have_name('|'.join(options.names)),
-                                    checks_matched)
+            check_filters.append(filters.have_name('|'.join(options.names)))
 
         # Filter checks by tags
         for tag in options.tags:
-            checks_matched = filter(filters.have_tag(tag), checks_matched)
+            check_filters.append(filters.have_tag(tag))
 
         # Filter checks by prgenv
         if not options.skip_prgenv_check:
             for prgenv in options.prgenv:
-                checks_matched = filter(filters.have_prgenv(prgenv),
-                                        checks_matched)
+                check_filters.append(filters.have_prgenv(prgenv))
 
         # Filter checks by system
         if not options.skip_system_check:
-            checks_matched = filter(
-                filters.have_partition(rt.system.partitions), checks_matched)
+            check_filters.append(filters.have_partition(rt.system.partitions))
 
         # Filter checks further
         if options.gpu_only and options.cpu_only:
@@ -497,9 +574,20 @@ def main():
             sys.exit(1)
 
         if options.gpu_only:
-            checks_matched = filter(filters.have_gpu_only(), checks_matched)
+            check_filters.append(filters.have_gpu_only())
         elif options.cpu_only:
-            checks_matched = filter(filters.have_cpu_only(), checks_matched)
+            check_filters.append(filters.have_cpu_only())
+
+        def select_check(c):
+            return all(f(c) for f in check_filters)
+
+        # Locate and load checks
+        try:
+            checks_found = loader.load_all(check_filter=select_check)
+        except OSError as e:
+            raise ReframeError from e
+
+        checks_matched = filter(select_check, checks_found)
 
         # Determine the allowed programming environments
         allowed_environs = {e.name
@@ -569,14 +657,80 @@ def main():
             # Setup the execution policy
             if options.exec_policy == 'serial':
                 exec_policy = SerialExecutionPolicy()
-            elif options.exec_policy == 'async':
-                exec_policy = AsynchronousExecutionPolicy()
+            elif options.exec_policy in ('async', 'pilot'):
+                if options.exec_policy == 'pilot':
+                    if options.pilot_nodes <= 0:
+                        printer.error('--pilot-nodes must be a '
+                                      'positive number')
+                        sys.exit(1)
+
+                    exec_policy = PilotJobExecutionPolicy()
+                    exec_policy.pilot_num_nodes = options.pilot_nodes
+                    exec_policy.pilot_time_limit = options.pilot_time_limit
+                else:
+                    exec_policy = AsynchronousExecutionPolicy()
+
+                if options.max_build_jobs is not None:
+                    if options.max_build_jobs <= 0:
+                        printer.error('--max-build-jobs must be a '
+                                      'positive number')
+                        sys.exit(1)
+
+                    exec_policy.max_build_jobs = options.max_build_jobs
+
+                if options.max_submit_jobs is not None:
+                    if options.max_submit_jobs < 0:
+                        printer.error('--max-submit-jobs must be a '
+                                      'non-negative number')
+                        sys.exit(1)
+
+                    exec_policy.max_submit_jobs = options.max_submit_jobs
+
+                if options.max_finalize_jobs is not None:
+                    if options.max_finalize_jobs < 0:
+                        printer.error('--max-finalize-jobs must be a '
+                                      'non-negative number')
+                        sys.exit(1)
+
+                    exec_policy.max_finalize_jobs = options.max_finalize_jobs
+
+                for limit in ('max_jobs', 'max_nodes',
+                              'max_tasks', 'max_gpus'):
+                    value = getattr(options, limit)
+                    if value is not None and value <= 0:
+                        printer.error('--%s must be a positive number' %
+                                      limit.replace('_', '-'))
+                        sys.exit(1)
+
+                    setattr(exec_policy, limit, value)
+
+                exec_policy.use_job_arrays = options.job_arrays
+                exec_policy.use_job_dependencies = options.job_dependencies
             else:
                 # This should not happen, since choices are handled by
                 # argparser
                 printer.error("unknown execution policy `%s': Exiting...")
                 sys.exit(1)
 
+            if options.node_inventory_ttl < 0:
+                printer.error('--node-inventory-ttl must be a '
+                              'non-negative number')
+                sys.exit(1)
+
+            node_inventory().ttl = options.node_inventory_ttl
+            rest_node_inventory().ttl = options.node_inventory_ttl
+            if options.build_cache:
+                exec_policy.build_cache = BuildCache(
+                    os_ext.expandvars(options.build_cache),
+                    max_size=options.build_cache_size * 1024**2)
+
+            if options.runtime_history is not None:
+                exec_policy.runtime_history = RuntimeHistory(
+                    os_ext.expandvars(options.runtime_history) or
+                    os.path.join(rt.resources.perflog_prefix,
+                                 'runtime_history.db')
+                )
+
             exec_policy.skip_system_check = options.skip_system_check
             exec_policy.force_local = options.force_local
             exec_policy.strict_check = options.strict
@@ -613,6 +767,9 @@ def main():
             try:
                 runner.runall(testcases)
             finally:
+                if exec_policy.runtime_history is not None:
+                    exec_policy.runtime_history.close()
+
                 # Print a retry report if we did any retries
                 if runner.stats.failures(run=0):
                     printer.info(runner.stats.retry_report())
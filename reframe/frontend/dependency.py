@@ -220,3 +220,24 @@ def toposort(graph, is_subgraph=False):
 
     return list(itertools.chain(*(retrieve(cases_by_name, n, [])
                                   for n in visited)))
+
+
+def critical_paths(cases, weight):
+    '''Return the length of the critical path starting at every test case.
+
+    The critical path of a test case is the longest path from it to any of
+    the test cases depending on it, where the length of a path is the sum of
+    the weights of its test cases.
+
+    :arg cases: A list of test cases sorted topologically.
+    :arg weight: A callable returning the weight of a test case.
+    :returns: A dictionary holding the critical path length of each case.
+    '''
+    longest_dependent = {}
+    ret = {}
+    for c in reversed(cases):
+        ret[c] = weight(c) + longest_dependent.get(c, 0)
+        for d in c.deps:
+            longest_dependent[d] = max(longest_dependent.get(d, 0), ret[c])
+
+    return ret
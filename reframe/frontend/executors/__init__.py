@@ -6,6 +6,7 @@
 import abc
 import copy
 import sys
+import time
 import weakref
 
 import reframe.core.debug as debug
@@ -16,6 +17,7 @@ import reframe.frontend.dependency as dependency
 from reframe.core.exceptions import (AbortTaskError, JobNotStartedError,
                                      ReframeFatalError, TaskExit)
 from reframe.frontend.printer import PrettyPrinter
+from reframe.utility import seconds_to_hms
 from reframe.frontend.statistics import TestStats
 
 ABORT_REASONS = (KeyboardInterrupt, ReframeFatalError, AssertionError)
@@ -129,6 +131,9 @@ class RegressionTask:
         # Test case has finished, but has not been waited for yet
         self.zombie = False
 
+        # Start and end times of the build and run phases
+        self._timestamps = {}
+
     @property
     def testcase(self):
         return self._case
@@ -153,13 +158,19 @@ class RegressionTask:
     def succeeded(self):
         return self._current_stage in {'finalize', 'cleanup'}
 
+    @property
+    def timestamps(self):
+        '''The start and end times of the build and run phases of this task
+        expressed in seconds from the Epoch.'''
+        return self._timestamps
+
     def _notify_listeners(self, callback_name):
         for l in self._listeners:
             callback = getattr(l, callback_name)
             callback(self)
 
     def _safe_call(self, fn, *args, **kwargs):
-        if fn.__name__ != 'poll':
+        if fn.__name__ not in ('poll', 'compile_complete'):
             self._current_stage = fn.__name__
 
         try:
@@ -178,22 +189,30 @@ class RegressionTask:
         self._notify_listeners('on_task_setup')
 
     def compile(self):
+        self._timestamps['build_start'] = time.time()
         self._safe_call(self.check.compile)
 
+    def compile_complete(self):
+        return self._safe_call(self.check.compile_complete)
+
     def compile_wait(self):
         self._safe_call(self.check.compile_wait)
+        self._timestamps['build_end'] = time.time()
 
     def run(self):
+        self._timestamps['run_start'] = time.time()
         self._safe_call(self.check.run)
         self._notify_listeners('on_task_run')
 
     def wait(self):
         self._safe_call(self.check.wait)
+        self._timestamps.setdefault('run_end', time.time())
         self.zombie = False
 
     def poll(self):
         finished = self._safe_call(self.check.poll)
         if finished:
+            self._timestamps['run_end'] = time.time()
             self.zombie = True
             self._notify_listeners('on_task_exit')
 
@@ -205,6 +224,34 @@ class RegressionTask:
     def performance(self):
         self._safe_call(self.check.performance)
 
+    def evaluate(self, sanity=True, performance=True):
+        '''Run the sanity and the performance checking stages of the task.
+
+        Unlike :func:`sanity` and :func:`performance`, a failure is not
+        recorded and the listeners are not notified; the failure is returned
+        instead, so that it can be passed later to :func:`fail`. This allows
+        the evaluation to run on a worker thread.
+
+        :returns: The ``exc_info`` of the failure or :class:`None`.
+        '''
+        stages = []
+        if sanity:
+            stages.append(self.check.sanity)
+
+        if performance:
+            stages.append(self.check.performance)
+
+        for fn in stages:
+            self._current_stage = fn.__name__
+            try:
+                with logging.logging_context(self.check) as logger:
+                    logger.debug('entering stage: %s' % self._current_stage)
+                    fn()
+            except BaseException:
+                return sys.exc_info()
+
+        return None
+
     def finalize(self):
         self._current_stage = 'finalize'
         self._notify_listeners('on_task_success')
@@ -256,6 +303,59 @@ class TaskEventListener(abc.ABC):
         '''Called when a regression test has succeeded.'''
 
 
+class _TimeRemainingReport(TaskEventListener):
+    '''Print the estimated time remaining whenever a test case finishes.
+
+    :arg policy: The execution policy estimating the durations.
+    :arg printer: The printer to report to.
+    :arg testcases: The test cases of the session sorted topologically.
+    '''
+
+    def __init__(self, policy, printer, testcases):
+        self._policy = policy
+        self._printer = printer
+        self._testcases = list(testcases)
+        self._unfinished = set(self._testcases)
+
+        # The tasks that have started, indexed by their test case
+        self._tasks = {}
+
+    def _elapsed(self, task):
+        timestamps = task.timestamps
+        started = [timestamps[k] for k in ('build_start', 'run_start')
+                   if k in timestamps]
+        return time.time() - min(started) if started else 0
+
+    def _report(self, task):
+        if task.testcase not in self._unfinished:
+            # A retried test case
+            return
+
+        self._unfinished.discard(task.testcase)
+        unfinished = [c for c in self._testcases if c in self._unfinished]
+        elapsed = {c: self._elapsed(self._tasks[c])
+                   for c in unfinished if c in self._tasks}
+        remaining = self._policy.estimated_duration(unfinished, elapsed)
+        if remaining is not None:
+            self._printer.info('Estimated time remaining: %dh%02dm%02ds' %
+                               seconds_to_hms(remaining))
+
+    def on_task_setup(self, task):
+        self._tasks.setdefault(task.testcase, task)
+
+    def on_task_run(self, task):
+        self._tasks.setdefault(task.testcase, task)
+
+    def on_task_exit(self, task):
+        pass
+
+    def on_task_failure(self, task):
+        self._report(task)
+
+    def on_task_success(self, task):
+        self._report(task)
+
+
 class Runner:
     '''Responsible for executing a set of regression tests based on an
     execution policy.'''
@@ -284,6 +384,15 @@ class Runner:
         self._printer.separator('short double line',
                                 'Running %d check(s)' % num_checks)
         self._printer.timestamp('Started on', 'short double line')
+        duration = self._policy.estimated_duration(testcases)
+        time_report = None
+        if duration is not None:
+            self._printer.info('Estimated duration: %dh%02dm%02ds' %
+                               seconds_to_hms(duration))
+            time_report = _TimeRemainingReport(self._policy, self._printer,
+                                               testcases)
+            self._policy.task_listeners.append(time_report)
+
         self._printer.info('')
         try:
             self._runall(testcases)
@@ -291,6 +400,9 @@ class Runner:
                 self._retry_failed(testcases)
 
         finally:
+            if time_report is not None:
+                self._policy.task_listeners.remove(time_report)
+
             # Print the summary line
             num_failures = len(self._stats.failures())
             self._printer.status(
@@ -328,6 +440,7 @@ class Runner:
             )
 
         self._policy.enter()
+        testcases = self._policy.prioritize(testcases)
         last_check = None
         for t in testcases:
             if last_check is None or last_check.name != t.check.name:
@@ -365,6 +478,12 @@ class ExecutionPolicy(abc.ABC):
         self.printer = None
         self.strict_check = False
 
+        # Cache of build directories to be used by the tests
+        self.build_cache = None
+
+        # History of the runtimes of the test cases
+        self.runtime_history = None
+
         # Scheduler options
         self.sched_flex_alloc_nodes = None
         self.sched_account = None
@@ -385,6 +504,114 @@ class ExecutionPolicy(abc.ABC):
     def enter(self):
         pass
 
+    def estimated_runtime(self, case):
+        '''Return the estimated runtime of ``case`` in seconds.
+
+        The runtime is estimated from the durations of the build, queuing and
+        run phases recorded in the runtime history. If there is no history for
+        ``case``, its time limit is used.
+        '''
+        if self.runtime_history is not None:
+            estimates = [
+                self.runtime_history.estimate(case.check.name,
+                                              case.partition.fullname,
+                                              case.environ.name, phase)
+                for phase in self.runtime_history.PHASES
+            ]
+            if any(e is not None for e in estimates):
+                return sum(e for e in estimates if e is not None)
+
+        time_limit = case.check.time_limit
+        return time_limit.total_seconds() if time_limit else 0
+
+    def _in_history(self, testcases):
+        '''Check if the runtime history holds any of ``testcases``.'''
+        if self.runtime_history is None:
+            return False
+
+        return any(self.runtime_history.num_runs(c.check.name,
+                                                 c.partition.fullname,
+                                                 c.environ.name)
+                   for c in testcases)
+
+    def remaining_runtime(self, case, elapsed=None):
+        '''Return the estimated runtime of ``case`` in seconds that is left
+        after it has been running for ``elapsed`` seconds.'''
+        return max(self.estimated_runtime(case) - (elapsed or 0), 0)
+
+    def estimated_duration(self, testcases, elapsed=None):
+        '''Return the estimated duration in seconds of running ``testcases``
+        or :class:`None` if the runtime history holds none of them.
+
+        :arg elapsed: A dictionary holding the time in seconds that some of
+            ``testcases`` have been running already.
+        '''
+        if not self._in_history(testcases):
+            return None
+
+        elapsed = elapsed or {}
+        return sum(self.remaining_runtime(c, elapsed.get(c))
+                   for c in testcases)
+
+    def _set_expected_runtime(self, task):
+        '''Set the expected runtime of the job of ``task`` from the runtime
+        history, so that it can be polled accordingly.'''
+        job = task.check.job
+        if self.runtime_history is None or job is None:
+            return
+
+        case = task.testcase
+        job.expected_runtime = self.runtime_history.estimate(
+            case.check.name, case.partition.fullname, case.environ.name
+        )
+        time_limit = task.check.time_limit
+        if (job.expected_runtime is not None and time_limit and
+            job.expected_runtime > time_limit.total_seconds()):
+            self.printer.warning(
+                '%s: the time limit of the test is shorter than its '
+                'recorded runtimes (%.0fs)' %
+                (task.check.info(), job.expected_runtime)
+            )
+
+    def _record_runtimes(self, task):
+        '''Record the durations of the phases of a successful task in the
+        runtime history.'''
+        if self.runtime_history is None:
+            return
+
+        check, timestamps = task.check, task.timestamps
+        durations = {}
+        if 'build_end' in timestamps and not check.build_cached:
+            durations['build'] = (timestamps['build_end'] -
+                                  timestamps['build_start'])
+
+        if 'run_end' in timestamps:
+            job = check.job
+            start_time = job.start_time if job else None
+            completion_time = job.completion_time if job else None
+            if start_time and completion_time:
+                durations['queue'] = max(
+                    start_time - timestamps['run_start'], 0
+                )
+                durations['run'] = max(completion_time - start_time, 0)
+            else:
+                durations['run'] = (timestamps['run_end'] -
+                                    timestamps['run_start'])
+
+        if durations:
+            self.runtime_history.record(check.name,
+                                        check.current_partition.fullname,
+                                        check.current_environ.name,
+                                        **durations)
+
+    def prioritize(self, testcases):
+        '''Return the order in which ``testcases`` will be run.
+
+        The test cases are passed sorted topologically and the returned order
+        must respect their dependencies. By default, their order is kept.
+        '''
+        return testcases
+
     def exit(self):
         pass
 
@@ -395,5 +622,8 @@ class ExecutionPolicy(abc.ABC):
         if self.strict_check:
             case.check.strict_check = True
 
+        if self.build_cache is not None:
+            case.check.build_cache = self.build_cache
+
         if self.force_local:
             case.check.local = True
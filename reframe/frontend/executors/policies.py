@@ -3,16 +3,30 @@
 #
 # SPDX-License-Identifier: BSD-3-Clause
 
+import concurrent.futures
 import contextlib
+import heapq
 import itertools
 import math
+import os
+import selectors
+import signal
 import sys
 import time
 
 from datetime import datetime
 
-from reframe.core.exceptions import (TaskDependencyError, TaskExit)
+from reframe.core.exceptions import (JobError, SpawnedProcessError,
+                                     TaskDependencyError, TaskExit)
+from reframe.core.launchers.mpi import (SrunAllocationLauncher, SrunLauncher,
+                                        SrunStepLauncher)
 from reframe.core.logging import getlogger
+from reframe.core.schedulers import JobSubmissionPool
+from reframe.core.schedulers.local import LocalJobScheduler
+from reframe.core.schedulers.registry import getscheduler
+from reframe.core.schedulers.slurm import (JobArrayBatcher, SlurmAllocation,
+                                           SlurmJobScheduler)
+from reframe.frontend.dependency import critical_paths
 from reframe.frontend.executors import (ExecutionPolicy, RegressionTask,
                                         TaskEventListener, ABORT_REASONS)
 
@@ -27,6 +41,38 @@ def _cleanup_all(tasks, *args, **kwargs):
     tasks[:] = [t for t in tasks if t.ref_count]
 
 
+def _requested_resources(check):
+    '''Return the number of nodes, tasks and GPUs requested by ``check``.
+
+    Tests with a flexible number of tasks are considered to request all of
+    the resources of their partition. If the number of tasks per node is not
+    set, each task may end up on a different node, so the test is considered
+    to request as many nodes as tasks, unless it runs locally.
+    '''
+    if check.num_tasks <= 0:
+        return {'nodes': math.inf, 'tasks': math.inf, 'gpus': math.inf}
+
+    partition = check.current_partition
+    if check.num_tasks_per_node:
+        num_nodes = math.ceil(check.num_tasks / check.num_tasks_per_node)
+    elif partition is not None and partition.scheduler.is_local:
+        num_nodes = 1
+    else:
+        num_nodes = check.num_tasks
+
+    return {
+        'nodes': num_nodes,
+        'tasks': check.num_tasks,
+        'gpus': num_nodes * (check.num_gpus_per_node or 0)
+    }
+
+
+def _within_limit(in_use, requested, limit):
+    # A request that exceeds the limit on its own is granted as long as
+    # nothing else is in use
+    return limit is None or in_use == 0 or in_use + requested <= limit
+
+
 class SerialExecutionPolicy(ExecutionPolicy, TaskEventListener):
     def __init__(self):
         super().__init__()
@@ -85,7 +131,7 @@ class SerialExecutionPolicy(ExecutionPolicy, TaskEventListener):
             task.fail(sys.exc_info())
 
     def on_task_setup(self, task):
-        pass
+        self._set_expected_runtime(task)
 
     def on_task_run(self, task):
         pass
@@ -101,6 +147,7 @@ class SerialExecutionPolicy(ExecutionPolicy, TaskEventListener):
 
     def on_task_success(self, task):
         self.printer.status('OK', task.check.info(), just='right')
+        self._record_runtimes(task)
         # update reference count of dependencies
         for c in task.testcase.deps:
             self._task_index[c].ref_count -= 1
@@ -144,6 +191,119 @@ class PollRateFunction:
         return self._a*math.exp(-self._c*x) + self._b
 
 
+class _ChildExitWatcher:
+    '''Wake up the execution loop as soon as a child process exits.
+
+    The ``SIGCHLD`` signal is routed to a self-pipe using
+    :func:`signal.set_wakeup_fd`, which is waited on with a selector.
+    Signals can only be handled by the main thread; if the watcher is started
+    from another thread, :func:`wait` falls back to plain sleeping.
+    '''
+
+    def __init__(self):
+        self._selector = None
+        self._rfd = None
+        self._wfd = None
+        self._old_handler = None
+        self._old_wakeup_fd = None
+        self._notified = False
+
+    @property
+    def active(self):
+        return self._selector is not None
+
+    def start(self):
+        if self.active:
+            return
+
+        rfd, wfd = os.pipe()
+        os.set_blocking(rfd, False)
+        os.set_blocking(wfd, False)
+        try:
+            self._old_wakeup_fd = signal.set_wakeup_fd(wfd)
+        except ValueError as e:
+            getlogger().debug('cannot watch for child exits: %s' % e)
+            os.close(rfd)
+            os.close(wfd)
+            return
+
+        self._rfd, self._wfd = rfd, wfd
+        self._old_handler = signal.signal(signal.SIGCHLD, self._on_sigchld)
+
+        # Do not interrupt system calls that are in progress
+        signal.siginterrupt(signal.SIGCHLD, False)
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self._rfd, selectors.EVENT_READ)
+
+    def stop(self):
+        if not self.active:
+            return
+
+        signal.signal(signal.SIGCHLD, self._old_handler)
+        signal.set_wakeup_fd(self._old_wakeup_fd)
+        self._selector.close()
+        os.close(self._rfd)
+        os.close(self._wfd)
+        self._selector = None
+        self._rfd = None
+        self._wfd = None
+
+    def _on_sigchld(self, signum, frame):
+        # The actual notification is done through the wakeup fd
+        pass
+
+    def _drain(self):
+        with contextlib.suppress(BlockingIOError):
+            while os.read(self._rfd, 512):
+                pass
+
+    def wait(self, timeout, exited=None):
+        '''Wait for at most ``timeout`` seconds for a child process to exit.
+
+        Any child process raises ``SIGCHLD``, including the helper commands
+        that the execution loop itself spawns. If ``exited`` is given, a
+        signal wakes up the caller only if ``exited()`` returns :class:`True`;
+        otherwise the wait goes on until the timeout expires.
+
+        :returns: :class:`True` if woken up before the timeout expired,
+            :class:`False` otherwise.
+        '''
+        if not self.active:
+            time.sleep(timeout)
+            return False
+
+        # Discard any signals received before we started waiting; a child
+        # that exited in the meantime is caught by checking ``exited``
+        self._drain()
+        if exited is not None and exited():
+            return True
+
+        deadline = time.monotonic() + timeout
+        while True:
+            if self._notified:
+                self._notified = False
+                return True
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+
+            if self._selector.select(remaining):
+                self._drain()
+                if exited is None or exited():
+                    return True
+
+    def notify(self):
+        '''Wake up a pending :func:`wait`; this may be called from any
+        thread.'''
+        if not self.active:
+            return
+
+        self._notified = True
+        with contextlib.suppress(OSError):
+            os.write(self._wfd, b'\0')
+
+
 class AsynchronousExecutionPolicy(ExecutionPolicy, TaskEventListener):
     def __init__(self):
 
@@ -155,17 +315,36 @@ class AsynchronousExecutionPolicy(ExecutionPolicy, TaskEventListener):
         # All currently running tasks
         self._running_tasks = []
 
+        # Tasks whose build job is still running
+        self._building_tasks = []
+
         # Tasks that need to be finalized
         self._completed_tasks = []
 
+        # Limit of concurrent sanity and performance evaluations; tasks are
+        # evaluated on the execution loop if it is 0
+        self.max_finalize_jobs = 4
+        self._finalize_pool = None
+
+        # Futures of the evaluations in progress indexed by their task
+        self._finalizing = {}
+
         # Retired tasks that need to be cleaned up
         self._retired_tasks = []
 
         # Counts of running tasks per partition
         self._running_tasks_counts = {}
 
-        # Ready tasks to be executed per partition
+        # Times when the jobs of the running tasks are due for polling
+        self._next_poll = {}
+
+        # Ready tasks to be executed per partition; these are kept in heaps
+        # ordered by their priority and, then, by their readiness
         self._ready_tasks = {}
+        self._ready_count = itertools.count()
+
+        # Priorities of the test cases
+        self._priorities = {}
 
         # Tasks that are waiting for dependencies
         self._waiting_tasks = []
@@ -173,6 +352,34 @@ class AsynchronousExecutionPolicy(ExecutionPolicy, TaskEventListener):
         # Job limit per partition
         self._max_jobs = {}
 
+        # Limit of concurrent build jobs
+        self.max_build_jobs = os.cpu_count() or 1
+
+        # Limit of concurrent job submissions; jobs are submitted
+        # synchronously if it is 0
+        self.max_submit_jobs = 4
+        self._submission_pool = None
+
+        # Limits of the concurrent jobs and of the nodes, tasks and GPUs
+        # they request across all partitions
+        self.max_jobs = None
+        self.max_nodes = None
+        self.max_tasks = None
+        self.max_gpus = None
+
+        # Submit compatible Slurm jobs as job arrays
+        self.use_job_arrays = False
+        self._array_batcher = JobArrayBatcher()
+
+        # Submit the Slurm jobs of dependent tests before their dependencies
+        # have finished
+        self.use_job_dependencies = False
+
+        # Tasks that were submitted before their dependencies finished,
+        # indexed by the dependencies they wait for
+        self._held_tasks = {}
+
+        self._child_watcher = _ChildExitWatcher()
         self.task_listeners.append(self)
 
     def _remove_from_running(self, task):
@@ -187,6 +394,39 @@ class AsynchronousExecutionPolicy(ExecutionPolicy, TaskEventListener):
         else:
             partname = task.check.current_partition.fullname
             self._running_tasks_counts[partname] -= 1
+            self._next_poll.pop(task, None)
+
+    def _remove_from_building(self, task):
+        with contextlib.suppress(ValueError):
+            self._building_tasks.remove(task)
+
+    def _num_active_tasks(self, partname):
+        '''Return the number of tasks occupying a job slot of a partition.
+
+        Tasks are occupying a job slot from the moment they start building.
+        '''
+        num_building = sum(
+            1 for t in self._building_tasks
+            if t.check.current_partition.fullname == partname
+        )
+        return self._running_tasks_counts[partname] + num_building
+
+    def _build_limit_reached(self):
+        return len(self._building_tasks) >= self.max_build_jobs
+
+    def _resources_in_use(self, partname=None):
+        '''Return the resources requested by the active tasks of a
+        partition or of all partitions if ``partname`` is :class:`None`.'''
+        ret = {'nodes': 0, 'tasks': 0, 'gpus': 0}
+        for t in itertools.chain(self._running_tasks, self._building_tasks):
+            if (partname is not None and
+                t.check.current_partition.fullname != partname):
+                continue
+
+            for res, num in _requested_resources(t.check).items():
+                ret[res] += num
+
+        return ret
 
     def deps_failed(self, task):
         return any(self._task_index[c].failed for c in task.testcase.deps)
@@ -194,28 +434,85 @@ class AsynchronousExecutionPolicy(ExecutionPolicy, TaskEventListener):
     def deps_succeeded(self, task):
         return all(self._task_index[c].succeeded for c in task.testcase.deps)
 
-    def on_task_setup(self, task):
+    def prioritize(self, testcases):
+        '''Run first the test cases that lie on the longest chains of
+        dependent test cases.
+
+        Test cases are prioritized by the estimated runtime of the longest
+        chain of test cases starting from them. Since a test case lies always
+        on a longer chain than its dependents, this order is also a
+        topological one.
+        '''
+        self._priorities = critical_paths(testcases, self.estimated_runtime)
+        return sorted(testcases, key=lambda c: -self._priorities[c])
+
+    def estimated_duration(self, testcases, elapsed=None):
+        '''Return the estimated runtime of the longest chain of dependent
+        test cases.
+
+        This assumes that the execution is not limited by the available job
+        slots.
+        '''
+        if not self._in_history(testcases):
+            return None
+
+        elapsed = elapsed or {}
+        paths = critical_paths(
+            testcases, lambda c: self.remaining_runtime(c, elapsed.get(c))
+        )
+        return max(paths.values(), default=0)
+
+    def _push_ready_task(self, task):
         partname = task.check.current_partition.fullname
-        self._ready_tasks[partname].append(task)
+        priority = self._priorities.get(task.testcase, 0)
+        heapq.heappush(self._ready_tasks[partname],
+                       (-priority, next(self._ready_count), task))
+
+    def enter(self):
+        super().enter()
+        if self.max_submit_jobs:
+            self._submission_pool = JobSubmissionPool(self.max_submit_jobs)
+
+        if self.max_finalize_jobs:
+            self._finalize_pool = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.max_finalize_jobs
+            )
+
+    def on_task_setup(self, task):
+        self._set_expected_runtime(task)
+        self._push_ready_task(task)
+        job = task.check.job
+        if (self.use_job_arrays and job is not None and
+            isinstance(job.scheduler, SlurmJobScheduler)):
+            job.scheduler.defer_submission(self._array_batcher)
+        elif (self._submission_pool is not None and job is not None and
+              not isinstance(job.scheduler, LocalJobScheduler)):
+            job.defer_submission(self._submission_pool)
 
     def on_task_run(self, task):
         partname = task.check.current_partition.fullname
         self._running_tasks_counts[partname] += 1
         self._running_tasks.append(task)
+        self._schedule_poll(task)
 
     def on_task_failure(self, task):
         if task.failed_stage == 'cleanup':
             self.printer.status('ERROR', task.check.info(), just='right')
         else:
+            self._remove_from_building(task)
             self._remove_from_running(task)
             self.printer.status('FAIL', task.check.info(), just='right')
+            self._fail_held_tasks(task)
 
     def on_task_success(self, task):
         self.printer.status('OK', task.check.info(), just='right')
+        self._record_runtimes(task)
         # update reference count of dependencies
         for c in task.testcase.deps:
             self._task_index[c].ref_count -= 1
 
+        # Slurm releases the jobs held by this task by itself
+        self._held_tasks.pop(task, None)
         self._retired_tasks.append(task)
 
     def on_task_exit(self, task):
@@ -225,28 +522,96 @@ class AsynchronousExecutionPolicy(ExecutionPolicy, TaskEventListener):
 
     def _setup_task(self, task):
         if self.deps_succeeded(task):
-            try:
-                task.setup(task.testcase.partition,
-                           task.testcase.environ,
-                           sched_flex_alloc_nodes=self.sched_flex_alloc_nodes,
-                           sched_account=self.sched_account,
-                           sched_partition=self.sched_partition,
-                           sched_reservation=self.sched_reservation,
-                           sched_nodelist=self.sched_nodelist,
-                           sched_exclude_nodelist=self.sched_exclude_nodelist,
-                           sched_options=self.sched_options)
-            except TaskExit:
-                return False
-            else:
-                return True
+            return self._do_setup(task)
         elif self.deps_failed(task):
             exc = TaskDependencyError('dependencies failed')
             task.fail((type(exc), exc, None))
             return False
-        else:
-            # Not all dependencies have finished yet
+
+        # Not all dependencies have finished yet
+        pending_deps = self._pending_deps(task)
+        if pending_deps is None:
             return False
 
+        # Submit the job now and let Slurm hold it until the jobs of its
+        # dependencies have completed successfully; the task is not
+        # scheduled before we return
+        if not self._do_setup(task):
+            return False
+
+        task.check.job.scheduler.add_dependencies(
+            *(t.check.job for t in pending_deps)
+        )
+        for t in pending_deps:
+            self._held_tasks.setdefault(t, []).append(task)
+
+        getlogger().debug('submitting %s before its dependencies' %
+                          task.check.info())
+        return True
+
+    def _do_setup(self, task):
+        try:
+            task.setup(task.testcase.partition,
+                       task.testcase.environ,
+                       sched_flex_alloc_nodes=self.sched_flex_alloc_nodes,
+                       sched_account=self.sched_account,
+                       sched_partition=self.sched_partition,
+                       sched_reservation=self.sched_reservation,
+                       sched_nodelist=self.sched_nodelist,
+                       sched_exclude_nodelist=self.sched_exclude_nodelist,
+                       sched_options=self.sched_options)
+        except TaskExit:
+            return False
+        else:
+            return True
+
+    def _pending_deps(self, task):
+        '''Return the tasks of the unfinished dependencies of ``task`` if
+        its job may be submitted before they finish, :class:`None`
+        otherwise.
+
+        This is possible only if the job of the task and the jobs of all of
+        its unfinished dependencies are Slurm jobs and the latter are
+        already submitted and running.
+        '''
+        if (not self.use_job_dependencies or task.check.local or
+            not issubclass(task.testcase.partition.scheduler,
+                           SlurmJobScheduler)):
+            return None
+
+        ret = []
+        for c in task.testcase.deps:
+            t = self._task_index[c]
+            if t.succeeded:
+                continue
+
+            job = t.check.job
+            if (t not in self._running_tasks or job.jobid is None or
+                not isinstance(job.scheduler, SlurmJobScheduler)):
+                return None
+
+            ret.append(t)
+
+        return ret
+
+    def _fail_held_tasks(self, task):
+        '''Cancel the jobs held by Slurm until ``task`` has completed
+        successfully.'''
+        for t in self._held_tasks.pop(task, []):
+            if t.failed:
+                continue
+
+            job = t.check.job
+            if job.jobid is not None and not t.zombie:
+                try:
+                    job.cancel()
+                except (JobError, SpawnedProcessError) as e:
+                    getlogger().debug('could not cancel job %s: %s' %
+                                      (job.jobid, e))
+
+            exc = TaskDependencyError('dependencies failed')
+            t.fail((type(exc), exc, None))
+
     def runcase(self, case):
         super().runcase(case)
         check, partition, environ = case
@@ -276,21 +641,35 @@ class AsynchronousExecutionPolicy(ExecutionPolicy, TaskEventListener):
 
                 return
 
-            if self._running_tasks_counts[partname] >= partition.max_jobs:
+            if self._num_active_tasks(partname) >= partition.max_jobs:
                 # Make sure that we still exceeded the job limit
                 getlogger().debug('reached job limit (%s) for partition %s' %
                                   (partition.max_jobs, partname))
                 self._poll_tasks()
+            elif self._build_limit_reached():
+                getlogger().debug('reached build job limit (%s)' %
+                                  self.max_build_jobs)
+                self._poll_tasks()
+            elif not self._can_schedule(task):
+                getlogger().debug('reached resource limits for partition %s' %
+                                  partname)
+                self._poll_tasks()
 
-            if self._running_tasks_counts[partname] < partition.max_jobs:
-                # Task was put in _ready_tasks during setup
-                self._ready_tasks[partname].pop()
-                self._reschedule(task)
-            else:
+            # Task was put in _ready_tasks during setup, but a ready task of
+            # higher priority may be run in its place
+            next_task = None
+            if (self._num_active_tasks(partname) < partition.max_jobs and
+                not self._build_limit_reached()):
+                next_task = self._next_ready_task(partname)
+                if next_task is not None:
+                    self._reschedule(next_task)
+
+            if next_task is not task:
                 self.printer.status('HOLD', task.check.info(), just='right')
         except TaskExit:
             if not task.failed:
-                self._reschedule(task)
+                self._reschedule_all()
+
             return
         except ABORT_REASONS as e:
             if not task.failed:
@@ -304,9 +683,125 @@ class AsynchronousExecutionPolicy(ExecutionPolicy, TaskEventListener):
     def _poll_tasks(self):
         '''Update the counts of running checks per partition.'''
         getlogger().debug('updating counts for running test cases')
-        getlogger().debug('polling %s task(s)' % len(self._running_tasks))
-        for t in self._running_tasks:
-            t.poll()
+        self._poll_builds()
+        self._submit_deferred_jobs()
+        self._collect_submissions()
+        t_now = time.time()
+        due_tasks = [t for t in self._running_tasks
+                     if (not self._submission_pending(t) and
+                         self._next_poll.get(t, t_now) <= t_now)]
+        getlogger().debug('polling %s out of %s task(s)' %
+                          (len(due_tasks), len(self._running_tasks)))
+        self._poll_jobs(due_tasks)
+        for t in due_tasks:
+            if not t.poll():
+                self._schedule_poll(t)
+
+    def _schedule_poll(self, task):
+        '''Set the time when the job of ``task`` is due for polling.
+
+        Jobs of the local scheduler are cheap to poll and they are polled
+        every time.
+        '''
+        job = task.check.job
+        if (job is None or isinstance(job.scheduler, LocalJobScheduler) or
+            self._submission_pending(task)):
+            return
+
+        self._next_poll[task] = time.time() + job.next_poll_interval()
+
+    def _time_to_next_poll(self):
+        '''Return the time until the next job is due for polling or
+        :class:`None` if every job is polled every time.'''
+        if (not self._next_poll or self._building_tasks or
+            len(self._next_poll) < len(self._running_tasks)):
+            return None
+
+        return max(min(self._next_poll.values()) - time.time(), 0)
+
+    def _poll_builds(self):
+        '''Submit the run jobs of all tasks that have finished building.'''
+        getlogger().debug('polling %s build(s)' % len(self._building_tasks))
+        for task in list(self._building_tasks):
+            with contextlib.suppress(TaskExit):
+                if task.compile_complete():
+                    self._remove_from_building(task)
+                    task.compile_wait()
+                    task.run()
+
+    def _submit_deferred_jobs(self):
+        '''Submit the jobs collected for submission as job arrays.'''
+        if not self._array_batcher.num_pending:
+            return
+
+        getlogger().debug('submitting %s deferred job(s)' %
+                          self._array_batcher.num_pending)
+        failures = dict(self._array_batcher.flush())
+        for task in list(self._running_tasks):
+            exc = failures.get(task.check.job)
+            if exc is not None:
+                task.fail((type(exc), exc, exc.__traceback__))
+
+    def _local_job_exited(self):
+        '''Check if a build or a local run job of the active tasks has
+        exited.'''
+        for task in self._building_tasks:
+            if task.check.compile_complete():
+                return True
+
+        for task in self._running_tasks:
+            job = task.check.job
+            if (isinstance(job.scheduler, LocalJobScheduler) and
+                job.jobid is not None and
+                not self._submission_pending(task) and job.finished()):
+                return True
+
+        return False
+
+    def _submission_pending(self, task):
+        return (self._submission_pool is not None and
+                self._submission_pool.is_pending(task.check.job))
+
+    def _collect_submissions(self, wait=False):
+        '''Handle the jobs whose submission by the submission pool has
+        finished.
+
+        :arg wait: Wait for all the pending submissions to finish.
+        '''
+        if self._submission_pool is None:
+            return
+
+        running = {t.check.job: t for t in self._running_tasks}
+        for job, exc in self._submission_pool.completed(wait):
+            task = running.get(job)
+            if task is None:
+                # The task has failed meanwhile
+                if exc is None:
+                    with contextlib.suppress(JobError, SpawnedProcessError):
+                        job.cancel()
+            elif exc is not None:
+                task.fail((type(exc), exc, exc.__traceback__))
+            else:
+                getlogger().debug('submitted job %s of %s' %
+                                  (job.jobid, task.check.info()))
+                self._schedule_poll(task)
+
+    def _poll_jobs(self, tasks):
+        '''Poll the jobs of ``tasks`` in bulk.
+
+        Jobs are grouped by their scheduler backend, so that backends that
+        support it can retrieve the state of all of their jobs at once.
+        '''
+        jobs_by_sched = {}
+        for t in tasks:
+            job = t.check.job
+            if job is None or job.jobid is None:
+                continue
+
+            jobs_by_sched.setdefault(type(job.scheduler), []).append(job)
+
+        for jobs in jobs_by_sched.values():
+            jobs[0].scheduler.poll(*jobs)
 
     def _setup_all(self):
         still_waiting = []
@@ -317,16 +812,33 @@ class AsynchronousExecutionPolicy(ExecutionPolicy, TaskEventListener):
         self._waiting_tasks[:] = still_waiting
 
     def _finalize_all(self):
+        self._collect_finalized()
         getlogger().debug('finalizing tasks: %s', len(self._completed_tasks))
+        held = []
         while True:
             try:
                 task = self._completed_tasks.pop()
             except IndexError:
                 break
 
+            if task.failed:
+                # The dependencies of a task held by Slurm have failed
+                continue
+
+            if not self.deps_succeeded(task):
+                # Task was held by Slurm; its dependencies must be
+                # finalized first
+                held.append(task)
+                continue
+
             getlogger().debug('finalizing task: %s' % task.check.info())
-            with contextlib.suppress(TaskExit):
-                self._finalize_task(task)
+            if self._finalize_pool is not None:
+                self._evaluate_async(task)
+            else:
+                with contextlib.suppress(TaskExit):
+                    self._finalize_task(task)
+
+        self._completed_tasks += held
 
     def _finalize_task(self, task):
         if not self.skip_sanity_check:
@@ -337,17 +849,75 @@ class AsynchronousExecutionPolicy(ExecutionPolicy, TaskEventListener):
 
         task.finalize()
 
+    def _evaluate_async(self, task):
+        '''Evaluate the sanity and performance of ``task`` on the
+        finalization pool.
+
+        The outcome is handled on the execution loop by
+        :func:`_collect_finalized`; the loop is woken up as soon as the
+        evaluation finishes.
+        '''
+        future = self._finalize_pool.submit(
+            task.evaluate, not self.skip_sanity_check,
+            not self.skip_performance_check
+        )
+        self._finalizing[task] = future
+        future.add_done_callback(lambda f: self._child_watcher.notify())
+
+    def _collect_finalized(self, wait=False):
+        '''Finalize the tasks whose evaluation has finished.
+
+        :arg wait: Wait for all the evaluations in progress to finish.
+        '''
+        if not self._finalizing:
+            return
+
+        if wait:
+            concurrent.futures.wait(self._finalizing.values())
+
+        for task, future in list(self._finalizing.items()):
+            if not future.done():
+                continue
+
+            del self._finalizing[task]
+            exc_info = future.result()
+            if exc_info is None:
+                task.finalize()
+                continue
+
+            task.fail(exc_info)
+            if isinstance(exc_info[1], ABORT_REASONS):
+                raise exc_info[1]
+
     def _failall(self, cause):
         '''Mark all tests as failures'''
+        # Let the submissions in progress finish, so that their jobs can be
+        # cancelled
+        self._collect_submissions(wait=True)
+
+        # Evaluations cannot be interrupted; drop the pending ones and fail
+        # the tasks of all of them
+        for task, future in self._finalizing.items():
+            future.cancel()
+            self._completed_tasks.append(task)
+
+        concurrent.futures.wait(self._finalizing.values())
+        self._finalizing.clear()
         try:
             while True:
                 self._running_tasks.pop().abort(cause)
         except IndexError:
             pass
 
+        try:
+            while True:
+                self._building_tasks.pop().abort(cause)
+        except IndexError:
+            pass
+
         for ready_list in self._ready_tasks.values():
             getlogger().debug('ready list size: %s' % len(ready_list))
-            for task in ready_list:
+            for *_, task in ready_list:
                 task.abort(cause)
 
         for task in itertools.chain(self._waiting_tasks,
@@ -358,19 +928,79 @@ class AsynchronousExecutionPolicy(ExecutionPolicy, TaskEventListener):
     def _reschedule(self, task):
         getlogger().debug('scheduling test case for running')
 
+        # The run job is submitted as soon as the build job finishes
         task.compile()
-        task.compile_wait()
-        task.run()
+        if task.compile_complete():
+            task.compile_wait()
+            task.run()
+        else:
+            self._building_tasks.append(task)
+
+    def _can_schedule(self, task):
+        '''Check if the resources needed by ``task`` are available.'''
+        num_active = len(self._running_tasks) + len(self._building_tasks)
+        if self.max_jobs is not None and num_active >= self.max_jobs:
+            return False
+
+        partition = task.check.current_partition
+        part_limits = {'nodes': partition.max_nodes,
+                       'tasks': partition.max_tasks,
+                       'gpus': partition.max_gpus}
+        global_limits = {'nodes': self.max_nodes,
+                         'tasks': self.max_tasks,
+                         'gpus': self.max_gpus}
+        requested = _requested_resources(task.check)
+        for limits, partname in ((part_limits, partition.fullname),
+                                 (global_limits, None)):
+            if all(lim is None for lim in limits.values()):
+                continue
+
+            in_use = self._resources_in_use(partname)
+            if not all(_within_limit(in_use[r], requested[r], limits[r])
+                       for r in requested):
+                return False
+
+        return True
+
+    def _next_ready_task(self, partname):
+        '''Remove and return the ready task of ``partname`` with the highest
+        priority that can be scheduled.
+
+        Tasks that cannot be scheduled yet are skipped, so that tasks of lower
+        priority may fill in the available resources.
+        '''
+        ready_tasks = self._ready_tasks[partname]
+        skipped = []
+        ret = None
+        while ready_tasks:
+            entry = heapq.heappop(ready_tasks)
+            if entry[-1].failed:
+                # The dependencies of a task held by Slurm have failed
+                continue
+
+            if self._can_schedule(entry[-1]):
+                ret = entry[-1]
+                break
+
+            skipped.append(entry)
+
+        for entry in skipped:
+            heapq.heappush(ready_tasks, entry)
+
+        return ret
 
     def _reschedule_all(self):
         for partname, num_jobs in self._running_tasks_counts.items():
             assert(num_jobs >= 0)
-            num_empty_slots = self._max_jobs[partname] - num_jobs
+            num_empty_slots = (self._max_jobs[partname] -
+                               self._num_active_tasks(partname))
             num_rescheduled = 0
             for _ in range(num_empty_slots):
-                try:
-                    task = self._ready_tasks[partname].pop()
-                except IndexError:
+                if self._build_limit_reached():
+                    break
+
+                task = self._next_ready_task(partname)
+                if task is None:
                     break
 
                 self._reschedule(task)
@@ -380,39 +1010,318 @@ class AsynchronousExecutionPolicy(ExecutionPolicy, TaskEventListener):
                 getlogger().debug('rescheduled %s job(s) on %s' %
                                   (num_rescheduled, partname))
 
+    def _wait_idle(self):
+        '''Wait for the policy to make progress when no tasks are active.
+
+        Subclasses that acquire resources in the background should wait for
+        them here instead of letting the scheduling loop spin.
+        '''
+
     def exit(self):
         self.printer.separator('short single line',
                                'waiting for spawned checks to finish')
         pollrate = PollRateFunction(0.2, 60)
         num_polls = 0
         t_start = datetime.now()
-        while (self._running_tasks or self._waiting_tasks):
-            getlogger().debug('running tasks: %s' % len(self._running_tasks))
-            num_polls += len(self._running_tasks)
-            try:
-                self._poll_tasks()
-                self._finalize_all()
-                self._setup_all()
-                self._reschedule_all()
-                _cleanup_all(self._retired_tasks, not self.keep_stage_files)
-                t_elapsed = (datetime.now() - t_start).total_seconds()
-                real_rate = num_polls / t_elapsed
-                getlogger().debug(
-                    'polling rate (real): %.3f polls/sec' % real_rate)
 
-                if len(self._running_tasks):
-                    desired_rate = pollrate(t_elapsed, real_rate)
+        # Local jobs wake us up as soon as they exit; the polling rate
+        # function paces the polling of the jobs of the batch schedulers
+        child_watcher = self._child_watcher
+        child_watcher.start()
+        try:
+            while (self._running_tasks or self._building_tasks or
+                   self._waiting_tasks or self._completed_tasks or
+                   self._finalizing or any(self._ready_tasks.values())):
+                getlogger().debug(
+                    'running tasks: %s' % len(self._running_tasks))
+                getlogger().debug(
+                    'building tasks: %s' % len(self._building_tasks))
+                num_active = (len(self._running_tasks) +
+                              len(self._building_tasks))
+                num_polls += num_active
+                try:
+                    self._poll_tasks()
+                    self._finalize_all()
+                    self._setup_all()
+                    self._reschedule_all()
+                    self._submit_deferred_jobs()
+                    _cleanup_all(self._retired_tasks,
+                                 not self.keep_stage_files)
+                    t_elapsed = (datetime.now() - t_start).total_seconds()
+                    real_rate = num_polls / t_elapsed
                     getlogger().debug(
-                        'polling rate (desired): %.3f' % desired_rate)
-                    t = len(self._running_tasks) / desired_rate
-                    getlogger().debug('sleeping: %.3fs' % t)
-                    time.sleep(t)
-
-            except TaskExit:
-                self._reschedule_all()
-            except ABORT_REASONS as e:
-                self._failall(e)
-                raise
+                        'polling rate (real): %.3f polls/sec' % real_rate)
+
+                    if num_active:
+                        # If only jobs with a polling interval of their own
+                        # are active, sleep until the next one is due
+                        t = self._time_to_next_poll()
+                        if t is None:
+                            desired_rate = pollrate(t_elapsed, real_rate)
+                            getlogger().debug(
+                                'polling rate (desired): %.3f' %
+                                desired_rate)
+                            t = num_active / desired_rate
+
+                        getlogger().debug('sleeping: %.3fs' % t)
+                        if child_watcher.wait(t, self._local_job_exited):
+                            getlogger().debug('woken up by a signal')
+                    elif self._finalizing:
+                        # Only evaluations are in progress
+                        concurrent.futures.wait(
+                            self._finalizing.values(),
+                            return_when=concurrent.futures.FIRST_COMPLETED
+                        )
+                    else:
+                        self._wait_idle()
+
+                except TaskExit:
+                    self._reschedule_all()
+                except ABORT_REASONS as e:
+                    self._failall(e)
+                    raise
+        finally:
+            # The evaluations notify the watcher when they finish
+            if self._finalize_pool is not None:
+                self._finalize_pool.shutdown()
+
+            child_watcher.stop()
+            if self._submission_pool is not None:
+                # Cancel the jobs of the tasks that failed while their
+                # submission was in progress
+                self._collect_submissions(wait=True)
+                self._submission_pool.shutdown()
 
         self.printer.separator('short single line',
                                'all spawned checks have finished\n')
+
+
+class PilotJobExecutionPolicy(AsynchronousExecutionPolicy):
+    '''Run the test cases as job steps of a single Slurm allocation.
+
+    An allocation of :attr:`pilot_num_nodes` nodes is requested for every
+    Slurm partition as soon as the first test case that may run in it is set
+    up. Test cases that are launched with ``srun`` are then run as ``srun
+    --exclusive`` job steps inside this allocation, each one on its own set of
+    nodes, and their completion is detected as soon as their job step
+    finishes. Test cases that do not fit in the allocation are submitted as
+    usual.
+
+    The allocations are acquired in the background, so that the test cases
+    of the other partitions keep running while they are pending.
+    '''
+
+    def __init__(self):
+        super().__init__()
+
+        # Number of nodes and time limit of the allocations
+        self.pilot_num_nodes = 1
+        self.pilot_time_limit = None
+
+        # Allocations per partition; None if no allocation could be obtained
+        self._allocations = {}
+
+        # Pending allocations per partition and the futures acquiring them
+        self._pending_allocations = {}
+
+        # Allocations and nodes used by the running tasks
+        self._task_nodes = {}
+
+    def _num_nodes(self, check):
+        '''Return the number of nodes needed by ``check`` or :class:`None`
+        if it cannot be determined.'''
+        if check.num_tasks == 1:
+            return 1
+
+        if check.num_tasks <= 0 or not check.num_tasks_per_node:
+            return None
+
+        return math.ceil(check.num_tasks / check.num_tasks_per_node)
+
+    def _fits_allocation(self, task):
+        '''Check if ``task`` may run as a job step of an allocation.'''
+        job = task.check.job
+        if (job is None or
+            not isinstance(job.scheduler, SlurmJobScheduler) or
+            type(job.launcher) not in (SrunLauncher, SrunAllocationLauncher)):
+            return False
+
+        # Job steps cannot wait for other jobs
+        if job.scheduler.dependencies:
+            return False
+
+        num_nodes = self._num_nodes(task.check)
+        return num_nodes is not None and num_nodes <= self.pilot_num_nodes
+
+    def _request_allocation(self, task):
+        '''Start acquiring the allocation of the partition of ``task``, if
+        it may run in one and it is not requested already.'''
+        partition = task.check.current_partition
+        if (partition.fullname in self._allocations or
+            partition.fullname in self._pending_allocations or
+            not self._fits_allocation(task)):
+            return
+
+        options = ['--job-name=rfm_pilot', *partition.access]
+        if self.pilot_time_limit:
+            options.append('--time=%s' % self.pilot_time_limit)
+
+        if self.sched_partition:
+            options.append('--partition=%s' % self.sched_partition)
+
+        if self.sched_account:
+            options.append('--account=%s' % self.sched_account)
+
+        if self.sched_reservation:
+            options.append('--reservation=%s' % self.sched_reservation)
+
+        allocation = SlurmAllocation(self.pilot_num_nodes, options)
+        self.printer.status('ALLOC', '%s node(s) on %s' %
+                            (self.pilot_num_nodes, partition.fullname),
+                            just='right')
+
+        # Each allocation is acquired in a thread of its own; the thread
+        # exits as soon as the allocation is granted or fails
+        pool = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self._pending_allocations[partition.fullname] = (
+            allocation, pool.submit(allocation.acquire)
+        )
+        pool.shutdown(wait=False)
+
+    def _collect_allocations(self):
+        '''Move the allocations that were acquired or could not be acquired
+        out of the pending ones.'''
+        for partname, (allocation, future) in list(
+                self._pending_allocations.items()):
+            if not future.done():
+                continue
+
+            del self._pending_allocations[partname]
+            try:
+                future.result()
+            except (JobError, SpawnedProcessError) as e:
+                getlogger().warning('could not obtain an allocation on %s: '
+                                    '%s; submitting tests as separate jobs' %
+                                    (partname, e))
+                allocation = None
+
+            self._allocations[partname] = allocation
+
+    def _setup_task(self, task):
+        if not super()._setup_task(task):
+            return False
+
+        self._request_allocation(task)
+        return True
+
+    def _poll_tasks(self):
+        self._collect_allocations()
+        super()._poll_tasks()
+
+    def _wait_idle(self):
+        if (self._running_tasks or self._building_tasks or
+            self._completed_tasks or not self._pending_allocations):
+            return
+
+        # Only tasks waiting for an allocation are left
+        concurrent.futures.wait(
+            [f for _, f in self._pending_allocations.values()],
+            return_when=concurrent.futures.FIRST_COMPLETED
+        )
+
+    def _allocation_of(self, task):
+        '''Return the allocation to run ``task`` in or :class:`None` if the
+        task must be submitted as a separate job.'''
+        if not self._fits_allocation(task):
+            return None
+
+        return self._allocations.get(task.check.current_partition.fullname)
+
+    def _can_schedule(self, task):
+        if not super()._can_schedule(task):
+            return False
+
+        partname = task.check.current_partition.fullname
+        if (partname in self._pending_allocations and
+            self._fits_allocation(task)):
+            # Wait until the allocation is granted
+            return False
+
+        allocation = self._allocation_of(task)
+        if allocation is None:
+            return True
+
+        return allocation.num_free_nodes >= self._num_nodes(task.check)
+
+    def _reschedule(self, task):
+        allocation = self._allocation_of(task)
+        if allocation is not None:
+            nodes = allocation.allocate(self._num_nodes(task.check))
+            if nodes is None:
+                # Wait until enough nodes are released
+                self._push_ready_task(task)
+                return
+
+            getlogger().debug('placing %s on nodes: %s' %
+                              (task.check.info(), ','.join(nodes)))
+            self._task_nodes[task] = (allocation, nodes)
+            job = task.check.job
+            launcher = SrunStepLauncher(allocation.jobid, nodes)
+            launcher.options = job.launcher.options
+            job.launcher = launcher
+            job.scheduler = getscheduler('local')()
+            job.defer_submission(None)
+
+        super()._reschedule(task)
+
+    def _release_nodes(self, task):
+        try:
+            allocation, nodes = self._task_nodes.pop(task)
+        except KeyError:
+            return
+
+        allocation.deallocate(nodes)
+
+    def on_task_exit(self, task):
+        super().on_task_exit(task)
+        self._release_nodes(task)
+
+    def on_task_failure(self, task):
+        super().on_task_failure(task)
+        self._release_nodes(task)
+
+    def _release_allocations(self):
+        # Withdraw the pending requests; allocations granted in the meantime
+        # are released along with the rest
+        pending = self._pending_allocations
+        for partname, (allocation, future) in pending.items():
+            allocation.revoke()
+            with contextlib.suppress(JobError, SpawnedProcessError):
+                future.result()
+
+            self._allocations[partname] = allocation
+
+        self._pending_allocations = {}
+        for allocation in self._allocations.values():
+            if allocation is None:
+                continue
+
+            try:
+                allocation.release()
+            except SpawnedProcessError as e:
+                getlogger().warning('could not release allocation %s: %s' %
+                                    (allocation.jobid, e))
+
+        self._allocations = {}
+
+    def _failall(self, cause):
+        try:
+            super()._failall(cause)
+        finally:
+            self._release_allocations()
+
+    def exit(self):
+        try:
+            super().exit()
+        finally:
+            self._release_allocations()
@@ -9,10 +9,16 @@
 
 import ast
 import collections
+import concurrent.futures
+import hashlib
+import json
 import os
 
+import reframe
 import reframe.core.debug as debug
+import reframe.core.runtime as rt
 import reframe.utility as util
+import reframe.utility.os_ext as os_ext
 from reframe.core.exceptions import NameConflictError, RegressionTestLoadError
 from reframe.core.logging import getlogger
 
@@ -36,13 +42,41 @@ class RegressionCheckValidator(ast.NodeVisitor):
             self._has_import = True
 
 
+def _validate_file(filename):
+    '''Check if `filename` is a valid Reframe source file.
+
+    This is a module-level function, so that it can be sent to the worker
+    processes when loading tests in parallel.'''
+
+    with open(filename, 'r') as f:
+        source_tree = ast.parse(f.read(), filename)
+
+    validator = RegressionCheckValidator()
+    validator.visit(source_tree)
+    return validator.valid
+
+
 class RegressionCheckLoader:
-    def __init__(self, load_path, prefix='',
-                 recurse=False, ignore_conflicts=False):
+    '''Loader of regression tests from files.
+
+    If ``num_workers`` is greater than one, test files are loaded in
+    parallel: the source files are validated by a pool of worker processes
+    and the test modules are imported and their tests instantiated by a pool
+    of threads. Tests are always registered in the order of the files, so
+    that name conflicts are detected deterministically.
+
+    If ``cache_file`` is set, the discovery results are kept in a
+    :class:`DiscoveryCache` stored in that file.
+    '''
+
+    def __init__(self, load_path, prefix='', recurse=False,
+                 ignore_conflicts=False, num_workers=1, cache_file=None):
         self._load_path = load_path
         self._prefix = prefix or ''
         self._recurse = recurse
         self._ignore_conflicts = ignore_conflicts
+        self._num_workers = num_workers
+        self._cache = DiscoveryCache(cache_file) if cache_file else None
 
         # Loaded tests by name; maps test names to the file that were defined
         self._loaded = {}
@@ -63,13 +97,7 @@ class RegressionCheckLoader:
 
     def _validate_source(self, filename):
         '''Check if `filename` is a valid Reframe source file.'''
-
-        with open(filename, 'r') as f:
-            source_tree = ast.parse(f.read(), filename)
-
-        validator = RegressionCheckValidator()
-        validator.visit(source_tree)
-        return validator.valid
+        return _validate_file(filename)
 
     @property
     def load_path(self):
@@ -83,11 +111,23 @@ class RegressionCheckLoader:
     def recurse(self):
         return self._recurse
 
+    @property
+    def num_workers(self):
+        return self._num_workers
+
+    @property
+    def cache(self):
+        return self._cache
+
     def load_from_module(self, module):
         '''Load user checks from module.
 
         This method tries to call the `_rfm_gettests()` method of the user
         check and validates its return value.'''
+        return self._register_tests(self._instantiate_tests(module),
+                                    module.__file__)
+
+    def _instantiate_tests(self, module):
         from reframe.core.pipeline import RegressionTest
 
         # Warn in case of old syntax
@@ -105,12 +145,11 @@ class RegressionCheckLoader:
         if not isinstance(candidates, collections.abc.Sequence):
             return []
 
+        return [c for c in candidates if isinstance(c, RegressionTest)]
+
+    def _register_tests(self, candidates, testfile):
         ret = []
         for c in candidates:
-            if not isinstance(c, RegressionTest):
-                continue
-
-            testfile = module.__file__
             try:
                 conflicted = self._loaded[c.name]
             except KeyError:
@@ -133,35 +172,286 @@ class RegressionCheckLoader:
 
         return self.load_from_module(util.import_module_from_file(filename))
 
-    def load_from_dir(self, dirname, recurse=False):
-        checks = []
+    def _list_files(self, dirname, recurse=False):
+        '''Return the candidate test files of ``dirname`` in loading order.'''
+        ret = []
         for entry in os.scandir(dirname):
             if recurse and entry.is_dir():
-                checks.extend(
-                    self.load_from_dir(entry.path, recurse)
-                )
+                ret.extend(self._list_files(entry.path, recurse))
 
             if (entry.name.startswith('.') or
                 not entry.name.endswith('.py') or
                 not entry.is_file()):
                 continue
 
-            checks.extend(self.load_from_file(entry.path))
+            ret.append(entry.path)
+
+        return ret
+
+    def _select_files(self, filenames, check_filter):
+        '''Drop the files whose cached tests are all rejected by
+        ``check_filter``.'''
+        if self._cache is None or check_filter is None:
+            return filenames
+
+        ret = []
+        for f in filenames:
+            tests = self._cache.tests(f)
+            if tests is None or any(check_filter(t) for t in tests):
+                ret.append(f)
+
+        getlogger().debug('discovery cache: skipping %s unselected file(s)' %
+                          (len(filenames) - len(ret)))
+        return ret
+
+    def _validate_files(self, filenames):
+        valid = {}
+        if self._cache is not None:
+            for f in filenames:
+                cached = self._cache.valid(f)
+                if cached is not None:
+                    valid[f] = cached
+
+        pending = [f for f in filenames if f not in valid]
+        if self._num_workers > 1 and len(pending) > 1:
+            results = self._validate_files_parallel(pending)
+        else:
+            results = map(self._validate_source, pending)
+
+        for f, v in zip(pending, results):
+            valid[f] = v
+            if self._cache is not None:
+                self._cache.set_valid(f, v)
+
+        return [valid[f] for f in filenames]
+
+    def _load_files(self, filenames, check_filter=None):
+        filenames = self._select_files(filenames, check_filter)
+        valid = self._validate_files(filenames)
+        filenames = [f for f, v in zip(filenames, valid) if v]
+        if self._num_workers > 1 and len(filenames) > 1:
+            getlogger().debug('loading %s test file(s) using %s workers' %
+                              (len(filenames), self._num_workers))
+            pool = concurrent.futures.ThreadPoolExecutor(self._num_workers)
+            results = pool.map(self._import_and_instantiate, filenames)
+        else:
+            pool = None
+            results = map(self._import_and_instantiate, filenames)
+
+        checks = []
+        try:
+            # Results are yielded in the order of the files
+            for filename, (testfile, tests) in zip(filenames, results):
+                if self._cache is not None:
+                    self._cache.set_tests(filename, tests)
+
+                checks.extend(self._register_tests(tests, testfile))
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        if self._cache is not None:
+            self._cache.save()
 
         return checks
 
-    def load_all(self):
+    def _validate_files_parallel(self, filenames):
+        try:
+            pool = concurrent.futures.ProcessPoolExecutor(self._num_workers)
+        except NotImplementedError:
+            # Process pools are not supported on this platform
+            return [_validate_file(f) for f in filenames]
+
+        chunksize = max(1, len(filenames) // (4*self._num_workers))
+        with pool:
+            return list(pool.map(_validate_file, filenames,
+                                 chunksize=chunksize))
+
+    def _import_and_instantiate(self, filename):
+        module = util.import_module_from_file(filename)
+        return module.__file__, self._instantiate_tests(module)
+
+    def load_from_dir(self, dirname, recurse=False):
+        return self._load_files(self._list_files(dirname, recurse))
+
+    def load_all(self, check_filter=None):
         '''Load all checks in self._load_path.
 
-        If a prefix exists, it will be prepended to each path.'''
-        checks = []
+        If a prefix exists, it will be prepended to each path.
+
+        :arg check_filter: A predicate selecting the tests of interest.
+            It is only used together with the discovery cache: files whose
+            cached tests are all rejected by this predicate are not loaded at
+            all. The caller is still responsible for filtering the returned
+            tests.
+        '''
+        filenames = []
         for d in self._load_path:
             d = os.path.join(self._prefix, d)
             if not os.path.exists(d):
                 continue
             if os.path.isdir(d):
-                checks.extend(self.load_from_dir(d, self._recurse))
+                filenames.extend(self._list_files(d, self._recurse))
             else:
-                checks.extend(self.load_from_file(d))
+                filenames.append(d)
 
-        return checks
+        return self._load_files(filenames, check_filter)
+
+
+class _CachedTest:
+    '''A test as it is recorded in the discovery cache.
+
+    It provides the test attributes that are used by the check filters.'''
+
+    def __init__(self, name, tags, valid_systems,
+                 valid_prog_environs, num_gpus_per_node):
+        self.name = name
+        self.tags = set(tags)
+        self.valid_systems = list(valid_systems)
+        self.valid_prog_environs = list(valid_prog_environs)
+        self.num_gpus_per_node = num_gpus_per_node
+
+    @classmethod
+    def from_check(cls, check):
+        return cls(check.name, check.tags, check.valid_systems,
+                   check.valid_prog_environs, check.num_gpus_per_node)
+
+    @property
+    def current_system(self):
+        return rt.runtime().system
+
+    def supports_system(self, partition_name):
+        from reframe.core.pipeline import RegressionTest
+
+        return RegressionTest.supports_system(self, partition_name)
+
+    def to_json(self):
+        return {
+            'name': self.name,
+            'tags': sorted(self.tags),
+            'valid_systems': self.valid_systems,
+            'valid_prog_environs': self.valid_prog_environs,
+            'num_gpus_per_node': self.num_gpus_per_node
+        }
+
+
+class DiscoveryCache:
+    '''A persistent cache of the test discovery results.
+
+    For each test file, the cache records its modification time, size and
+    content hash, whether it is a valid ReFrame source file and the basic
+    attributes of the tests it defines. A file whose modification time or
+    size has changed is considered unchanged if its content hash is the
+    same.
+
+    Since tests may set their attributes based on the current system, the
+    entries are kept separately for each system. The whole cache is
+    discarded if it was written by a different ReFrame version.
+
+    .. note::
+       Changes in modules imported by the test files are not tracked.
+    '''
+
+    def __init__(self, filename):
+        self._filename = os.path.abspath(filename)
+        self._dirty = False
+        self._systems = {}
+        try:
+            with open(self._filename) as fp:
+                data = json.load(fp)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            getlogger().debug('discovery cache: could not read %s: %s' %
+                              (self._filename, e))
+        else:
+            if data.get('version') == reframe.VERSION:
+                self._systems = data.get('systems', {})
+
+        self._entries = self._systems.setdefault(rt.runtime().system.name, {})
+
+    @property
+    def filename(self):
+        return self._filename
+
+    def _hash(self, filename):
+        with open(filename, 'rb') as fp:
+            return hashlib.sha256(fp.read()).hexdigest()
+
+    def _entry(self, filename):
+        '''Return the entry of ``filename`` if it is still up-to-date.'''
+        filename = os.path.abspath(filename)
+        entry = self._entries.get(filename)
+        if entry is None:
+            return None
+
+        try:
+            st = os.stat(filename)
+            if (st.st_mtime, st.st_size) == (entry['mtime'], entry['size']):
+                return entry
+
+            if (st.st_size == entry['size'] and
+                self._hash(filename) == entry['hash']):
+                entry['mtime'] = st.st_mtime
+                self._dirty = True
+                return entry
+        except OSError:
+            pass
+
+        del self._entries[filename]
+        self._dirty = True
+        return None
+
+    def valid(self, filename):
+        '''Return the cached validity of ``filename`` or :class:`None` if
+        it is unknown.'''
+        entry = self._entry(filename)
+        return entry['valid'] if entry else None
+
+    def tests(self, filename):
+        '''Return the cached tests of ``filename`` or :class:`None` if they
+        are unknown.'''
+        entry = self._entry(filename)
+        if entry is None or entry['tests'] is None:
+            return None
+
+        return [_CachedTest(**t) for t in entry['tests']]
+
+    def set_valid(self, filename, valid):
+        st = os.stat(filename)
+        self._entries[os.path.abspath(filename)] = {
+            'mtime': st.st_mtime,
+            'size': st.st_size,
+            'hash': self._hash(filename),
+            'valid': valid,
+            'tests': None
+        }
+        self._dirty = True
+
+    def set_tests(self, filename, checks):
+        entry = self._entry(filename)
+        if entry is None:
+            self.set_valid(filename, True)
+            entry = self._entry(filename)
+
+        entry['tests'] = [_CachedTest.from_check(c).to_json() for c in checks]
+        self._dirty = True
+
+    def save(self):
+        if not self._dirty:
+            return
+
+        dirname = os.path.dirname(self._filename)
+        tmpfile = self._filename + '.tmp%s' % os.getpid()
+        try:
+            os.makedirs(dirname, exist_ok=True)
+            with open(tmpfile, 'w') as fp:
+                json.dump({'version': reframe.VERSION,
+                           'systems': self._systems}, fp)
+
+            os.replace(tmpfile, self._filename)
+        except OSError as e:
+            getlogger().warning('could not save the discovery cache: %s' % e)
+            os_ext.force_remove_file(tmpfile)
+        else:
+            self._dirty = False
@@ -5,6 +5,7 @@ ReframePrefix = '/storage/homefs'
 
 class ReframeSettings:
     job_poll_intervals = [1, 2, 3]
+    job_poll_max_interval = 5
     job_submit_timeout = 60
     checks_path = ['checks/']
     checks_path_recurse = True
@@ -126,6 +126,147 @@ def toalphanum(s):
     return re.sub(r'\W', '_', s)
 
 
+def _split_hostlist(hostlist):
+    # Split a host list at the commas that are not inside brackets
+    ret = []
+    depth = 0
+    start = 0
+    for i, c in enumerate(hostlist):
+        if c == '[':
+            depth += 1
+            if depth > 1:
+                raise ValueError('invalid host list: %s' % hostlist)
+        elif c == ']':
+            depth -= 1
+            if depth < 0:
+                raise ValueError('invalid host list: %s' % hostlist)
+        elif c == ',' and depth == 0:
+            ret.append(hostlist[start:i])
+            start = i + 1
+
+    if depth != 0:
+        raise ValueError('invalid host list: %s' % hostlist)
+
+    ret.append(hostlist[start:])
+    return [h for h in ret if h]
+
+
+def _expand_range(hostlist, ranges):
+    ret = []
+    for r in ranges.split(','):
+        lower, sep, upper = r.partition('-')
+        if not lower.isdigit() or (sep and not upper.isdigit()):
+            raise ValueError('invalid host list: %s' % hostlist)
+
+        if not sep:
+            ret.append(lower)
+            continue
+
+        width = len(lower)
+        if int(upper) < int(lower):
+            raise ValueError('invalid host list: %s' % hostlist)
+
+        ret += ['%0*d' % (width, i) for i in range(int(lower), int(upper)+1)]
+
+    return ret
+
+
+def expand_hostlist(hostlist):
+    '''Expand a host list in the Slurm syntax to the list of its host names.
+
+    The host list is a comma-separated list of host expressions.
+    Every pair of brackets in a host expression contains a comma-separated
+    list of numbers and ranges of numbers, e.g., ``nid00[408,411-415]``.
+    The zero padding of the lower bound of a range is preserved in all the
+    numbers of the range.
+    A host expression may contain multiple pairs of brackets, in which case
+    it expands to all the combinations of their numbers, e.g.,
+    ``c[0-1]n[0-1]`` expands to ``c0n0``, ``c0n1``, ``c1n0`` and ``c1n1``.
+
+    :raises ValueError: if ``hostlist`` is not a valid host list.
+    '''
+    ret = []
+    for hostexpr in _split_hostlist(hostlist.strip()):
+        parts = re.split(r'\[([^\]]*)\]', hostexpr)
+
+        # The parts at the odd positions are the contents of the brackets
+        choices = [[p] if i % 2 == 0 else _expand_range(hostlist, p)
+                   for i, p in enumerate(parts)]
+        ret += [''.join(h) for h in itertools.product(*choices)]
+
+    return ret
+
+
+def _compress_numbers(numbers, width):
+    ranges = []
+    numbers = sorted(numbers)
+    lower = upper = numbers[0]
+    for n in numbers[1:] + [None]:
+        if n is not None and n == upper + 1:
+            upper = n
+            continue
+
+        if lower == upper:
+            ranges.append('%0*d' % (width, lower))
+        else:
+            ranges.append('%0*d-%0*d' % (width, lower, width, upper))
+
+        lower = upper = n
+
+    return ranges
+
+
+def compress_hostlist(hostnames):
+    '''Compress a list of host names to a host list in the Slurm syntax.
+
+    Host names that differ only in their trailing number are grouped
+    together, e.g., ``nid001``, ``nid002`` and ``nid004`` are compressed to
+    ``nid[001-002,004]``.
+    Zero-padded numbers are grouped only with numbers of the same width.
+    The host names of the resulting host list are sorted and unique.
+
+    This is the inverse of :func:`expand_hostlist` for single-dimensional
+    host lists.
+    '''
+    # Group the numbers of the host names by prefix and width; the width of
+    # the numbers that are not zero-padded is 0
+    groups = {}
+    for h in hostnames:
+        prefix, number = re.match(r'(.*?)(\d*)$', h).groups()
+        if not number:
+            groups.setdefault((prefix, None), set())
+            continue
+
+        width = len(number) if number[0] == '0' and len(number) > 1 else 0
+        groups.setdefault((prefix, width), set()).add(int(number))
+
+    # Merge the numbers that are not zero-padded with the zero-padded ones
+    # of the same width
+    for (prefix, width), numbers in groups.items():
+        if not width:
+            continue
+
+        unpadded = groups.get((prefix, 0), set())
+        same_width = {n for n in unpadded if len(str(n)) == width}
+        numbers |= same_width
+        unpadded -= same_width
+
+    ret = []
+    for (prefix, width), numbers in sorted(groups.items(),
+                                           key=lambda g: (g[0][0],
+                                                          g[0][1] or 0)):
+        if width is None:
+            ret.append(prefix)
+        elif len(numbers) == 1:
+            ret.append('%s%0*d' % (prefix, width, *numbers))
+        elif numbers:
+            ret.append('%s[%s]' % (prefix,
+                                   ','.join(_compress_numbers(numbers,
+                                                              width))))
+
+    return ','.join(ret)
+
+
 class ScopedDict(UserDict):
     '''This is a special dict that imposes scopes on its keys.
 
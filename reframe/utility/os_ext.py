@@ -27,10 +27,11 @@ from reframe.core.exceptions import (ReframeError, SpawnedProcessError,
 from . import OrderedSet
 
 
-def run_command(cmd, check=False, timeout=None, shell=False, log=True):
+def run_command(cmd, check=False, timeout=None, shell=False, log=True,
+                cwd=None):
     try:
         proc = run_command_async(cmd, shell=shell, start_new_session=True,
-                                 log=log)
+                                 log=log, cwd=cwd)
         proc_stdout, proc_stderr = proc.communicate(timeout=timeout)
     except subprocess.TimeoutExpired as e:
         os.killpg(proc.pid, signal.SIGKILL)
@@ -337,12 +338,12 @@ def git_repo_hash(branch='HEAD', short=True, wd=None):
 
     '''
     try:
-        wd = wd or reframe.INSTALL_PREFIX
-        with change_dir(wd):
-            # Do not log this command, since we need to call this function
-            # from the logger
-            completed = run_command('git rev-parse %s' % branch,
-                                    check=True, log=False)
+        # Do not log this command, since we need to call this function from
+        # the logger; also, do not change the working directory of the whole
+        # process, since the logger may be used by concurrent threads
+        completed = run_command('git rev-parse %s' % branch,
+                                check=True, log=False,
+                                cwd=wd or reframe.INSTALL_PREFIX)
 
     except SpawnedProcessError:
         return None
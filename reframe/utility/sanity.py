@@ -64,17 +64,406 @@ This module provides three categories of sanity functions:
 
 '''
 
+import array
 import builtins
+import collections.abc
+import contextlib
+import copy
+import csv
+import functools
 import glob as pyglob
+import inspect
+import io
 import itertools
+import json
+import math
+import operator
+import os
 import re
 import sys
+import threading
 
 import reframe.utility as util
 from reframe.core.deferrable import deferrable, _DeferredExpression
 from reframe.core.exceptions import SanityError
 
 
+# The directory against which the relative file names are resolved; it is
+# kept per thread, so that sanity functions may be evaluated concurrently
+_thread_context = threading.local()
+
+# Files are scanned for regex matches in chunks of this many characters
+_SCAN_CHUNK_SIZE = 4 * 1024 * 1024
+
+# Number of lines that are scanned again along with the next chunk, so that
+# matches spanning multiple lines are found across the chunk boundaries
+_SCAN_OVERLAP_LINES = 32
+
+# The type codes of the arrays of numbers returned by extractall_array()
+_NUMERIC_TYPECODES = [tc for tc in array.typecodes if tc not in 'uw']
+
+# Matches of a text that is scanned at once are created lazily in batches of
+# this many matches
+_MATCH_BATCH_SIZE = 1024
+
+# Files larger than this many bytes are not kept in the file caches
+_FILE_CACHE_MAX_SIZE = 32 * 1024 * 1024
+
+
+@contextlib.contextmanager
+def working_directory(dirname):
+    '''Resolve the relative file names passed to the sanity functions that
+    are evaluated by the current thread inside this context against
+    ``dirname``.
+
+    Unlike changing the current working directory, this affects neither the
+    rest of the process nor any other thread.
+    This is not a sanity function.
+
+    .. versionadded:: 3.0
+    '''
+    orig_dirname = builtins.getattr(_thread_context, 'dirname', None)
+    _thread_context.dirname = dirname
+    try:
+        yield
+    finally:
+        _thread_context.dirname = orig_dirname
+
+
+@contextlib.contextmanager
+def file_cache(cache):
+    '''Share the contents of the files read by the sanity functions that are
+    evaluated by the current thread inside this context through the
+    dictionary ``cache``.
+
+    Each file is read only once for all the expressions evaluated with the
+    same ``cache``, as long as it is not modified in the meantime.
+    Similarly, structured files are parsed only once by :func:`extractjson`,
+    :func:`extractcsv` and :func:`extractkv`.
+    Files larger than 32 MB are not cached; they are always scanned in chunks
+    as described in :func:`finditer`.
+    It is up to the caller to clear the ``cache`` when it is no longer
+    needed.
+    This is not a sanity function.
+
+    .. versionadded:: 3.0
+    '''
+    orig_cache = builtins.getattr(_thread_context, 'cache', None)
+    _thread_context.cache = cache
+    try:
+        yield
+    finally:
+        _thread_context.cache = orig_cache
+
+
+@contextlib.contextmanager
+def combined_scan(exprs):
+    '''Scan only once each file that is examined by more than one of the
+    pattern matching functions in the deferred expressions ``exprs``.
+
+    The calls to :func:`finditer`, :func:`findall`, :func:`extractiter`,
+    :func:`extractall`, :func:`extractall_array` and :func:`extractsingle`
+    found in ``exprs`` are grouped by the file they examine.
+    On entering the context, the files examined by more than one pattern or
+    capturing group are scanned once for all of them and the matches are
+    kept, so that the expressions evaluated by the current thread inside the
+    context do not have to scan the files again.
+    If :func:`extractsingle` is the only function looking for a pattern, the
+    search for it stops at the requested item.
+    Similarly, each file examined by more than one call to
+    :func:`extractjson`, :func:`extractcsv` or :func:`extractkv` with the
+    same parsing options is parsed once for all of them.
+    The expressions evaluate to exactly the same values as without this
+    context; any error is raised when the expression is evaluated.
+    Files that are cached by an enclosing :func:`file_cache` context are not
+    scanned in advance, since they are read only once anyway.
+    This is not a sanity function.
+
+    .. versionadded:: 3.0
+    '''
+    orig_scans = builtins.getattr(_thread_context, 'scans', None)
+    orig_parses = builtins.getattr(_thread_context, 'parses', None)
+    _thread_context.scans, _thread_context.parses = _combined_scans(exprs)
+    try:
+        yield
+    finally:
+        _thread_context.scans = orig_scans
+        _thread_context.parses = orig_parses
+
+
+# Sentinel group name for keeping the raw matches of a pattern
+_MATCHES = object()
+
+
+def _scan_argument(arg):
+    '''Return the value of a pattern matching argument without evaluating
+    arbitrary subexpressions.
+
+    Only deferred expressions without deferred arguments of their own, such
+    as :attr:`reframe.core.pipeline.RegressionTest.stdout`, are evaluated.
+
+    :raises ValueError: if the argument may not be evaluated in advance.
+    '''
+    if not isinstance(arg, _DeferredExpression):
+        return arg
+
+    subargs = itertools.chain(arg._args, arg._kwargs.values())
+    if builtins.any(isinstance(a, _DeferredExpression) for a in subargs):
+        raise ValueError('argument is a compound expression')
+
+    return evaluate(arg)
+
+
+def _scan_requests(exprs):
+    '''Collect the pattern matching and the structured output requests of
+    the deferred expressions ``exprs``.
+
+    The expression graph is walked iteratively and every subexpression is
+    visited once, no matter how deep or how shared it is.
+
+    :returns: A tuple of the pattern matching and the structured output
+        requests.
+        The former is a mapping from a ``(path, encoding, tail)`` tuple to
+        the requests on this file; each one is a mapping from a ``(patt,
+        tag)`` tuple to the number of values needed or :class:`None` if all
+        values are needed.
+        The latter is a mapping from the key identifying the parse of a file,
+        as passed to :func:`_parsed`, to the set of the elements requested.
+    '''
+    scanned_fns = {
+        finditer.__wrapped__: False,
+        findall.__wrapped__: False,
+        extractiter.__wrapped__: True,
+        extractall.__wrapped__: True,
+        extractsingle.__wrapped__: True,
+        extractall_array.__wrapped__: True
+    }
+    parsed_fns = {
+        extractjson.__wrapped__: lambda args: (
+            ('json', _resolve_path(args['filename']), args['encoding']),
+            _json_path(args['path'])
+        ),
+        extractcsv.__wrapped__: lambda args: (
+            ('csv', _resolve_path(args['filename']), args['encoding'],
+             args['delimiter'], args['header']), args['column']
+        ),
+        extractkv.__wrapped__: lambda args: (
+            ('kv', _resolve_path(args['filename']), args['encoding'],
+             args['sep']), args['key']
+        )
+    }
+    requests, parse_requests = {}, {}
+    visited = set()
+    stack = builtins.list(exprs)
+    while stack:
+        expr = stack.pop()
+        if not isinstance(expr, _DeferredExpression) or id(expr) in visited:
+            continue
+
+        visited.add(id(expr))
+        stack += itertools.chain(expr._args, expr._kwargs.values())
+        if expr._fn not in scanned_fns and expr._fn not in parsed_fns:
+            continue
+
+        try:
+            args = inspect.signature(expr._fn).bind(*expr._args,
+                                                    **expr._kwargs)
+            args.apply_defaults()
+            args = {k: _scan_argument(v) for k, v in args.arguments.items()
+                    if k != 'conv'}
+            if expr._fn in parsed_fns:
+                key, item = parsed_fns[expr._fn](args)
+                parse_requests.setdefault(key, set()).add(item)
+                continue
+
+            key = (_resolve_path(args['filename']), args['encoding'],
+                   args['tail'])
+            if scanned_fns[expr._fn]:
+                req = (args['patt'], args['tag'])
+            else:
+                req = (args['patt'], _MATCHES)
+
+            item = args.get('item')
+            count = item + 1 if item is not None and item >= 0 else None
+            file_requests = requests.setdefault(key, {})
+            if req in file_requests:
+                prev_count = file_requests[req]
+                if prev_count is None or count is None:
+                    count = None
+                else:
+                    count = builtins.max(count, prev_count)
+
+            file_requests[req] = count
+        except Exception:
+            # Let the expression fail when it is actually evaluated
+            pass
+
+    return requests, parse_requests
+
+
+def _combined_scans(exprs):
+    requests, parse_requests = _scan_requests(exprs)
+    cache = builtins.getattr(_thread_context, 'cache', None)
+    scans = {}
+    for key, file_requests in requests.items():
+        if builtins.len(file_requests) < 2:
+            continue
+
+        path, encoding, tail = key
+        try:
+            if (cache is not None and
+                os.path.getsize(path) <= _FILE_CACHE_MAX_SIZE):
+                continue
+
+            with _open(path, encoding, tail) as fp:
+                scans[key] = _scan_file(fp, file_requests)
+        except Exception:
+            # Let the expressions fail when they are actually evaluated
+            pass
+
+    parses = {}
+    for key, items in parse_requests.items():
+        if builtins.len(items) < 2:
+            continue
+
+        path = key[1]
+        try:
+            if (cache is not None and
+                os.path.getsize(path) <= _FILE_CACHE_MAX_SIZE):
+                continue
+
+            parses.update(_parse_file(key, items))
+        except Exception:
+            # Let the expressions fail when they are actually evaluated
+            pass
+
+    return scans, parses
+
+
+def _parse_file(key, items):
+    '''Parse the file identified by ``key`` once for all the requested
+    ``items``.
+
+    :returns: A mapping from a ``(key, item)`` tuple to the raw value of each
+        item that could be extracted.
+    '''
+    kind, path, encoding, *options = key
+    if kind == 'json':
+        parse = functools.partial(_parse_json, filename=path)
+        element = functools.partial(_json_element, filename=path)
+    elif kind == 'csv':
+        delimiter, header = options
+        parse = functools.partial(_parse_csv, delimiter=delimiter,
+                                  header=header)
+        element = functools.partial(_csv_column, filename=path)
+    else:
+        sep, = options
+        parse = functools.partial(_parse_kv, sep=sep)
+        element = _kv_values
+
+    with _open(path, encoding, None) as fp:
+        parsed = parse(fp, wanted=items)
+
+    ret = {}
+    for item in items:
+        with contextlib.suppress(SanityError):
+            ret[key, item] = element(parsed, item)
+
+    return ret
+
+
+def _scan_file(fp, file_requests):
+    '''Scan ``fp`` for all the ``file_requests`` at once.
+
+    :returns: A mapping from a ``(patt, tag)`` tuple to a tuple of the
+        extracted values and a flag indicating whether these are all the
+        values of the file.
+    '''
+    patterns = {}
+    for (patt, tag), count in file_requests.items():
+        patterns.setdefault(patt, {})[tag] = count
+
+    regexes = [_compile(patt) for patt in patterns]
+    tag_maps = builtins.list(patterns.values())
+    active = [True] * builtins.len(regexes)
+    values = {}
+    for i, tags in builtins.enumerate(tag_maps):
+        for tag in tags:
+            values[tag, i] = []
+
+    for i, matches in _scan_many(regexes, fp, active):
+        tags = tag_maps[i]
+        for tag, count in builtins.list(tags.items()):
+            if count == 0:
+                continue
+
+            try:
+                if tag is _MATCHES:
+                    values[tag, i] += matches
+                else:
+                    values[tag, i] += [m.group(tag) for m in matches]
+            except (IndexError, KeyError):
+                # Leave the invalid group to the evaluation
+                del tags[tag]
+                del values[tag, i]
+                continue
+
+            if count is not None and builtins.len(values[tag, i]) >= count:
+                # Keep the values found so far, but stop looking
+                del values[tag, i][count:]
+                tags[tag] = 0
+
+        if builtins.all(count == 0 for count in tags.values()):
+            active[i] = False
+
+    ret = {}
+    for i, (patt, tags) in builtins.enumerate(patterns.items()):
+        for tag, count in tags.items():
+            ret[patt, tag] = (values[tag, i], count != 0)
+
+    return ret
+
+
+def _scanned_values(patt, path, encoding, tail, tag, count=None):
+    '''Return the values found by a combined scan or :class:`None` if they
+    were not found or are incomplete.'''
+    scans = builtins.getattr(_thread_context, 'scans', None)
+    if not scans:
+        return None
+
+    try:
+        values, complete = scans[path, encoding, tail][patt, tag]
+    except (KeyError, TypeError):
+        return None
+
+    if complete or (count is not None and builtins.len(values) >= count):
+        return values
+
+    return None
+
+
+def _resolve_path(filename):
+    dirname = builtins.getattr(_thread_context, 'dirname', None)
+    if dirname is None:
+        return filename
+
+    return os.path.join(dirname, filename)
+
+
+def _iglob(pathname, recursive):
+    dirname = builtins.getattr(_thread_context, 'dirname', None)
+    if dirname is None or os.path.isabs(pathname):
+        return pyglob.iglob(pathname, recursive=recursive)
+
+    # Return the matches relative to the directory, as if it was the
+    # current working directory
+    prefix = os.path.join(dirname, '')
+    return (p[builtins.len(prefix):]
+            for p in pyglob.iglob(os.path.join(pyglob.escape(dirname),
+                                               pathname),
+                                  recursive=recursive))
+
+
 def _format(s, *args, **kwargs):
     '''Safely format string ``s``.
 
@@ -436,9 +825,11 @@ def assert_le(a, b, msg=None):
 
 
 @deferrable
-def assert_found(patt, filename, msg=None, encoding='utf-8'):
+def assert_found(patt, filename, msg=None, encoding='utf-8', tail=None):
     '''Assert that regex pattern ``patt`` is found in the file ``filename``.
 
+    The file is scanned only up to the first match.
+
     :arg patt: The regex pattern to search.
         Any standard Python `regular expression
         <https://docs.python.org/3.6/library/re.html#regular-expression-syntax>`_
@@ -447,21 +838,30 @@ def assert_found(patt, filename, msg=None, encoding='utf-8'):
         Any :class:`OSError` raised while processing the file will be
         propagated as a :class:`reframe.core.exceptions.SanityError`.
     :arg encoding: The name of the encoding used to decode the file.
+    :arg tail: as in :func:`finditer`.
     :returns: ``True`` on success.
     :raises reframe.core.exceptions.SanityError: if assertion fails.
+
+    .. versionchanged:: 3.0
+       The ``tail`` argument was added.
     '''
-    num_matches = count(finditer(patt, filename, encoding))
+    matches = evaluate(finditer(patt, filename, encoding, tail))
     try:
-        evaluate(assert_true(num_matches))
+        found = builtins.next(matches, None) is not None
     except SanityError:
+        found = False
+    finally:
+        matches.close()
+
+    if not found:
         error_msg = msg or "pattern `{0}' not found in `{1}'"
         raise SanityError(_format(error_msg, patt, filename))
-    else:
-        return True
+
+    return True
 
 
 @deferrable
-def assert_not_found(patt, filename, msg=None, encoding='utf-8'):
+def assert_not_found(patt, filename, msg=None, encoding='utf-8', tail=None):
     '''Assert that regex pattern ``patt`` is not found in the file
     ``filename``.
 
@@ -469,9 +869,12 @@ def assert_not_found(patt, filename, msg=None, encoding='utf-8'):
 
     :returns: ``True`` on success.
     :raises reframe.core.exceptions.SanityError: if assertion fails.
+
+    .. versionchanged:: 3.0
+       The ``tail`` argument was added.
     '''
     try:
-        evaluate(assert_found(patt, filename, msg, encoding))
+        evaluate(assert_found(patt, filename, msg, encoding, tail))
     except SanityError:
         return True
     else:
@@ -484,10 +887,17 @@ def assert_bounded(val, lower=None, upper=None, msg=None):
     '''Assert that ``lower <= val <= upper``.
 
     :arg val: The value to check.
+        If this is an :class:`array.array`, such as the ones returned by
+        :func:`extractall_array`, all of its elements are checked at once and
+        the first placeholder of the error message refers to the element that
+        is out of bounds.
     :arg lower: The lower bound. If ``None``, it defaults to ``-inf``.
     :arg upper: The upper bound. If ``None``, it defaults to ``inf``.
     :returns: ``True`` on success.
     :raises reframe.core.exceptions.SanityError: if assertion fails.
+
+    .. versionchanged:: 3.0
+       Arrays of values are accepted.
     '''
     if lower is None:
         lower = builtins.float('-inf')
@@ -495,18 +905,46 @@ def assert_bounded(val, lower=None, upper=None, msg=None):
     if upper is None:
         upper = builtins.float('inf')
 
-    if val >= lower and val <= upper:
+    if isinstance(val, array.array):
+        val = _out_of_bounds(val, lower, upper)
+        if val is None:
+            return True
+    elif val >= lower and val <= upper:
         return True
 
     error_msg = msg or 'value {0} not within bounds {1}..{2}'
     raise SanityError(_format(error_msg, val, lower, upper))
 
 
+def _out_of_bounds(values, lower, upper):
+    '''Return an element of ``values`` that is out of bounds or
+    :class:`None`.'''
+    if not values:
+        return None
+
+    if values.typecode in 'fd':
+        # NaNs are never within bounds, but they are ignored by min() and
+        # max()
+        nan = builtins.next(builtins.filter(math.isnan, values), None)
+        if nan is not None:
+            return nan
+
+    min_value, max_value = builtins.min(values), builtins.max(values)
+    if min_value < lower:
+        return min_value
+
+    if max_value > upper:
+        return max_value
+
+    return None
+
+
 @deferrable
 def assert_reference(val, ref, lower_thres=None, upper_thres=None, msg=None):
     '''Assert that value ``val`` respects the reference value ``ref``.
 
     :arg val: The value to check.
+        As in :func:`assert_bounded`, this may also be an array of values.
     :arg ref: The reference value.
     :arg lower_thres: The lower threshold value expressed as a negative decimal
         fraction of the reference value.  Must be in [-1, 0] for ref >= 0.0 and
@@ -519,6 +957,9 @@ def assert_reference(val, ref, lower_thres=None, upper_thres=None, msg=None):
     :returns: ``True`` on success.
     :raises reframe.core.exceptions.SanityError: if assertion fails or if the
         lower and upper thresholds do not have appropriate values.
+
+    .. versionchanged:: 3.0
+       Arrays of values are accepted.
     '''
     if lower_thres is not None:
         lower_thres_limit = -1 if ref >= 0 else None
@@ -548,6 +989,12 @@ def assert_reference(val, ref, lower_thres=None, upper_thres=None, msg=None):
 
     lower = calc_bound(lower_thres) or float('-inf')
     upper = calc_bound(upper_thres) or float('inf')
+    if isinstance(val, array.array):
+        # Report the offending element only
+        val = _out_of_bounds(val, lower, upper)
+        if val is None:
+            return True
+
     try:
         evaluate(assert_bounded(val, lower, upper))
     except SanityError:
@@ -560,23 +1007,238 @@ def assert_reference(val, ref, lower_thres=None, upper_thres=None, msg=None):
 # Pattern matching functions
 
 @deferrable
-def finditer(patt, filename, encoding='utf-8'):
+def finditer(patt, filename, encoding='utf-8', tail=None):
     '''Get an iterator over the matches of the regex ``patt`` in ``filename``.
 
     This function is equivalent to :func:`findall()` except that it returns
     a generator object instead of a list, which you can use to iterate over
     the raw matches.
+
+    The file is not read into memory at once; it is scanned in chunks of
+    complete lines, so that the memory needed does not depend on the size of
+    the file.
+    The last lines of each chunk are scanned again along with the next one,
+    so that matches spanning up to 32 lines are still found across the chunk
+    boundaries.
+    Patterns that may match across any number of lines, i.e., those using
+    the ``DOTALL`` flag, or that use the ``\\A`` or ``\\Z`` anchors are
+    matched against the whole file instead.
+    Since the matches are made against the individual chunks, their
+    ``start()`` and ``end()`` positions are relative to the chunk and not to
+    the whole file.
+    Inside a :func:`file_cache` context, small files are read once and their
+    contents are shared with the rest of the sanity functions.
+
+    :arg tail: If not :class:`None`, scan only the last ``tail`` bytes of the
+        file, starting from the first complete line in them.
+        This is useful for locating summaries printed at the end of long
+        outputs.
+        The ``encoding`` must represent the newline character as a single
+        ``\\n`` byte, as is the case for UTF-8 and ASCII.
+
+    .. versionchanged:: 3.0
+       The file is scanned in chunks and the ``tail`` argument was added.
     '''
+    # Resolve the file name and the cache now, while in the context of the
+    # evaluation
+    path = _resolve_path(filename)
+    matches = _scanned_values(patt, path, encoding, tail, _MATCHES)
+    if matches is not None:
+        return (m for m in matches)
+
+    return _finditer(patt, path, filename, encoding, tail,
+                     builtins.getattr(_thread_context, 'cache', None))
+
+
+@functools.lru_cache(maxsize=4096)
+def _compile(patt):
+    return re.compile(patt, re.MULTILINE)
+
+
+# Inline ``s`` flags, either global or scoped, and ``\A`` or ``\Z`` anchors
+# that are not escaped themselves
+_WHOLE_TEXT_SYNTAX = re.compile(r'\(\?[aiLmsux]*s[aiLmsux-]*[:)]|'
+                                r'(?<!\\)(?:\\\\)*\\[AZ]')
+
+
+@functools.lru_cache(maxsize=4096)
+def _needs_whole_text(regex):
+    '''Check if the matches of ``regex`` may depend on more text than a
+    chunk holds.
+
+    With ``DOTALL``, a match may span any number of lines, whereas ``\\A``
+    and ``\\Z`` would match at the boundaries of every chunk.
+    '''
+    pattern = regex.pattern
+    if isinstance(pattern, bytes):
+        pattern = pattern.decode('latin-1')
+
+    return bool(regex.flags & re.DOTALL or
+                _WHOLE_TEXT_SYNTAX.search(pattern))
+
+
+def _open(path, encoding, tail):
+    if tail is None:
+        return open(path, 'rt', encoding=encoding)
+
+    fp = open(path, 'rb')
+    try:
+        size = os.fstat(fp.fileno()).st_size
+        if size > tail:
+            # Skip the partial line before the tail of the file
+            fp.seek(size - tail - 1)
+            fp.readline()
+
+        return io.TextIOWrapper(fp, encoding=encoding)
+    except BaseException:
+        fp.close()
+        raise
+
+
+def _read_cached(cache, path, encoding, tail):
+    '''Return the contents of the file from ``cache`` or :class:`None` if the
+    file may not be cached.'''
+    st = os.stat(path)
+    size = st.st_size if tail is None else builtins.min(st.st_size, tail)
+    if size > _FILE_CACHE_MAX_SIZE:
+        return None
+
+    key = (path, encoding, tail)
+    stamp = (st.st_mtime_ns, st.st_size)
+    try:
+        cached_stamp, text = cache[key]
+        if cached_stamp == stamp:
+            return text
+    except KeyError:
+        pass
+
+    with _open(path, encoding, tail) as fp:
+        text = fp.read()
+
+    cache[key] = (stamp, text)
+    return text
+
+
+def _batched(iterable, size=None):
+    '''Yield the items of ``iterable`` lazily in lists of at most ``size``
+    items.'''
+    size = size or _MATCH_BATCH_SIZE
+    iterator = builtins.iter(iterable)
+    while True:
+        batch = builtins.list(itertools.islice(iterator, size))
+        if not batch:
+            return
+
+        yield batch
+
+
+def _finditer(patt, path, filename, encoding, tail=None, cache=None):
+    for matches in _finditer_batches(patt, path, filename, encoding, tail,
+                                     cache):
+        yield from matches
+
+
+def _finditer_batches(patt, path, filename, encoding, tail=None, cache=None):
+    '''Same as :func:`_finditer`, except that it yields lists of consecutive
+    matches.'''
+    regex = _compile(patt)
     try:
-        with open(filename, 'rt', encoding=encoding) as fp:
-            yield from re.finditer(patt, fp.read(), re.MULTILINE)
+        text = None
+        if cache is not None:
+            text = _read_cached(cache, path, encoding, tail)
+
+        if text is not None:
+            yield from _batched(regex.finditer(text))
+            return
+
+        with _open(path, encoding, tail) as fp:
+            for _, matches in _scan_many([regex], fp, [True]):
+                yield matches
     except OSError as e:
         # Re-raise it as sanity error
         raise SanityError('%s: %s' % (filename, e.strerror))
 
 
+def _scan_many(regexes, fp, active):
+    '''Scan ``fp`` once for all the ``regexes``, yielding ``(index,
+    matches)`` tuples, where ``matches`` is a list of consecutive matches of
+    the regex.
+
+    The matches of each regex are yielded in order.
+    The caller may stop the search for a regex by clearing the corresponding
+    element of ``active``; the scan ends as soon as no regex is active.
+    If any of the regexes needs the whole text, as decided by
+    :func:`_needs_whole_text`, the rest of the file is read at once instead.
+    '''
+    if builtins.any(_needs_whole_text(r) for r in regexes):
+        text = fp.read()
+        for i, regex in builtins.enumerate(regexes):
+            for matches in _batched(regex.finditer(text)):
+                if not active[i]:
+                    break
+
+                yield i, matches
+
+        return
+
+    # The text that is carried over to the next chunk always starts at the
+    # beginning of a line; each regex resumes its search inside it at its
+    # own position
+    pending, positions = '', [0] * builtins.len(regexes)
+    while builtins.any(active):
+        data = fp.read(_SCAN_CHUNK_SIZE)
+        buf = pending + data
+        if not data:
+            for i, regex in builtins.enumerate(regexes):
+                if active[i]:
+                    yield i, builtins.list(regex.finditer(buf, positions[i]))
+
+            return
+
+        # Scan only complete lines
+        cut = buf.rfind('\n') + 1
+        if cut == 0:
+            pending = buf
+            continue
+
+        # Find the start of the overlapping lines; matches reaching into
+        # them might continue in the next chunk, so they are deferred
+        safe = cut - 1
+        for _ in range(_SCAN_OVERLAP_LINES):
+            safe = buf.rfind('\n', 0, safe)
+            if safe < 0:
+                break
+
+        safe += 1
+        for i, regex in builtins.enumerate(regexes):
+            if not active[i]:
+                # Inactive regexes must not hold back the carried over text
+                positions[i] = cut
+                continue
+
+            # The matches do not overlap, so the deferred ones are the last
+            # ones
+            matches = builtins.list(regex.finditer(buf, positions[i], cut))
+            num_ready = builtins.len(matches)
+            while num_ready and matches[num_ready-1].end() >= safe:
+                num_ready -= 1
+
+            if num_ready < builtins.len(matches):
+                positions[i] = matches[num_ready].start()
+                del matches[num_ready:]
+            else:
+                positions[i] = builtins.max(positions[i], safe)
+
+            if matches:
+                yield i, matches
+
+        line_start = buf.rfind('\n', 0, builtins.min(positions)) + 1
+        pending = buf[line_start:]
+        positions = [p - line_start for p in positions]
+
+
 @deferrable
-def findall(patt, filename, encoding='utf-8'):
+def findall(patt, filename, encoding='utf-8', tail=None):
     '''Get all matches of regex ``patt`` in ``filename``.
 
     :arg patt: The regex pattern to search.
@@ -585,16 +1247,21 @@ def findall(patt, filename, encoding='utf-8'):
         is accepted.
     :arg filename: The name of the file to examine.
     :arg encoding: The name of the encoding used to decode the file.
+    :arg tail: as in :func:`finditer`.
     :returns: A list of raw `regex match objects
         <https://docs.python.org/3.6/library/re.html#match-objects>`_.
     :raises reframe.core.exceptions.SanityError: In case an :class:`OSError` is
         raised while processing ``filename``.
+
+    .. versionchanged:: 3.0
+       The ``tail`` argument was added.
     '''
-    return list(evaluate(x) for x in finditer(patt, filename, encoding))
+    return list(evaluate(x) for x in finditer(patt, filename, encoding, tail))
 
 
 @deferrable
-def extractiter(patt, filename, tag=0, conv=None, encoding='utf-8'):
+def extractiter(patt, filename, tag=0, conv=None, encoding='utf-8',
+                tail=None):
     '''Get an iterator over the values extracted from the capturing group
     ``tag`` of a matching regex ``patt`` in the file ``filename``.
 
@@ -602,33 +1269,57 @@ def extractiter(patt, filename, tag=0, conv=None, encoding='utf-8'):
     a generator object, instead of a list, which you can use to iterate over
     the extracted values.
     '''
-    for m in finditer(patt, filename, encoding):
-        try:
-            val = m.group(tag)
-        except (IndexError, KeyError):
-            raise SanityError(
-                "no such group in pattern `%s': %s" % (patt, tag))
+    yield from _extractiter(patt, filename, tag, conv, encoding, tail)
+
+
+def _extractiter(patt, filename, tag, conv, encoding, tail, count=None):
+    '''Extract the values as :func:`extractiter`.
+
+    :arg count: The number of values needed or :class:`None` if all values
+        are needed.
+    '''
+    values = _scanned_values(patt, _resolve_path(filename), encoding, tail,
+                             tag, count)
+    if values is None:
+        values = _extract_group(finditer(patt, filename, encoding, tail),
+                                patt, tag)
+
+    for val in values:
+        yield _convert(val, conv)
 
+
+def _convert(val, conv):
+    try:
+        return conv(val) if callable(conv) else val
+    except ValueError:
+        fn_name = '<unknown>'
         try:
-            yield conv(val) if callable(conv) else val
-        except ValueError:
-            fn_name = '<unknown>'
+            # Assume conv is standard function
+            fn_name = conv.__name__
+        except AttributeError:
             try:
-                # Assume conv is standard function
-                fn_name = conv.__name__
+                # Assume conv is callable object
+                fn_name = conv.__class__.__name__
             except AttributeError:
-                try:
-                    # Assume conv is callable object
-                    fn_name = conv.__class__.__name__
-                except AttributeError:
-                    pass
+                pass
 
-            raise SanityError("could not convert value `%s' using `%s()'" %
-                              (val, fn_name))
+        raise SanityError("could not convert value `%s' using `%s()'" %
+                          (val, fn_name))
 
 
 @deferrable
-def extractall(patt, filename, tag=0, conv=None, encoding='utf-8'):
+def _extract_group(matches, patt, tag):
+    for m in matches:
+        try:
+            yield m.group(tag)
+        except (IndexError, KeyError):
+            raise SanityError(
+                "no such group in pattern `%s': %s" % (patt, tag))
+
+
+@deferrable
+def extractall(patt, filename, tag=0, conv=None, encoding='utf-8',
+               tail=None):
     '''Extract all values from the capturing group ``tag`` of a matching regex
     ``patt`` in the file ``filename``.
 
@@ -645,21 +1336,28 @@ def extractall(patt, filename, tag=0, conv=None, encoding='utf-8'):
     :arg conv: A callable that takes a single argument and returns a new value.
         If provided, it will be used to convert the extracted values before
         returning them.
+    :arg tail: as in :func:`finditer`.
     :returns: A list of the extracted values from the matched regex.
     :raises reframe.core.exceptions.SanityError: In case of errors.
+
+    .. versionchanged:: 3.0
+       The ``tail`` argument was added.
     '''
-    return list(evaluate(x)
-                for x in extractiter(patt, filename, tag, conv, encoding))
+    return list(evaluate(x) for x in extractiter(patt, filename, tag, conv,
+                                                 encoding, tail))
 
 
 @deferrable
-def extractsingle(patt, filename, tag=0, conv=None, item=0, encoding='utf-8'):
+def extractsingle(patt, filename, tag=0, conv=None, item=0, encoding='utf-8',
+                  tail=None):
     '''Extract a single value from the capturing group ``tag`` of a matching
     regex ``patt`` in the file ``filename``.
 
     This function is equivalent to ``extractall(patt, filename, tag,
     conv)[item]``, except that it raises a ``SanityError`` if ``item`` is out
     of bounds.
+    If ``item`` is not negative, the file is scanned only up to the requested
+    match; otherwise, only the last ``-item`` values are kept in memory.
 
     :arg patt: as in :func:`extractall`.
     :arg filename: as in :func:`extractall`.
@@ -667,20 +1365,364 @@ def extractsingle(patt, filename, tag=0, conv=None, item=0, encoding='utf-8'):
     :arg tag: as in :func:`extractall`.
     :arg conv: as in :func:`extractall`.
     :arg item: the specific element to extract.
+    :arg tail: as in :func:`extractall`.
     :returns: The extracted value.
     :raises reframe.core.exceptions.SanityError: In case of errors.
 
+    .. versionchanged:: 3.0
+       The ``tail`` argument was added.
     '''
+    # Consume the values here, so as to force any exception to be thrown in
+    # this context and not during the evaluation of an expression containing
+    # this one.
+    values = _extractiter(patt, filename, tag, conv, encoding, tail,
+                          item + 1 if item >= 0 else None)
     try:
-        # Explicitly evaluate the expression here, so as to force any exception
-        # to be thrown in this context and not during the evaluation of an
-        # expression containing this one.
-        return evaluate(extractall(patt, filename, tag, conv, encoding)[item])
-    except IndexError:
-        raise SanityError(
-            "not enough matches of pattern `%s' in file `%s' "
-            "so as to extract item `%s'" % (patt, filename, item)
-        )
+        if item < 0:
+            last = collections.deque(values, maxlen=-item)
+            if builtins.len(last) == -item:
+                return last[0]
+        else:
+            for val in itertools.islice(values, item, None):
+                return val
+    finally:
+        values.close()
+
+    raise SanityError(
+        "not enough matches of pattern `%s' in file `%s' "
+        "so as to extract item `%s'" % (patt, filename, item)
+    )
+
+
+@deferrable
+def extractall_array(patt, filename, tag=0, typecode='d', encoding='utf-8',
+                     tail=None):
+    '''Extract all values from the capturing group ``tag`` of a matching regex
+    ``patt`` in the file ``filename`` as numbers packed in an
+    :class:`array.array`.
+
+    This function is equivalent to :func:`extractall`, except that the values
+    are converted to numbers of the type ``typecode`` and they are stored
+    unboxed in an array, which needs several times less memory than a list.
+    This is meant for extracting large series of values, e.g., per iteration
+    timings.
+    The reductions :func:`sum`, :func:`min`, :func:`max` and :func:`avg`, as
+    well as :func:`assert_bounded` and :func:`assert_reference`, operate on
+    the whole array at once.
+
+    :arg patt: as in :func:`extractall`.
+    :arg filename: as in :func:`extractall`.
+    :arg tag: as in :func:`extractall`.
+    :arg typecode: The type code of the array.
+        Floating point values are extracted for the ``'f'`` and ``'d'`` type
+        codes and integers for the rest of the numeric type codes of
+        :mod:`array`.
+    :arg encoding: as in :func:`extractall`.
+    :arg tail: as in :func:`extractall`.
+    :returns: An :class:`array.array` of the extracted values.
+    :raises reframe.core.exceptions.SanityError: In case of errors.
+
+    .. versionadded:: 3.0
+    '''
+    if typecode not in _NUMERIC_TYPECODES:
+        raise SanityError('invalid array type code: %r' % (typecode,))
+
+    conv = builtins.float if typecode in 'fd' else builtins.int
+    path = _resolve_path(filename)
+    values = _scanned_values(patt, path, encoding, tail, tag)
+    if values is not None:
+        batches = [values]
+    else:
+        group = operator.methodcaller('group', tag)
+        cache = builtins.getattr(_thread_context, 'cache', None)
+        batches = (builtins.map(group, matches)
+                   for matches in _finditer_batches(patt, path, filename,
+                                                    encoding, tail, cache))
+
+    ret = array.array(typecode)
+    for batch in batches:
+        try:
+            # Convert the whole batch at once
+            ret.extend(builtins.map(conv, batch))
+        except (IndexError, KeyError):
+            raise SanityError(
+                "no such group in pattern `%s': %s" % (patt, tag)) from None
+        except ValueError as e:
+            raise SanityError("could not convert value using `%s()': %s" %
+                              (conv.__name__, e)) from None
+        except OverflowError as e:
+            raise SanityError("could not store values of pattern `%s' in an "
+                              "array of type `%s': %s" % (patt, typecode, e))
+
+    return ret
+
+
+# Structured output functions
+
+def _parsed(key, filename, parse, wanted):
+    '''Return the result of ``parse(fp, wanted)`` for the file identified
+    by ``key``.
+
+    The ``key`` is a ``(kind, path, encoding, *options)`` tuple, where
+    ``kind`` and ``options`` must identify ``parse`` and its options.
+    Inside a :func:`file_cache` context, files that are not too large are
+    parsed in full and the result is shared through the cache; otherwise,
+    only the ``wanted`` items are kept from the parse.
+    '''
+    _, path, encoding, *_ = key
+    try:
+        cache = builtins.getattr(_thread_context, 'cache', None)
+        if cache is None:
+            with _open(path, encoding, None) as fp:
+                return parse(fp, wanted=wanted)
+
+        st = os.stat(path)
+        if st.st_size > _FILE_CACHE_MAX_SIZE:
+            with _open(path, encoding, None) as fp:
+                return parse(fp, wanted=wanted)
+
+        key = ('parsed',) + key
+        stamp = (st.st_mtime_ns, st.st_size)
+        try:
+            cached_stamp, ret = cache[key]
+            if cached_stamp == stamp:
+                return ret
+        except KeyError:
+            pass
+
+        with _open(path, encoding, None) as fp:
+            ret = parse(fp, wanted=None)
+
+        cache[key] = (stamp, ret)
+        return ret
+    except OSError as e:
+        raise SanityError('%s: %s' % (filename, e.strerror))
+
+
+def _scanned_element(key, item):
+    '''Return the element ``item`` of the file identified by ``key`` as
+    extracted by a combined scan or :data:`_NOT_SCANNED`.'''
+    parses = builtins.getattr(_thread_context, 'parses', None)
+    if not parses:
+        return _NOT_SCANNED
+
+    return parses.get((key, item), _NOT_SCANNED)
+
+
+# Sentinel for the elements that are not extracted by a combined scan
+_NOT_SCANNED = object()
+
+
+def _parse_json(fp, filename, wanted=None):
+    # The whole document is needed to extract any element of it
+    try:
+        return json.load(fp)
+    except ValueError as e:
+        raise SanityError('%s: invalid JSON: %s' % (filename, e))
+
+
+def _json_path(path):
+    if isinstance(path, builtins.str):
+        return builtins.tuple(path.split('.')) if path else ()
+
+    return builtins.tuple(path)
+
+
+def _json_element(doc, path, filename):
+    ret = doc
+    for elem in path:
+        try:
+            if isinstance(ret, builtins.list):
+                ret = ret[builtins.int(elem)]
+            else:
+                ret = ret[elem]
+        except (IndexError, KeyError, TypeError, ValueError):
+            raise SanityError("no such element in `%s': %s" %
+                              (filename, '.'.join(builtins.map(str, path))))
+
+    return ret
+
+
+@deferrable
+def extractjson(filename, path, conv=None, encoding='utf-8'):
+    '''Extract the element at ``path`` from the JSON file ``filename``.
+
+    :arg filename: The name of the JSON file.
+    :arg path: The path to the element, either as a sequence of object keys
+        and array indices or as a string of them separated by dots, e.g.,
+        ``'results.0.bandwidth'``.
+        An empty path refers to the whole document.
+    :arg conv: A callable that takes a single argument and returns a new value.
+        If provided, it will be used to convert the extracted value before
+        returning it.
+    :arg encoding: The name of the encoding used to decode the file.
+    :returns: The extracted value.
+        Objects and arrays are returned as copies, so that modifying them
+        does not affect any other extraction.
+    :raises reframe.core.exceptions.SanityError: In case of errors.
+
+    Inside a :func:`file_cache` context, the file is parsed only once for all
+    the elements extracted from it.
+    Inside a :func:`combined_scan` context, large files are also parsed only
+    once for all the elements requested from them.
+
+    .. versionadded:: 3.0
+    '''
+    path = _json_path(path)
+    key = ('json', _resolve_path(filename), encoding)
+    ret = _scanned_element(key, path)
+    if ret is _NOT_SCANNED:
+        doc = _parsed(key, filename,
+                      functools.partial(_parse_json, filename=filename),
+                      {path})
+        ret = _json_element(doc, path, filename)
+
+    if isinstance(ret, (builtins.list, builtins.dict)):
+        ret = copy.deepcopy(ret)
+
+    return _convert(ret, conv)
+
+
+def _parse_csv(fp, delimiter, header, wanted=None):
+    '''Parse the CSV file ``fp``.
+
+    :arg wanted: The names or the indices of the columns to keep or
+        :class:`None` to keep all of them.
+    :returns: A tuple of the column names and a mapping from the index of
+        each column kept to its values.
+    '''
+    reader = csv.reader(fp, delimiter=delimiter)
+    names = builtins.next(reader, []) if header else []
+    keep = None
+    if wanted is not None:
+        keep = set()
+        for column in wanted:
+            if column in names:
+                keep.add(names.index(column))
+            elif isinstance(column, builtins.int):
+                keep.add(column)
+
+    columns = {}
+    for row in reader:
+        for i, field in builtins.enumerate(row):
+            if keep is None or i in keep:
+                columns.setdefault(i, []).append(field)
+
+    return names, columns
+
+
+def _csv_column(parsed, column, filename):
+    names, columns = parsed
+    try:
+        if isinstance(column, builtins.str):
+            column = names.index(column)
+
+        if column in columns:
+            return columns[column]
+
+        if 0 <= column < builtins.len(names):
+            # The column has a name, but no values
+            return []
+    except (TypeError, ValueError):
+        pass
+
+    raise SanityError("no such column in `%s': %s" % (filename, column))
+
+
+@deferrable
+def extractcsv(filename, column, conv=None, delimiter=',', header=True,
+               encoding='utf-8'):
+    '''Extract all values of the ``column`` of the CSV file ``filename``.
+
+    :arg filename: The name of the CSV file.
+    :arg column: The name of the column or its index, starting from ``0``.
+        Columns may be referred to by name only if the file has a header.
+        Rows that are shorter than the column are skipped.
+    :arg conv: A callable that takes a single argument and returns a new value.
+        If provided, it will be used to convert the extracted values before
+        returning them.
+    :arg delimiter: The character that separates the fields of a row.
+    :arg header: Whether the first row of the file contains the names of the
+        columns.
+    :arg encoding: The name of the encoding used to decode the file.
+    :returns: A list of the values of the column.
+    :raises reframe.core.exceptions.SanityError: In case of errors.
+
+    Inside a :func:`file_cache` context, the file is parsed only once for all
+    the columns extracted from it.
+    Inside a :func:`combined_scan` context, large files are also parsed only
+    once for all the columns requested from them.
+    Otherwise, only the requested column is kept from the parse.
+
+    .. versionadded:: 3.0
+    '''
+    key = ('csv', _resolve_path(filename), encoding, delimiter, header)
+    values = _scanned_element(key, column)
+    if values is _NOT_SCANNED:
+        try:
+            parsed = _parsed(key, filename,
+                             functools.partial(_parse_csv,
+                                               delimiter=delimiter,
+                                               header=header),
+                             {column})
+        except csv.Error as e:
+            raise SanityError('%s: invalid CSV: %s' % (filename, e))
+
+        values = _csv_column(parsed, column, filename)
+
+    return [_convert(v, conv) for v in values]
+
+
+def _parse_kv(fp, sep, wanted=None):
+    ret = {}
+    for line in fp:
+        for token in line.split():
+            key, found, value = token.partition(sep)
+            if found and (wanted is None or key in wanted):
+                ret.setdefault(key, []).append(value)
+
+    return ret
+
+
+def _kv_values(pairs, key):
+    return pairs.get(key, [])
+
+
+@deferrable
+def extractkv(filename, key, conv=None, sep='=', encoding='utf-8'):
+    '''Extract all values of ``key`` from the ``key=value`` pairs of the
+    file ``filename``.
+
+    Each line of the file may contain any number of pairs separated by
+    whitespace, e.g., ``iter=1 time=0.52 bw=1024``.
+    Any other text is ignored.
+
+    :arg filename: The name of the file to examine.
+    :arg key: The key whose values are extracted.
+    :arg conv: A callable that takes a single argument and returns a new value.
+        If provided, it will be used to convert the extracted values before
+        returning them.
+    :arg sep: The string that separates the keys from their values.
+    :arg encoding: The name of the encoding used to decode the file.
+    :returns: A list of the values of ``key`` in the order they appear in the
+        file.
+    :raises reframe.core.exceptions.SanityError: In case of errors.
+
+    Inside a :func:`file_cache` context, the file is parsed only once for all
+    the keys extracted from it.
+    Inside a :func:`combined_scan` context, large files are also parsed only
+    once for all the keys requested from them.
+
+    .. versionadded:: 3.0
+    '''
+    file_key = ('kv', _resolve_path(filename), encoding, sep)
+    values = _scanned_element(file_key, key)
+    if values is _NOT_SCANNED:
+        pairs = _parsed(file_key, filename,
+                        functools.partial(_parse_kv, sep=sep), {key})
+        values = _kv_values(pairs, key)
+
+    return [_convert(v, conv) for v in values]
 
 
 # Numeric functions
@@ -689,6 +1731,13 @@ def extractsingle(patt, filename, tag=0, conv=None, item=0, encoding='utf-8'):
 def avg(iterable):
     '''Return the average of all the elements of ``iterable``.'''
 
+    if isinstance(iterable, collections.abc.Sized):
+        num_vals = builtins.len(iterable)
+        if num_vals == 0:
+            raise SanityError('attempt to get average on an empty container')
+
+        return builtins.sum(iterable) / num_vals
+
     # We walk over the iterable manually in case this is a generator
     total = 0
     num_vals = None
@@ -780,11 +1829,11 @@ def count_uniq(iterable):
 @deferrable
 def glob(pathname, *, recursive=False):
     '''Replacement for the :func:`glob.glob() <python:glob.glob>` function.'''
-    return pyglob.glob(pathname, recursive=recursive)
+    return list(_iglob(pathname, recursive))
 
 
 @deferrable
 def iglob(pathname, recursive=False):
     '''Replacement for the :func:`glob.iglob() <python:glob.iglob>`
     function.'''
-    return pyglob.iglob(pathname, recursive=recursive)
+    return _iglob(pathname, recursive)
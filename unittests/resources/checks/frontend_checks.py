@@ -189,6 +189,22 @@ class SleepCheckPollFailLate(SleepCheck):
             raise ValueError
 
 
+class SleepCheckLongBuild(SleepCheck):
+    '''Emulate a test with a build phase lasting `build_time` seconds.'''
+
+    def __init__(self, sleep_time, build_time):
+        super().__init__(sleep_time)
+        self.build_system = 'Make'
+        self.prebuild_cmd = ['sleep %s' % build_time,
+                             'echo "all:" > Makefile']
+
+    def compile(self):
+        rfm.RegressionTest.compile(self)
+
+    def compile_wait(self):
+        rfm.RegressionTest.compile_wait(self)
+
+
 class RetriesCheck(BaseFrontendCheck):
     def __init__(self, run_to_pass, filename):
         super().__init__()
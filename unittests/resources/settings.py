@@ -10,6 +10,7 @@
 
 class ReframeSettings:
     job_poll_intervals = [1, 2, 3]
+    job_poll_max_interval = 5
     job_submit_timeout = 60
     checks_path = ['checks/']
     checks_path_recurse = True
@@ -60,6 +61,8 @@ class ReframeSettings:
                         },
                         'access': [],
                         'environs': ['PrgEnv-gnu', 'builtin-gcc'],
+                        'max_nodes': 8,
+                        'max_gpus': 32,
                         'descr': 'GPU partition',
                     }
                 }
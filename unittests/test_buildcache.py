@@ -0,0 +1,124 @@
+# Copyright 2016-2020 Swiss National Supercomputing Centre (CSCS/ETH Zurich)
+# ReFrame Project Developers. See the top-level LICENSE file for details.
+#
+# SPDX-License-Identifier: BSD-3-Clause
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import reframe.utility.os_ext as os_ext
+from reframe.core.buildcache import BuildCache
+from reframe.core.environments import Environment
+
+
+class TestBuildCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(dir='unittests')
+        self.cache = BuildCache(os.path.join(self.tmpdir, 'cache'),
+                                max_size=1024)
+        self.stagedir = os.path.join(self.tmpdir, 'stage')
+        os.makedirs(self.stagedir)
+        self.write_file('src/foo.c', 'int main() { return 0; }')
+        self.environs = [Environment('env', ['foo'], [('A', '1')])]
+
+    def tearDown(self):
+        os_ext.rmtree(self.tmpdir)
+
+    def write_file(self, path, contents):
+        path = os.path.join(self.stagedir, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as fp:
+            fp.write(contents)
+
+    def key(self, build_commands=['make'], environs=None):
+        return self.cache.key('mytest', self.stagedir, build_commands,
+                              environs or self.environs)
+
+    def test_key(self):
+        key = self.key()
+        assert key == self.key()
+        assert key != self.key(build_commands=['make -j'])
+        assert key != self.key(
+            environs=[Environment('env', ['bar'], [('A', '1')])])
+        assert key != self.key(
+            environs=[Environment('env', ['foo'], [('A', '2')])])
+
+        self.write_file('src/foo.c', 'int main() { return 1; }')
+        assert key != self.key()
+
+    def test_key_path_dependent(self):
+        key = self.key()
+
+        # The same sources staged elsewhere may not share the build
+        stagedir = self.stagedir
+        self.stagedir = os.path.join(self.tmpdir, 'stage2')
+        shutil.copytree(stagedir, self.stagedir)
+        assert key != self.key()
+
+        # Neither may links to different files of the same contents
+        self.write_file('foo.h', '')
+        self.write_file('bar.h', '')
+        os.symlink(os.path.join(self.stagedir, 'foo.h'),
+                   os.path.join(self.stagedir, 'inc.h'))
+        key = self.key()
+        os.remove(os.path.join(self.stagedir, 'inc.h'))
+        os.symlink(os.path.join(self.stagedir, 'bar.h'),
+                   os.path.join(self.stagedir, 'inc.h'))
+        assert key != self.key()
+
+    def test_store_restore(self):
+        key = self.key()
+        assert not self.cache.restore(key, self.stagedir)
+
+        self.write_file('foo.x', 'binary')
+        self.cache.store(key, self.stagedir)
+        os_ext.rmtree(self.stagedir)
+        assert self.cache.restore(key, self.stagedir)
+        with open(os.path.join(self.stagedir, 'foo.x')) as fp:
+            assert 'binary' == fp.read()
+
+    def test_restore_failure(self):
+        key = self.key()
+        self.write_file('foo.x', 'binary')
+        self.cache.store(key, self.stagedir)
+        os.remove(os.path.join(self.stagedir, 'foo.x'))
+
+        def copytree(src, dst, *args, **kwargs):
+            os.makedirs(dst)
+            raise OSError('disk full')
+
+        # A failed restore leaves the stage directory intact
+        orig_copytree = shutil.copytree
+        try:
+            shutil.copytree = copytree
+            assert not self.cache.restore(key, self.stagedir)
+        finally:
+            shutil.copytree = orig_copytree
+
+        assert ['src'] == os.listdir(self.stagedir)
+        assert [] == [f for f in os.listdir(self.tmpdir)
+                      if f.startswith('stage.')]
+
+    def test_store_too_large(self):
+        key = self.key()
+        self.write_file('foo.x', 'x'*2048)
+        self.cache.store(key, self.stagedir)
+        assert not self.cache.restore(key, self.stagedir)
+
+    def test_evict(self):
+        keys = []
+        for i in range(3):
+            self.write_file('foo.x', str(i)*400)
+            keys.append(self.key())
+            self.cache.store(keys[-1], self.stagedir)
+
+            # Make sure that the entries have different access times
+            time.sleep(0.01)
+
+        # The least recently used entry must have been evicted
+        assert not self.cache.restore(keys[0], self.stagedir)
+        assert self.cache.restore(keys[1], self.stagedir)
+        assert self.cache.restore(keys[2], self.stagedir)
@@ -18,6 +18,8 @@ import reframe.core.config as config
 import reframe.core.environments as env
 import reframe.core.runtime as rt
 import reframe.utility.os_ext as os_ext
+from reframe.core.schedulers.slurm import node_inventory
+from reframe.core.schedulers.slurmrest import rest_node_inventory
 import unittests.fixtures as fixtures
 
 
@@ -143,6 +145,18 @@ class TestFrontend(unittest.TestCase):
         assert 0 == returncode
         self.assert_log_file_is_saved()
 
+    def test_node_inventory_ttl(self):
+        self.more_options = ['--node-inventory-ttl', '5']
+        inventories = [node_inventory(), rest_node_inventory()]
+        ttls = [inv.ttl for inv in inventories]
+        try:
+            returncode, *_ = self._run_reframe()
+            assert 0 == returncode
+            assert [5, 5] == [inv.ttl for inv in inventories]
+        finally:
+            for inv, ttl in zip(inventories, ttls):
+                inv.ttl = ttl
+
     @fixtures.switch_to_user_runtime
     def test_check_submit_success(self):
         # This test will run on the auto-detected system
@@ -358,6 +372,19 @@ class TestFrontend(unittest.TestCase):
         returncode, *_ = self._run_reframe()
         assert 0 != returncode
 
+    def test_discovery_cache(self):
+        cache_file = os.path.join(self.prefix, 'discovery.json')
+        self.checkpath = ['unittests/resources/checks']
+        self.more_options = ['-n', 'hellocheck',
+                             '--discovery-cache', cache_file]
+        self.action = 'list'
+        for i in range(2):
+            returncode, stdout, _ = self._run_reframe()
+            assert 0 == returncode
+            assert 'Found 1 check(s)' in stdout
+
+        assert os.path.exists(cache_file)
+
     def test_timestamp_option(self):
         from datetime import datetime
 
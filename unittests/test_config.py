@@ -43,6 +43,12 @@ class TestSiteConfigurationFromDict(unittest.TestCase):
         assert len(part_login.environs) == 3
         assert len(part_gpu.environs) == 2
 
+        # Check the resource limits of the partitions
+        assert part_login.max_nodes is None
+        assert part_gpu.max_nodes == 8
+        assert part_gpu.max_tasks is None
+        assert part_gpu.max_gpus == 32
+
         # Check local partition environment
         assert part_gpu.local_env.modules == ['foogpu']
         assert part_gpu.local_env.variables == {'FOO_GPU': 'yes'}
@@ -3,7 +3,9 @@
 #
 # SPDX-License-Identifier: BSD-3-Clause
 
+import functools
 import unittest
+
 import reframe.utility.sanity as sn
 
 
@@ -349,3 +351,71 @@ class TestDeferredNumericOps(unittest.TestCase):
         dv |= V(5)
         sn.evaluate(dv)
         assert 7 == v._value
+
+
+class TestDeferredEvaluation(unittest.TestCase):
+    def setUp(self):
+        self.num_calls = 0
+
+    @sn.sanity_function
+    def value(self, x):
+        self.num_calls += 1
+        return x
+
+    @sn.sanity_function
+    def values(self, n):
+        self.num_calls += 1
+        return iter(range(n))
+
+    def test_deep_expression(self):
+        expr = functools.reduce(sn.and_, (sn.defer(True)
+                                          for _ in range(10000)))
+        assert sn.evaluate(expr)
+
+        # The sum is a chain of deferred additions
+        values = [self.value(i) for i in range(10000)]
+        assert 49995000 == sn.evaluate(sn.sum(values))
+
+    def test_shared_subexpression(self):
+        x = self.value(2)
+        y = x * x
+        assert 16 == sn.evaluate(y * y)
+        assert 1 == self.num_calls
+
+        # Shared subexpressions of the elements of aggregates are evaluated
+        # once, too
+        self.num_calls = 0
+        assert sn.evaluate(sn.allx([x == 2, y == 4, y + x == 6]))
+        assert 1 == self.num_calls
+
+        # Each evaluation starts afresh, though
+        self.num_calls = 0
+        assert 2 == sn.evaluate(x)
+        assert 2 == sn.evaluate(x)
+        assert 2 == self.num_calls
+
+    def test_iterators_not_memoized(self):
+        it = self.values(3)
+        assert 6 == sn.evaluate(sn.count(it) + sn.count(it))
+        assert 2 == self.num_calls
+
+    def test_evaluation_session(self):
+        from reframe.core.deferrable import evaluation_session
+
+        x = self.value(2)
+        memo = {}
+        with evaluation_session(memo):
+            assert 2 == sn.evaluate(x)
+            assert 4 == sn.evaluate(x + x)
+
+        assert 1 == self.num_calls
+
+        # Sessions sharing the same memo reuse the results
+        with evaluation_session(memo):
+            assert 2 == sn.evaluate(x)
+
+        assert 1 == self.num_calls
+        with evaluation_session():
+            assert 2 == sn.evaluate(x)
+
+        assert 2 == self.num_calls
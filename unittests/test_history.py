@@ -0,0 +1,70 @@
+# Copyright 2016-2020 Swiss National Supercomputing Centre (CSCS/ETH Zurich)
+# ReFrame Project Developers. See the top-level LICENSE file for details.
+#
+# SPDX-License-Identifier: BSD-3-Clause
+
+import os
+import pytest
+import sqlite3
+import tempfile
+import unittest
+
+import reframe.utility.os_ext as os_ext
+from reframe.core.exceptions import ReframeError
+from reframe.core.history import RuntimeHistory
+
+
+class TestRuntimeHistory(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(dir='unittests')
+        self.filename = os.path.join(self.tmpdir, 'history', 'runtimes.db')
+        self.history = RuntimeHistory(self.filename)
+
+    def tearDown(self):
+        self.history.close()
+        os_ext.rmtree(self.tmpdir)
+
+    def test_estimate(self):
+        assert self.history.estimate('t0', 'sys:p0', 'e0') is None
+        self.history.record('t0', 'sys:p0', 'e0', build=10, run=2)
+        self.history.record('t0', 'sys:p0', 'e0', build=20, run=4)
+        self.history.record('t0', 'sys:p0', 'e1', run=100)
+        assert 2 == self.history.num_runs('t0', 'sys:p0', 'e0')
+        assert 15 == self.history.estimate('t0', 'sys:p0', 'e0', 'build')
+        assert 3 == self.history.estimate('t0', 'sys:p0', 'e0')
+        assert self.history.estimate('t0', 'sys:p0', 'e0', 'queue') is None
+        assert 100 == self.history.estimate('t0', 'sys:p0', 'e1')
+
+    def test_estimate_last_runs(self):
+        for i in range(5):
+            self.history.record('t0', 'sys:p0', 'e0', timestamp=i, run=i)
+
+        assert 3.5 == self.history.estimate('t0', 'sys:p0', 'e0', last=2)
+
+    def test_persistence(self):
+        self.history.record('t0', 'sys:p0', 'e0', run=2)
+        self.history.close()
+        self.history = RuntimeHistory(self.filename)
+        assert 2 == self.history.estimate('t0', 'sys:p0', 'e0')
+
+    def test_context_manager(self):
+        self.history.close()
+        with RuntimeHistory(self.filename) as history:
+            history.record('t0', 'sys:p0', 'e0', run=2)
+
+        with pytest.raises(sqlite3.ProgrammingError):
+            history.num_runs('t0', 'sys:p0', 'e0')
+
+        self.history = RuntimeHistory(self.filename)
+        assert 1 == self.history.num_runs('t0', 'sys:p0', 'e0')
+
+    def test_unknown_phase(self):
+        with pytest.raises(ValueError):
+            self.history.record('t0', 'sys:p0', 'e0', foo=1)
+
+        with pytest.raises(ValueError):
+            self.history.estimate('t0', 'sys:p0', 'e0', 'foo')
+
+    def test_open_failure(self):
+        with pytest.raises(ReframeError):
+            RuntimeHistory(self.tmpdir)
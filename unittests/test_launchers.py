@@ -7,6 +7,7 @@ import abc
 import unittest
 
 import reframe.core.launchers as launchers
+from reframe.core.launchers.mpi import SrunStepLauncher
 from reframe.core.launchers.registry import getlauncher
 from reframe.core.schedulers import Job, JobScheduler
 
@@ -149,6 +150,43 @@ class TestSrunallocLauncher(_TestLauncher, unittest.TestCase):
                 '--foo')
 
 
+class TestSrunStepLauncher(_TestLauncher, unittest.TestCase):
+
+    @property
+    def launcher(self):
+        return SrunStepLauncher(1234, ['nid001', 'nid002'])
+
+    @property
+    def expected_command(self):
+        return ('srun '
+                '--jobid=1234 '
+                '--exclusive '
+                '--nodes=2 '
+                '--nodelist=nid[001-002] '
+                '--job-name=fake_job '
+                '--time=0:10:0 '
+                '--ntasks=4 '
+                '--ntasks-per-node=2 '
+                '--ntasks-per-core=1 '
+                '--ntasks-per-socket=1 '
+                '--cpus-per-task=2 '
+                '--hint=multithread '
+                '--fake '
+                '--gres=gpu:4 '
+                '--foo')
+
+    @property
+    def expected_minimal_command(self):
+        return ('srun '
+                '--jobid=1234 '
+                '--exclusive '
+                '--nodes=2 '
+                '--nodelist=nid[001-002] '
+                '--job-name=fake_job '
+                '--ntasks=1 '
+                '--foo')
+
+
 class TestAlpsLauncher(_TestLauncher, unittest.TestCase):
     @property
     def launcher(self):
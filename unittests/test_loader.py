@@ -5,8 +5,12 @@
 
 import os
 import pytest
+import shutil
+import tempfile
 import unittest
 
+import reframe.frontend.check_filters as filters
+
 from reframe.core.exceptions import (ConfigError, NameConflictError,
                                      RegressionTestLoadError)
 from reframe.core.systems import System
@@ -71,3 +75,69 @@ class TestRegressionCheckLoader(unittest.TestCase):
         tests = self.loader.load_from_file(
             'unittests/resources/checks_unlisted/bad_init_check.py')
         assert 0 == len(tests)
+
+    def test_load_all_parallel(self):
+        loader = RegressionCheckLoader(
+            ['unittests/resources/checks', 'unittests/foobar'],
+            ignore_conflicts=True, num_workers=4)
+        checks = loader.load_all()
+        assert ([c.name for c in self.loader_with_path.load_all()] ==
+                [c.name for c in checks])
+
+    def test_load_recursive_parallel(self):
+        loader = RegressionCheckLoader(['.'], ignore_conflicts=True,
+                                       num_workers=4)
+        checks = loader.load_from_dir('unittests/resources/checks',
+                                      recurse=True)
+        assert 12 == len(checks)
+
+    def test_conflicted_checks_parallel(self):
+        loader = RegressionCheckLoader(['unittests/resources/checks'],
+                                       num_workers=4)
+        with pytest.raises(NameConflictError):
+            loader.load_all()
+
+    def test_discovery_cache(self):
+        with tempfile.TemporaryDirectory(dir='unittests') as tmp:
+            cache_file = os.path.join(tmp, 'cache', 'discovery.json')
+            loader = RegressionCheckLoader(['unittests/resources/checks'],
+                                           ignore_conflicts=True,
+                                           cache_file=cache_file)
+            checks = loader.load_all()
+            assert os.path.exists(cache_file)
+
+            # A new loader must not validate or import any unselected file
+            def _validate(filename):
+                assert False, 'file validated: %s' % filename
+
+            def _import(filename):
+                assert os.path.basename(filename) == 'emptycheck.py'
+                return RegressionCheckLoader._import_and_instantiate(
+                    loader, filename)
+
+            cached_loader = RegressionCheckLoader(
+                ['unittests/resources/checks'], ignore_conflicts=True,
+                cache_file=cache_file)
+            cached_loader._validate_source = _validate
+            cached_loader._import_and_instantiate = _import
+            checks = cached_loader.load_all(
+                check_filter=filters.have_name('EmptyTest'))
+            assert ['EmptyTest'] == [c.name for c in checks]
+
+    def test_discovery_cache_modified_file(self):
+        with tempfile.TemporaryDirectory(dir='unittests') as tmp:
+            cache_file = os.path.join(tmp, 'discovery.json')
+            testfile = os.path.join(tmp, 'mycheck.py')
+            shutil.copyfile('unittests/resources/checks/emptycheck.py',
+                            testfile)
+            loader = RegressionCheckLoader([tmp], cache_file=cache_file)
+            assert 1 == len(loader.load_all())
+
+            # Turn the test file into a non-test file
+            with open(testfile, 'w') as fp:
+                fp.write('x = 1\n')
+
+            loader = RegressionCheckLoader([tmp], cache_file=cache_file)
+            assert [] == loader.load_all(
+                check_filter=filters.have_name('EmptyTest'))
+            assert loader.cache.valid(testfile) is False
@@ -14,6 +14,7 @@ import reframe.core.runtime as rt
 import reframe.utility.os_ext as os_ext
 import reframe.utility.sanity as sn
 import unittests.fixtures as fixtures
+from reframe.core.buildcache import BuildCache
 from reframe.core.exceptions import (BuildError, PipelineError, ReframeError,
                                      ReframeSyntaxError, PerformanceError,
                                      SanityError)
@@ -367,6 +368,49 @@ class TestRegressionTest(unittest.TestCase):
 
         self._run_test(MyTest())
 
+    def test_build_cache(self):
+        def _load_test():
+            test = HelloTest()
+            test.valid_prog_environs = [self.prgenv.name]
+            test.local = True
+            test.build_cache = BuildCache(
+                os.path.join(rt.runtime().resources.prefix, 'buildcache'))
+            return test
+
+        test = _load_test()
+        self._run_test(test)
+        assert not test.build_cached
+
+        # The build of the second test is restored from the cache
+        test = _load_test()
+        test.setup(self.partition, self.prgenv)
+        test.compile()
+        assert test.build_cached
+        assert test.compile_complete()
+        test.compile_wait()
+        assert os.path.exists(os.path.join(test.stagedir, test.executable))
+        test.run()
+        test.wait()
+        test.check_sanity()
+
+    def test_build_cache_changed_commands(self):
+        test = HelloTest()
+        test.local = True
+        test.build_cache = BuildCache(
+            os.path.join(rt.runtime().resources.prefix, 'buildcache'))
+        _run(test, self.partition, self.prgenv)
+
+        # Changing the build commands must invalidate the cached build
+        test = HelloTest()
+        test.local = True
+        test.build_cache = BuildCache(
+            os.path.join(rt.runtime().resources.prefix, 'buildcache'))
+        test.prebuild_cmd = ['echo rebuilding']
+        test.setup(self.partition, self.prgenv)
+        test.compile()
+        assert not test.build_cached
+        test.compile_wait()
+
     def test_sourcepath_abs(self):
         @fixtures.custom_prefix('unittests/resources/checks')
         class MyTest(rfm.CompileOnlyRegressionTest):
@@ -797,6 +841,25 @@ class TestSanityPatterns(unittest.TestCase):
         self.test.check_sanity()
         self.test.check_performance()
 
+    def test_output_files_read_once(self):
+        self.write_performance_output(performance1=1.3,
+                                      performance2=1.8,
+                                      performance3=3.3)
+        self.output_file.write('result = success\n')
+        self.output_file.close()
+        self.test.sanity()
+        self.test.check_performance()
+
+        # All performance values come from the same file, which is shared
+        # with the sanity checking phase
+        assert {self.perf_file.name, self.output_file.name} == {
+            path for path, *_ in self.test._file_cache.keys()
+        }
+
+        # The cache is dropped once the performance checking is over
+        self.test.performance()
+        assert {} == self.test._file_cache
+
     def test_sanity_failure(self):
         self.output_file.write('result = failure\n')
         self.output_file.close()
@@ -944,14 +1007,14 @@ class TestSanityPatterns(unittest.TestCase):
         # failing To test this, we need an extract function that will have a
         # side effect when evaluated, whose result we will check after calling
         # `check_performance()`.
-        logfile = 'perf.log'
+        logfile = os.path.join(self.test.stagedir, 'perf.log')
 
         @sn.sanity_function
         def extract_perf(patt, tag):
             val = sn.evaluate(
                 sn.extractsingle(patt, self.perf_file.name, tag, float))
 
-            with open('perf.log', 'a') as fp:
+            with open(logfile, 'a') as fp:
                 fp.write('%s=%s' % (tag, val))
 
             return val
@@ -967,7 +1030,6 @@ class TestSanityPatterns(unittest.TestCase):
         with pytest.raises(PerformanceError) as cm:
             self.test.check_performance()
 
-        logfile = os.path.join(self.test.stagedir, logfile)
         with open(logfile) as fp:
             log_output = fp.read()
 
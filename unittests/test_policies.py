@@ -5,9 +5,13 @@
 
 import collections
 import itertools
+import math
 import os
 import pytest
+import signal
 import tempfile
+import threading
+import time
 import unittest
 
 import reframe as rfm
@@ -17,11 +21,17 @@ import reframe.frontend.executors as executors
 import reframe.frontend.executors.policies as policies
 import reframe.utility as util
 import reframe.utility.os_ext as os_ext
+import reframe.utility.sanity as sn
 from reframe.core.environments import Environment
+from reframe.core.history import RuntimeHistory
+from reframe.core.launchers.mpi import SrunLauncher
+from reframe.core.schedulers.local import LocalJobScheduler
+from reframe.core.schedulers.slurm import SlurmJobScheduler
 from reframe.core.exceptions import (
-    DependencyError, JobNotStartedError, TaskDependencyError
+    DependencyError, JobError, JobNotStartedError, TaskDependencyError
 )
 from reframe.frontend.loader import RegressionCheckLoader
+from reframe.frontend.printer import PrettyPrinter
 import unittests.fixtures as fixtures
 from unittests.resources.checks.hellocheck import HelloTest
 from unittests.resources.checks.frontend_checks import (
@@ -32,10 +42,25 @@ from unittests.resources.checks.frontend_checks import (
     SleepCheck,
     SleepCheckPollFail,
     SleepCheckPollFailLate,
+    SleepCheckLongBuild,
     SystemExitCheck,
 )
 
 
+class _RecordingPrinter(PrettyPrinter):
+    '''A printer keeping the information and warning messages.'''
+
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def info(self, msg=''):
+        self.messages.append(msg)
+
+    def warning(self, msg):
+        self.messages.append(msg)
+
+
 class TestSerialExecutionPolicy(unittest.TestCase):
     def setUp(self):
         self.loader = RegressionCheckLoader(['unittests/resources/checks'],
@@ -165,6 +190,39 @@ class TestSerialExecutionPolicy(unittest.TestCase):
         for t in stats.tasks():
             assert t.check.local
 
+    def test_time_remaining(self):
+        with tempfile.TemporaryDirectory(dir='unittests') as tmp:
+            history_file = os.path.join(tmp, 'history.db')
+            with RuntimeHistory(history_file) as history:
+                checks = [SleepCheck(0.1), SleepCheck(0.1)]
+                checks[1].time_limit = '1m'
+                for c, runtime in zip(checks, [50, 100]):
+                    history.record(c.name, 'generic:login', 'builtin-gcc',
+                                   run=runtime)
+
+                printer = _RecordingPrinter()
+                policy = self.runner.policy
+                policy.runtime_history = history
+                self.runner = executors.Runner(policy, printer)
+                self.runall(checks)
+
+                # The time remaining is reported whenever a test finishes,
+                # unless it was the last one
+                remaining = [m for m in printer.messages
+                             if m.startswith('Estimated time remaining')]
+                assert 1 == len(remaining)
+                assert any('the time limit of the test is shorter' in m and
+                           checks[1].name in m for m in printer.messages)
+
+                # The time the tests have been running is not remaining
+                case = max((t.testcase for t in self.runner.stats.tasks()),
+                           key=policy.estimated_runtime)
+                assert (policy.estimated_duration([case], {case: 30}) ==
+                        policy.estimated_duration([case]) - 30)
+                assert 0 == policy.estimated_duration([case], {case: 100})
+                assert not any(isinstance(l, executors._TimeRemainingReport)
+                               for l in policy.task_listeners)
+
     def test_kbd_interrupt_within_test(self):
         check = KeyboardInterruptCheck()
         with pytest.raises(KeyboardInterrupt):
@@ -262,6 +320,87 @@ class TestSerialExecutionPolicy(unittest.TestCase):
         self.test_dependencies()
 
 
+class _HeldJobScheduler(SlurmJobScheduler):
+    '''Run Slurm jobs locally honouring their ``afterok`` dependencies.
+
+    A job is started only after the jobs it depends on have exited
+    successfully and it is never started if any of them fails.
+    '''
+
+    _jobids = itertools.count(1000000)
+
+    def __init__(self):
+        super().__init__()
+        self._local = LocalJobScheduler()
+        self._held_on = []
+        self._started = False
+        self._cancelled = False
+
+    def add_dependencies(self, *jobs):
+        super().add_dependencies(*jobs)
+        self._held_on += jobs
+
+    def _release(self, job):
+        if self._started or self._cancelled:
+            return
+
+        for j in self._held_on:
+            if not j.scheduler._started or not j.finished():
+                return
+
+            if j.scheduler._local._proc.returncode != 0:
+                return
+
+        # Start the job from its working directory, since we may be called
+        # from anywhere
+        local = self._local
+        local._f_stdout = open(os.path.join(job.workdir, job.stdout), 'w+')
+        local._f_stderr = open(os.path.join(job.workdir, job.stderr), 'w+')
+        local._proc = os_ext.run_command_async(
+            'bash %s' % os.path.join(job.workdir, job.script_filename),
+            stdout=local._f_stdout, stderr=local._f_stderr,
+            start_new_session=True, cwd=job.workdir
+        )
+        job.jobid = local._proc.pid
+        self._started = True
+
+    def submit(self, job):
+        self._release(job)
+        if not self._started:
+            job.jobid = next(self._jobids)
+
+    def poll(self, *jobs):
+        pass
+
+    def completion_time(self, job):
+        return None
+
+    def start_time(self, job):
+        return None
+
+    def started(self, job):
+        return self._started
+
+    def finished(self, job):
+        self._release(job)
+        if not self._started:
+            return self._cancelled
+
+        return self._local.finished(job)
+
+    def wait(self, job):
+        while not self.finished(job):
+            time.sleep(0.1)
+
+        if self._started:
+            self._local.wait(job)
+
+    def cancel(self, job):
+        self._cancelled = True
+        if self._started:
+            self._local.cancel(job)
+
+
 class TaskEventMonitor(executors.TaskEventListener):
     '''Event listener for monitoring the execution of the asynchronous
     execution policy.
@@ -315,6 +454,116 @@ class TestAsynchronousExecutionPolicy(TestSerialExecutionPolicy):
         for p in rt.runtime().system.partitions:
             p._max_jobs = value
 
+    def test_dependencies_with_job_dependencies(self):
+        # Tests running locally must wait for their dependencies as usual
+        self.runner.policy.use_job_dependencies = True
+        self.test_dependencies()
+        assert {} == self.runner.policy._held_tasks
+
+    def run_held_dependency(self, parent_fails=False):
+        parent = SleepCheck(1)
+        if parent_fails:
+            parent.post_run += ['exit 1']
+            parent.sanity_patterns = sn.assert_found(r'no such output',
+                                                     parent.stdout)
+
+        child = SleepCheck(0.1)
+        child.depends_on(parent.name)
+        parent.local = child.local = False
+
+        # Run the jobs of the generic:login partition as Slurm jobs
+        partition = rt.runtime().system.partitions[0]
+        sched_type = partition._scheduler
+        partition._scheduler = _HeldJobScheduler
+        self.runner.policy.use_job_dependencies = True
+        try:
+            self.runall([parent, child], sort=True)
+        finally:
+            partition._scheduler = sched_type
+
+        self.assertRunall()
+        assert {} == self.runner.policy._held_tasks
+        tasks = {t.check.name: t for t in self.runner.stats.tasks()}
+        return tasks[parent.name], tasks[child.name]
+
+    def test_held_dependency(self):
+        parent, child = self.run_held_dependency()
+        assert 0 == len(self.runner.stats.failures())
+
+        # The child was submitted while its parent was running and Slurm
+        # held it until its parent had finished
+        job = child.check.job
+        assert [str(parent.check.job.jobid)] == job.scheduler.dependencies
+        with open(os.path.join(job.workdir, job.script_filename)) as fp:
+            assert ('#SBATCH --dependency=afterok:%s' %
+                    parent.check.job.jobid in fp.read())
+
+        self.read_timestamps([parent])
+        parent_end = self.end_stamps[0]
+        self.read_timestamps([child])
+        assert parent_end <= self.begin_stamps[0]
+
+    def test_held_dependency_fails(self):
+        parent, child = self.run_held_dependency(parent_fails=True)
+        assert 2 == len(self.runner.stats.failures())
+        assert parent.failed_stage == 'sanity'
+        assert isinstance(child.exc_info[1], TaskDependencyError)
+
+        # The job of the child was cancelled without ever being started
+        job = child.check.job
+        assert [str(parent.check.job.jobid)] == job.scheduler.dependencies
+        assert job.scheduler._cancelled
+        assert not job.scheduler.started(job)
+
+    def test_held_tasks_fail_with_dependency(self):
+        policy = self.runner.policy
+        parent_case, child_case = executors.generate_testcases(
+            [SleepCheck(0.1), SleepCheck(0.1)]
+        )
+        parent = executors.RegressionTask(parent_case, policy.task_listeners)
+        child = executors.RegressionTask(child_case, policy.task_listeners)
+        grandchild = executors.RegressionTask(child_case,
+                                              policy.task_listeners)
+        policy._held_tasks = {parent: [child], child: [grandchild]}
+        policy._ready_tasks = {'generic:login': []}
+        policy._running_tasks_counts = {'generic:login': 0}
+        for t in (child, grandchild):
+            t.setup(t.testcase.partition, t.testcase.environ)
+
+        parent.fail()
+        for t in (child, grandchild):
+            assert t.failed
+            assert isinstance(t.exc_info[1], TaskDependencyError)
+
+        assert {} == policy._held_tasks
+
+        # Failed tasks must not be scheduled
+        assert policy._next_ready_task('generic:login') is None
+
+    def test_runall_without_finalize_pool(self):
+        self.runner.policy.max_finalize_jobs = 0
+        self.test_runall()
+
+    def test_finalize_off_main_loop(self):
+        evaluations = []
+
+        @sn.sanity_function
+        def record_evaluation(check):
+            evaluations.append((threading.current_thread(), os.getcwd()))
+            return sn.evaluate(sn.assert_found(r'\d+', check.stdout))
+
+        checks = [SleepCheck(0.1) for i in range(3)]
+        for c in checks:
+            c.sanity_patterns = record_evaluation(c)
+
+        cwd = os.getcwd()
+        self.runall(checks)
+        assert 3 == self.runner.stats.num_cases()
+        assert 0 == len(self.runner.stats.failures())
+        assert 3 == len(evaluations)
+        assert all(t is not threading.main_thread() and d == cwd
+                   for t, d in evaluations)
+
     def read_timestamps(self, tasks):
         '''Read the timestamps and sort them to permit simple
         concurrency tests.'''
@@ -475,6 +724,303 @@ class TestAsynchronousExecutionPolicy(TestSerialExecutionPolicy):
         self.assertRunall()
         assert num_tasks == len(stats.failures())
 
+    def test_concurrent_builds(self):
+        checks = [SleepCheckLongBuild(0.1, 1) for i in range(3)]
+        self.set_max_jobs(len(checks))
+        self.runner.policy.max_build_jobs = len(checks)
+        t_start = time.time()
+        self.runall(checks)
+        t_elapsed = time.time() - t_start
+
+        assert len(checks) == self.runner.stats.num_cases()
+        self.assertRunall()
+        assert 0 == len(self.runner.stats.failures())
+
+        # Warn if the builds were not run in parallel
+        if t_elapsed >= len(checks):
+            pytest.skip('the system seems too loaded.')
+
+    def test_build_concurrency_limited(self):
+        checks = [SleepCheckLongBuild(0.1, 1) for i in range(3)]
+        self.set_max_jobs(len(checks))
+        self.runner.policy.max_build_jobs = 1
+        t_start = time.time()
+        self.runall(checks)
+        t_elapsed = time.time() - t_start
+
+        assert len(checks) == self.runner.stats.num_cases()
+        self.assertRunall()
+        assert 0 == len(self.runner.stats.failures())
+
+        # The builds must have run one after the other
+        assert t_elapsed >= len(checks)
+
+    def set_partition_limit(self, limit, value):
+        for p in rt.runtime().system.partitions:
+            self.addCleanup(setattr, p, limit, getattr(p, limit))
+            setattr(p, limit, value)
+
+    def test_partition_node_limit(self):
+        checks = [SleepCheck(0.5) for i in range(3)]
+        self.set_max_jobs(len(checks))
+        self.set_partition_limit('_max_nodes', 1)
+        self.runall(checks)
+
+        assert len(checks) == self.runner.stats.num_cases()
+        self.assertRunall()
+        assert 0 == len(self.runner.stats.failures())
+
+        # Every test requests a single node
+        assert 1 == max(self.monitor.num_tasks)
+
+    def test_partition_gpu_limit(self):
+        checks = [SleepCheck(0.5) for i in range(4)]
+        for c in checks:
+            c.num_gpus_per_node = 2
+
+        self.set_max_jobs(len(checks))
+        self.set_partition_limit('_max_gpus', 4)
+        self.runall(checks)
+
+        assert len(checks) == self.runner.stats.num_cases()
+        self.assertRunall()
+        assert 0 == len(self.runner.stats.failures())
+        assert 2 == max(self.monitor.num_tasks)
+
+    def test_global_job_limit(self):
+        checks = [SleepCheck(0.5) for i in range(3)]
+        self.set_max_jobs(len(checks))
+        self.runner.policy.max_jobs = 1
+        self.runall(checks)
+
+        assert len(checks) == self.runner.stats.num_cases()
+        self.assertRunall()
+        assert 0 == len(self.runner.stats.failures())
+        assert 1 == max(self.monitor.num_tasks)
+
+    def test_oversized_request(self):
+        # Tests requesting more than the limit must still run on their own
+        checks = [SleepCheck(0.1) for i in range(2)]
+        for c in checks:
+            c.num_tasks = 4
+
+        self.set_max_jobs(len(checks))
+        self.runner.policy.max_tasks = 2
+        self.runall(checks)
+
+        assert len(checks) == self.runner.stats.num_cases()
+        self.assertRunall()
+        assert 0 == len(self.runner.stats.failures())
+        assert 1 == max(self.monitor.num_tasks)
+
+    def test_requested_resources(self):
+        check = SleepCheck(0.1)
+        check.num_tasks = 8
+        check.num_tasks_per_node = 3
+        check.num_gpus_per_node = 2
+        assert ({'nodes': 3, 'tasks': 8, 'gpus': 6} ==
+                policies._requested_resources(check))
+
+        # Without the number of tasks per node, each task may be placed on a
+        # node of its own
+        check.num_tasks_per_node = None
+        assert ({'nodes': 8, 'tasks': 8, 'gpus': 16} ==
+                policies._requested_resources(check))
+
+        # Flexible tests request all the resources
+        check.num_tasks = 0
+        assert all(math.isinf(n) for n in
+                   policies._requested_resources(check).values())
+
+    def test_priority_scheduling(self):
+        checks = [SleepCheck(0.1) for i in range(3)]
+        for c, time_limit in zip(checks, ['1m', '3m', '2m']):
+            c.time_limit = time_limit
+
+        self.set_max_jobs(1)
+        self.runall(checks)
+
+        assert len(checks) == self.runner.stats.num_cases()
+        self.assertRunall()
+        assert 0 == len(self.runner.stats.failures())
+
+        # The tests with the longest estimated runtime must run first
+        assert ([checks[1].name, checks[2].name, checks[0].name] ==
+                [t.check.name for t in self.monitor.tasks])
+
+    def test_runtime_history(self):
+        with tempfile.TemporaryDirectory(dir='unittests') as tmp:
+            history_file = os.path.join(tmp, 'history.db')
+            with RuntimeHistory(history_file) as history:
+                self.runner.policy.runtime_history = history
+                checks = [SleepCheck(0.5), SleepCheck(0.1)]
+                self.runall(checks)
+                assert 0 == len(self.runner.stats.failures())
+                for c in checks:
+                    assert 1 == history.num_runs(c.name, 'generic:login',
+                                                 'builtin-gcc')
+
+                # The estimates must be derived from the recorded runtimes
+                policy = self.runner.policy
+                slow, fast = self.runner.stats.tasks()
+                assert (policy.estimated_runtime(slow.testcase) >
+                        policy.estimated_runtime(fast.testcase))
+                assert (policy.estimated_runtime(slow.testcase) <
+                        slow.check.time_limit.total_seconds())
+
+
+class _PendingAllocation:
+    '''An allocation that is granted only when the test says so.'''
+
+    def __init__(self, num_nodes, options=None):
+        self.num_nodes = num_nodes
+        self.granted = threading.Event()
+        self.fails = False
+        self.revoked = False
+        self.released = False
+        self.jobid = None
+        self.num_free_nodes = 0
+
+    def acquire(self):
+        self.granted.wait()
+        if self.fails or self.revoked:
+            raise JobError('allocation not granted')
+
+        self.jobid = 1234
+        self.num_free_nodes = self.num_nodes
+
+    def revoke(self):
+        self.revoked = True
+        self.granted.set()
+
+    def release(self):
+        self.released = True
+
+
+class TestPilotJobExecutionPolicy(unittest.TestCase):
+    def setUp(self):
+        self.policy = policies.PilotJobExecutionPolicy()
+        self.policy.printer = PrettyPrinter()
+        rt.runtime().resources.prefix = tempfile.mkdtemp(dir='unittests')
+
+        # Run the test as a Slurm job launched with srun
+        partition = rt.runtime().system.partitions[0]
+        case = executors.TestCase(HelloTest(), partition,
+                                  partition.environs[0])
+        case.check.local = False
+        case.partition._scheduler = SlurmJobScheduler
+        case.partition._launcher = SrunLauncher
+        self.task = executors.RegressionTask(case)
+
+        self.allocations = []
+        self.allocation_type = policies.SlurmAllocation
+        policies.SlurmAllocation = self.new_allocation
+
+    def tearDown(self):
+        policies.SlurmAllocation = self.allocation_type
+        os_ext.rmtree(rt.runtime().resources.prefix)
+
+    def new_allocation(self, *args, **kwargs):
+        allocation = _PendingAllocation(*args, **kwargs)
+        self.allocations.append(allocation)
+        return allocation
+
+    def test_pending_allocation(self):
+        # The allocation is requested when the test is set up
+        assert self.policy._setup_task(self.task)
+        assert 1 == len(self.allocations)
+        allocation = self.allocations[0]
+
+        # The test waits for the allocation without blocking the policy
+        for _ in range(2):
+            assert not self.policy._can_schedule(self.task)
+
+        assert 1 == len(self.allocations)
+        assert self.policy._allocation_of(self.task) is None
+
+        allocation.granted.set()
+        self.policy._wait_idle()
+        self.policy._poll_tasks()
+        assert self.policy._can_schedule(self.task)
+        assert allocation is self.policy._allocation_of(self.task)
+
+        self.policy._release_allocations()
+        assert allocation.released
+
+    def test_failed_allocation(self):
+        assert self.policy._setup_task(self.task)
+        allocation = self.allocations[0]
+        allocation.fails = True
+        allocation.granted.set()
+        self.policy._wait_idle()
+        self.policy._poll_tasks()
+
+        # The test is submitted as a separate job
+        assert self.policy._can_schedule(self.task)
+        assert self.policy._allocation_of(self.task) is None
+
+    def test_revoke_pending_allocation(self):
+        assert self.policy._setup_task(self.task)
+        allocation = self.allocations[0]
+        self.policy._release_allocations()
+        assert allocation.revoked
+        assert {} == self.policy._pending_allocations
+
+
+class TestChildExitWatcher(unittest.TestCase):
+    def setUp(self):
+        self.watcher = policies._ChildExitWatcher()
+        self.watcher.start()
+
+    def tearDown(self):
+        self.watcher.stop()
+
+    def test_wakeup_on_child_exit(self):
+        assert self.watcher.active
+        proc = os_ext.run_command_async('true')
+        t_start = time.time()
+        assert self.watcher.wait(10)
+        assert time.time() - t_start < 5
+        proc.wait()
+
+    def test_timeout(self):
+        # Children of earlier tests may still exit while we wait, so that only
+        # the predicate must decide whether we are woken up
+        t_start = time.time()
+        assert not self.watcher.wait(0.1, lambda: False)
+        assert time.time() - t_start >= 0.1
+
+    def test_helper_process_does_not_wake_up(self):
+        # Signals of earlier helper processes must not cut the wait short
+        os_ext.run_command('true')
+        t_start = time.time()
+        assert not self.watcher.wait(0.5, lambda: False)
+        assert time.time() - t_start >= 0.5
+
+        # Neither do helper processes spawned while waiting
+        proc = os_ext.run_command_async('sleep 0.1')
+        t_start = time.time()
+        assert not self.watcher.wait(0.5, lambda: False)
+        assert time.time() - t_start >= 0.5
+        proc.wait()
+
+    def test_wakeup_on_own_child_exit(self):
+        proc = os_ext.run_command_async('sleep 0.1')
+        t_start = time.time()
+        assert self.watcher.wait(10, lambda: proc.poll() is not None)
+        assert time.time() - t_start < 5
+
+    def test_notify(self):
+        os_ext.run_command('true')
+        self.watcher.notify()
+        assert self.watcher.wait(10, lambda: False)
+
+    def test_stop(self):
+        self.watcher.stop()
+        assert not self.watcher.active
+        assert signal.getsignal(signal.SIGCHLD) == signal.SIG_DFL
+        assert not self.watcher.wait(0.1)
+
 
 class TestDependencies(unittest.TestCase):
     class Node:
@@ -918,3 +1464,44 @@ class TestDependencies(unittest.TestCase):
         )
         cases = dependency.toposort(partial_deps, is_subgraph=True)
         self.assert_topological_order(cases, partial_deps)
+
+    @rt.switch_runtime(fixtures.TEST_SITE_CONFIG, 'sys0')
+    def test_critical_paths(self):
+        #
+        #       t0       t3
+        #       ^        ^
+        #       |        |
+        #   +---t1       t4
+        #   |
+        #   t2
+        #
+        tests = [self.create_test('t%s' % i) for i in range(5)]
+        tests[1].depends_on('t0')
+        tests[2].depends_on('t1')
+        tests[4].depends_on('t3')
+        tests[3].time_limit = '10m'
+        tests[4].time_limit = '1m'
+        for t in tests[:3]:
+            t.time_limit = '2m'
+
+        deps = dependency.build_deps(executors.generate_testcases(tests))
+        cases = dependency.toposort(deps)
+        paths = dependency.critical_paths(
+            cases, lambda c: c.check.time_limit.total_seconds()
+        )
+        lengths = {(c.check.name, c.partition.fullname, c.environ.name): n
+                   for c, n in paths.items()}
+        for p in ['sys0:p0', 'sys0:p1']:
+            for e in ['e0', 'e1']:
+                assert 360 == lengths['t0', p, e]
+                assert 240 == lengths['t1', p, e]
+                assert 120 == lengths['t2', p, e]
+                assert 660 == lengths['t3', p, e]
+                assert 60 == lengths['t4', p, e]
+
+        # Prioritizing the cases by their critical path must keep them sorted
+        # topologically
+        policy = policies.AsynchronousExecutionPolicy()
+        prioritized = policy.prioritize(cases)
+        self.assert_topological_order(prioritized, deps)
+        assert 't3' == prioritized[0].check.name
@@ -3,15 +3,20 @@
 #
 # SPDX-License-Identifier: BSD-3-Clause
 
+import array
 import contextlib
 import io
 import itertools
+import json
 import os
 import pytest
+import re
+import shutil
 import sys
+import threading
 import unittest
 
-from tempfile import NamedTemporaryFile
+from tempfile import NamedTemporaryFile, mkdtemp
 
 
 import reframe.utility.sanity as sn
@@ -400,6 +405,36 @@ class TestAsserts(unittest.TestCase):
             sn.evaluate(sn.assert_bounded(
                 1, -0.5, 0.5, 'value {0} is out of bounds'))
 
+    def test_assert_bounded_array(self):
+        values = array.array('d', [1, 0.5, -1])
+        assert sn.assert_bounded(values, -1.5, 1.5)
+        assert sn.assert_bounded(array.array('d'), -1.5, 1.5)
+        with pytest.raises(SanityError,
+                           match=r'value -1\.0 not within bounds '
+                                 r'-0\.5\.\.inf'):
+            sn.evaluate(sn.assert_bounded(values, lower=-0.5))
+
+        with pytest.raises(SanityError,
+                           match=r'value 1\.0 not within bounds -inf\.\.0\.5'):
+            sn.evaluate(sn.assert_bounded(values, upper=0.5))
+
+        values.append(float('nan'))
+        with pytest.raises(SanityError, match=r'value nan not within bounds'):
+            sn.evaluate(sn.assert_bounded(values, -1.5, 1.5))
+
+        # Check an array of integers
+        assert sn.assert_bounded(array.array('q', [1, 2, 3]), 1, 3)
+        with pytest.raises(SanityError, match=r'value 3 not within bounds'):
+            sn.evaluate(sn.assert_bounded(array.array('q', [1, 2, 3]), 1, 2))
+
+    def test_assert_reference_array(self):
+        values = array.array('d', [0.9, 1.0, 1.05])
+        assert sn.assert_reference(values, 1, -0.2, 0.1)
+        with pytest.raises(SanityError,
+                           match=r'0\.9 is beyond reference value 1 '
+                                 r'\(l=0\.95, u=1\.1\)'):
+            sn.evaluate(sn.assert_reference(values, 1, -0.05, 0.1))
+
     def test_assert_reference(self):
         assert sn.assert_reference(0.9, 1, -0.2, 0.1)
         assert sn.assert_reference(0.9, 1, upper_thres=0.1)
@@ -706,6 +741,351 @@ class TestPatternMatchingFunctions(unittest.TestCase):
         )
         assert -1 != res.find('Odyssey')
 
+    def _write_long_tempfile(self):
+        with NamedTemporaryFile('wt', delete=False) as fp:
+            for i in range(1, 101):
+                fp.write('Step: %s\n' % i)
+                if i % 10 == 0:
+                    fp.write('Summary:\n  steps = %s\n' % i)
+
+        return fp.name
+
+    def test_finditer_chunks(self):
+        filename = self._write_long_tempfile()
+        with open(filename) as fp:
+            contents = fp.read()
+
+        patterns = [r'^Step: (\d+)$', r'Summary:\n\s+steps = (\d+)',
+                    r'(\d+)\nSummary', r'(\d)$']
+        chunk_size, overlap = sn._SCAN_CHUNK_SIZE, sn._SCAN_OVERLAP_LINES
+        try:
+            # Make sure that the matches that cross the chunk boundaries are
+            # found exactly once, whatever the size of the chunks
+            sn._SCAN_OVERLAP_LINES = 2
+            for size in [1, 5, 13, 64, 1024]:
+                sn._SCAN_CHUNK_SIZE = size
+                for patt in patterns:
+                    expected = re.findall(patt, contents, re.MULTILINE)
+                    assert expected == sn.evaluate(
+                        sn.extractall(patt, filename, 1)
+                    )
+        finally:
+            sn._SCAN_CHUNK_SIZE = chunk_size
+            sn._SCAN_OVERLAP_LINES = overlap
+            os.remove(filename)
+
+    def test_finditer_chunks_whole_text(self):
+        filename = self._write_long_tempfile()
+        with open(filename) as fp:
+            contents = fp.read()
+
+        # Matches spanning more lines than the overlap and anchors to the
+        # start or the end of the text need the whole file
+        patterns = [r'(?s)Step: (1)\n.*?Step: 50\n',
+                    r'(?s:Step: (\d0)\n.*?steps)',
+                    r'\AStep: (\d+)', r'steps = (\d+)\n\Z']
+        chunk_size, overlap = sn._SCAN_CHUNK_SIZE, sn._SCAN_OVERLAP_LINES
+        try:
+            sn._SCAN_OVERLAP_LINES = 2
+            for size in [1, 13, 64, 1024]:
+                sn._SCAN_CHUNK_SIZE = size
+                for patt in patterns:
+                    expected = re.findall(patt, contents, re.MULTILINE)
+                    assert expected == sn.evaluate(
+                        sn.extractall(patt, filename, 1)
+                    )
+
+                # Also when combined with patterns scanned in chunks
+                exprs = [sn.extractall(r'\AStep: (\d+)', filename, 1),
+                         sn.extractall(r'^Step: (\d+)', filename, 1)]
+                with sn.combined_scan(exprs):
+                    assert ['1'] == sn.evaluate(exprs[0])
+                    assert 100 == sn.evaluate(sn.count(exprs[1]))
+        finally:
+            sn._SCAN_CHUNK_SIZE = chunk_size
+            sn._SCAN_OVERLAP_LINES = overlap
+            os.remove(filename)
+
+    def test_finditer_tail(self):
+        filename = self._write_long_tempfile()
+        try:
+            # The file ends with 'Step: 99\nStep: 100\nSummary:\n...'; the
+            # partial line at the start of the tail is skipped
+            assert ['100'] == sn.evaluate(
+                sn.extractall(r'^Step: (\d+)', filename, 1, tail=35)
+            )
+            assert ['99', '100'] == sn.evaluate(
+                sn.extractall(r'^Step: (\d+)', filename, 1, tail=42)
+            )
+            assert 100 == sn.extractsingle(r'steps = (\d+)', filename, 1,
+                                           int, tail=20)
+            assert sn.assert_found(r'steps = 100', filename, tail=20)
+            assert sn.assert_not_found(r'steps = 90', filename, tail=20)
+
+            # A tail larger than the file covers the whole file
+            assert 100 == sn.evaluate(
+                sn.count(sn.findall(r'^Step', filename, tail=1 << 20))
+            )
+        finally:
+            os.remove(filename)
+
+    def test_extractsingle_early_exit(self):
+        # Values after the requested item must not be converted
+        def conv(x):
+            if x == '3':
+                raise ValueError
+
+            return int(x)
+
+        assert 2 == sn.extractsingle(r'Step: (\d+)', self.tempfile, 1,
+                                     conv, 1)
+        assert 3 == sn.extractsingle(r'Step: (\d+)', self.tempfile, 1,
+                                     int, -1)
+        assert 1 == sn.extractsingle(r'Step: (\d+)', self.tempfile, 1,
+                                     int, -3)
+        with pytest.raises(SanityError):
+            sn.evaluate(sn.extractsingle(r'Step: (\d+)', self.tempfile, 1,
+                                         int, -4))
+
+    def test_file_cache(self):
+        cache = {}
+        steps = sn.extractall(r'Step: (\d+)', self.tempfile, 1, int)
+        with sn.file_cache(cache):
+            assert [1, 2, 3] == sn.evaluate(steps)
+            assert 3 == sn.extractsingle(r'Step: (\d+)', self.tempfile, 1,
+                                         int, -1)
+
+        # The file is read only once
+        assert 1 == len(cache)
+
+        # Modified files are read again
+        with open(self.tempfile, 'a') as fp:
+            fp.write('Step: 4\n')
+
+        with sn.file_cache(cache):
+            assert [1, 2, 3, 4] == sn.evaluate(steps)
+
+        assert 1 == len(cache)
+
+        # Large files are not cached
+        cache.clear()
+        max_size = sn._FILE_CACHE_MAX_SIZE
+        try:
+            sn._FILE_CACHE_MAX_SIZE = 10
+            with sn.file_cache(cache):
+                assert [1, 2, 3, 4] == sn.evaluate(steps)
+        finally:
+            sn._FILE_CACHE_MAX_SIZE = max_size
+
+        assert {} == cache
+
+        # Errors are reported as if the file was not cached
+        with sn.file_cache(cache):
+            with pytest.raises(SanityError):
+                sn.evaluate(sn.findall(r'Step: \d+', 'foo.txt'))
+
+    def test_file_cache_lazy_matches(self):
+        # The matches of cached files are created lazily in bounded batches
+        batch_size = sn._MATCH_BATCH_SIZE
+        try:
+            sn._MATCH_BATCH_SIZE = 2
+            with sn.file_cache({}):
+                batches = sn._finditer_batches(r'Step: (\d+)', self.tempfile,
+                                               self.tempfile, 'utf-8',
+                                               cache={})
+                assert 2 == len(next(batches))
+                assert [1] == [len(b) for b in batches]
+
+                assert sn.evaluate(sn.assert_found(r'Step', self.tempfile))
+                assert 1 == sn.extractsingle(r'Step: (\d+)', self.tempfile,
+                                             1, int)
+        finally:
+            sn._MATCH_BATCH_SIZE = batch_size
+
+    def test_combined_scan(self):
+        filename = self._write_long_tempfile()
+        exprs = [
+            sn.extractsingle(r'Step: (\d+)', filename, 1, int),
+            sn.extractsingle(r'Step: (\d+)', filename, 1, int, -1),
+            sn.extractall(r'steps = (?P<steps>\d+)', filename, 'steps', int),
+            sn.count(sn.findall(r'^Summary:\n', filename)),
+            sn.extractsingle(r'Step: (?P<no>\d+)', filename, 'no', int, 5),
+            sn.avg(sn.extractall(r'Step: (\d+)', filename, 1, float))
+        ]
+        expected = [sn.evaluate(e) for e in exprs]
+
+        num_opened = 0
+        orig_open = sn._open
+
+        def _open(*args):
+            nonlocal num_opened
+            num_opened += 1
+            return orig_open(*args)
+
+        chunk_size = sn._SCAN_CHUNK_SIZE
+        try:
+            sn._open = _open
+            sn._SCAN_CHUNK_SIZE = 16
+            with sn.combined_scan(exprs):
+                # The file is scanned once for all the expressions
+                assert 1 == num_opened
+                assert expected == [sn.evaluate(e) for e in exprs]
+                assert 1 == num_opened
+
+                # Values not requested in advance are extracted as usual
+                assert 100 == sn.count(
+                    sn.extractall(r'Step: (?P<no>\d+)', filename, 'no')
+                )
+                assert 2 == num_opened
+
+                # So are the errors
+                with pytest.raises(SanityError):
+                    sn.evaluate(sn.extractsingle(r'Step: (\d+)', filename,
+                                                 2))
+
+            # Patterns that are searched up to some item only
+            num_opened = 0
+            exprs = [sn.extractsingle(r'Step: (\d+)', filename, 1, int, 2),
+                     sn.extractsingle(r'steps = (\d+)', filename, 1, int)]
+            with sn.combined_scan(exprs):
+                assert [3, 10] == [sn.evaluate(e) for e in exprs]
+                assert 1 == num_opened
+                assert 100 == sn.extractsingle(r'Step: (\d+)', filename, 1,
+                                               int, -1)
+                assert 2 == num_opened
+        finally:
+            sn._open = orig_open
+            sn._SCAN_CHUNK_SIZE = chunk_size
+            os.remove(filename)
+
+    def test_combined_scan_errors(self):
+        exprs = [sn.extractsingle(r'Step: (\d+)', 'foo.txt', 1),
+                 sn.extractsingle(r'Step: (\d+)', 'foo.txt', 2),
+                 sn.extractsingle(r'Step: (\d+)', self.tempfile, 2),
+                 sn.extractsingle(r'Step: (\d+)', self.tempfile, 1, int, 1)]
+        with sn.combined_scan(exprs):
+            for e in exprs[:-1]:
+                with pytest.raises(SanityError):
+                    sn.evaluate(e)
+
+            assert 2 == sn.evaluate(exprs[-1])
+
+    def test_combined_scan_deep_expressions(self):
+        # Deep chains are walked without exhausting the interpreter stack
+        expr = sn.assert_found(r'Step: 1', self.tempfile)
+        for _ in range(5000):
+            expr = sn.and_(expr, sn.assert_found(r'Step: 2', self.tempfile))
+
+        with sn.combined_scan([expr]):
+            assert sn.evaluate(expr)
+
+        # Shared subexpressions are visited only once
+        expr = sn.count(sn.findall(r'Step: \d+', self.tempfile))
+        for _ in range(30):
+            expr = expr + expr
+
+        with sn.combined_scan([expr]):
+            assert 3 * 2**30 == sn.evaluate(expr)
+
+    def test_combined_scan_compound_arguments(self):
+        num_evaluated = 0
+
+        @sn.sanity_function
+        def filename(name):
+            nonlocal num_evaluated
+            num_evaluated += 1
+            return name
+
+        # Compound arguments are not evaluated in advance
+        exprs = [sn.findall(r'Step', filename(sn.defer(self.tempfile))),
+                 sn.findall(r'Step: 1', filename(sn.defer(self.tempfile)))]
+        with sn.combined_scan(exprs):
+            assert 0 == num_evaluated
+            assert [3, 1] == [sn.evaluate(sn.count(e)) for e in exprs]
+
+        # Simple ones are
+        num_evaluated = 0
+        exprs = [sn.findall(r'Step', filename(self.tempfile)),
+                 sn.findall(r'Step: 1', filename(self.tempfile))]
+        with sn.combined_scan(exprs):
+            assert 2 == num_evaluated
+            assert [3, 1] == [sn.evaluate(sn.count(e)) for e in exprs]
+
+    def test_extractall_array(self):
+        res = sn.evaluate(sn.extractall_array(r'Step: (\d+)',
+                                              self.tempfile, 1))
+        assert array.array('d', [1, 2, 3]) == res
+        assert 2 == sn.evaluate(sn.avg(res))
+        assert 6 == sn.evaluate(sn.sum(res))
+        assert 3 == sn.evaluate(sn.max(res))
+        assert sn.assert_bounded(res, 1, 3)
+
+        res = sn.evaluate(sn.extractall_array(r'Step: (?P<no>\d+)',
+                                              self.tempfile, 'no', 'q'))
+        assert array.array('q', [1, 2, 3]) == res
+
+        # Check that the values are extracted in a combined scan, too
+        expr = sn.extractall_array(r'Step: (\d+)', self.tempfile, 1, 'q')
+        with sn.combined_scan([expr, sn.findall(r'Step', self.tempfile)]):
+            assert array.array('q', [1, 2, 3]) == sn.evaluate(expr)
+
+    def test_extractall_array_error(self):
+        with pytest.raises(SanityError):
+            sn.evaluate(sn.extractall_array(r'Step: (\d+)', 'foo.txt', 1))
+
+        with pytest.raises(SanityError, match='no such group'):
+            sn.evaluate(sn.extractall_array(r'Step: (\d+)', self.tempfile, 2))
+
+        with pytest.raises(SanityError, match='could not convert'):
+            sn.evaluate(sn.extractall_array(r'Step: \d+', self.tempfile,
+                                            typecode='q'))
+
+        for typecode in ['', 'x', 'fd', 'u', 1]:
+            with pytest.raises(SanityError, match='invalid array type code'):
+                sn.evaluate(sn.extractall_array(r'Step: (\d+)', self.tempfile,
+                                                1, typecode))
+
+        with open(self.tempfile, 'a') as fp:
+            fp.write('Step: 1000\n')
+
+        with pytest.raises(SanityError, match='could not store'):
+            sn.evaluate(sn.extractall_array(r'Step: (\d+)', self.tempfile, 1,
+                                            'b'))
+
+    def test_working_directory(self):
+        dirname, filename = os.path.split(self.tempfile)
+        steps = sn.extractall(r'Step: (\d+)', filename, 1, int)
+        with sn.working_directory(dirname):
+            assert [1, 2, 3] == sn.evaluate(steps)
+            assert [filename] == sn.evaluate(sn.glob(filename))
+            assert [filename] == list(sn.evaluate(sn.iglob(filename)))
+
+            # Absolute file names are not affected
+            assert 3 == sn.evaluate(sn.count(sn.findall(r'Step',
+                                                        self.tempfile)))
+
+        assert os.getcwd() != dirname
+        with pytest.raises(SanityError):
+            sn.evaluate(steps)
+
+    def test_working_directory_per_thread(self):
+        dirname, filename = os.path.split(self.tempfile)
+        results = []
+
+        def evaluate():
+            with pytest.raises(SanityError):
+                sn.evaluate(sn.findall(r'Step', filename))
+
+            results.append(True)
+
+        with sn.working_directory(dirname):
+            thread = threading.Thread(target=evaluate)
+            thread.start()
+            thread.join()
+            assert 3 == len(sn.evaluate(sn.findall(r'Step', filename)))
+
+        assert [True] == results
+
     def test_safe_format(self):
         from reframe.utility.sanity import _format
 
@@ -720,6 +1100,157 @@ class TestPatternMatchingFunctions(unittest.TestCase):
         assert s == _format(s, 'bacon')
 
 
+class TestStructuredOutputFunctions(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = mkdtemp()
+        self.json_file = os.path.join(self.tempdir, 'results.json')
+        self.csv_file = os.path.join(self.tempdir, 'results.csv')
+        self.kv_file = os.path.join(self.tempdir, 'results.log')
+        with open(self.json_file, 'w') as fp:
+            json.dump({'results': [{'size': 8, 'bw': 1.5},
+                                   {'size': 16, 'bw': 2.5}],
+                       'status': 'ok'}, fp)
+
+        with open(self.csv_file, 'w') as fp:
+            fp.write('size,bw\n8,1.5\n\n16,2.5\n')
+
+        with open(self.kv_file, 'w') as fp:
+            fp.write('Starting benchmark\n')
+            fp.write('iter=1 time=0.5 bw=1.5\n')
+            fp.write('iter=2 time=0.7\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_extractjson(self):
+        assert 2.5 == sn.extractjson(self.json_file, 'results.1.bw')
+        assert 2.5 == sn.extractjson(self.json_file, ['results', 1, 'bw'])
+        assert 8.0 == sn.extractjson(self.json_file, 'results.0.size', float)
+        assert 'ok' == sn.extractjson(self.json_file, 'status')
+        assert 2 == sn.count(sn.extractjson(self.json_file, 'results'))
+        assert 2 == sn.count(sn.extractjson(self.json_file, ''))
+
+    def test_extractjson_error(self):
+        with pytest.raises(SanityError, match='no such element'):
+            sn.evaluate(sn.extractjson(self.json_file, 'results.2.bw'))
+
+        with pytest.raises(SanityError, match='no such element'):
+            sn.evaluate(sn.extractjson(self.json_file, 'status.foo'))
+
+        with pytest.raises(SanityError, match='could not convert'):
+            sn.evaluate(sn.extractjson(self.json_file, 'status', float))
+
+        with pytest.raises(SanityError, match='invalid JSON'):
+            sn.evaluate(sn.extractjson(self.csv_file, 'size'))
+
+        with pytest.raises(SanityError):
+            sn.evaluate(sn.extractjson('foo.json', 'size'))
+
+    def test_extractcsv(self):
+        assert [1.5, 2.5] == sn.extractcsv(self.csv_file, 'bw', float)
+        assert ['8', '16'] == sn.extractcsv(self.csv_file, 0)
+        assert ['size', '8', '16'] == sn.extractcsv(self.csv_file, 0,
+                                                    header=False)
+        assert 12 == sn.avg(sn.extractcsv(self.csv_file, 'size', int))
+
+    def test_extractcsv_error(self):
+        with pytest.raises(SanityError, match='no such column'):
+            sn.evaluate(sn.extractcsv(self.csv_file, 'foo'))
+
+        with pytest.raises(SanityError, match='no such column'):
+            sn.evaluate(sn.extractcsv(self.csv_file, 2))
+
+        with pytest.raises(SanityError, match='no such column'):
+            sn.evaluate(sn.extractcsv(self.csv_file, 'bw', header=False))
+
+        with pytest.raises(SanityError, match='could not convert'):
+            sn.evaluate(sn.extractcsv(self.csv_file, 'bw', int))
+
+        with pytest.raises(SanityError):
+            sn.evaluate(sn.extractcsv('foo.csv', 'bw'))
+
+    def test_extractkv(self):
+        assert [0.5, 0.7] == sn.extractkv(self.kv_file, 'time', float)
+        assert ['1.5'] == sn.extractkv(self.kv_file, 'bw')
+        assert [] == sn.extractkv(self.kv_file, 'foo')
+        assert [] == sn.extractkv(self.kv_file, 'time', sep=':')
+        with pytest.raises(SanityError, match='could not convert'):
+            sn.evaluate(sn.extractkv(self.kv_file, 'time', int))
+
+        with pytest.raises(SanityError):
+            sn.evaluate(sn.extractkv('foo.log', 'time'))
+
+    def test_parse_once(self):
+        num_parsed = 0
+        orig_parse_json = sn._parse_json
+
+        def _parse_json(*args, **kwargs):
+            nonlocal num_parsed
+            num_parsed += 1
+            return orig_parse_json(*args, **kwargs)
+
+        bandwidths = [sn.extractjson(self.json_file, 'results.%s.bw' % i)
+                      for i in range(2)]
+        try:
+            sn._parse_json = _parse_json
+            with sn.file_cache({}):
+                assert 4 == sn.evaluate(sn.sum(bandwidths))
+                assert 'ok' == sn.extractjson(self.json_file, 'status')
+
+            assert 1 == num_parsed
+
+            # Without a cache, the file is parsed every time
+            assert 4 == sn.evaluate(sn.sum(bandwidths))
+            assert 3 == num_parsed
+        finally:
+            sn._parse_json = orig_parse_json
+
+    def test_parse_once_large_files(self):
+        num_parsed = 0
+        orig_parse_csv = sn._parse_csv
+
+        def _parse_csv(*args, **kwargs):
+            nonlocal num_parsed
+            num_parsed += 1
+            return orig_parse_csv(*args, **kwargs)
+
+        exprs = [sn.avg(sn.extractcsv(self.csv_file, 'size', int)),
+                 sn.avg(sn.extractcsv(self.csv_file, 1, float)),
+                 sn.extractcsv(self.csv_file, 'foo')]
+        max_size = sn._FILE_CACHE_MAX_SIZE
+        try:
+            sn._parse_csv = _parse_csv
+            sn._FILE_CACHE_MAX_SIZE = 10
+            with sn.file_cache({}), sn.combined_scan(exprs):
+                # Large files are parsed once for all the requested columns
+                assert 1 == num_parsed
+                assert 12 == sn.evaluate(exprs[0])
+                assert 2 == sn.evaluate(exprs[1])
+                assert 1 == num_parsed
+
+                # Errors are raised as usual
+                with pytest.raises(SanityError, match='no such column'):
+                    sn.evaluate(exprs[2])
+        finally:
+            sn._parse_csv = orig_parse_csv
+            sn._FILE_CACHE_MAX_SIZE = max_size
+
+        # Without a cache, only the requested columns are kept
+        with open(self.csv_file) as fp:
+            names, columns = sn._parse_csv(fp, ',', True, wanted={'bw'})
+
+        assert ['size', 'bw'] == names
+        assert {1: ['1.5', '2.5']} == columns
+
+    def test_extractjson_copy(self):
+        with sn.file_cache({}):
+            doc = sn.evaluate(sn.extractjson(self.json_file, ''))
+            doc['status'] = 'failed'
+            doc['results'].clear()
+            assert 'ok' == sn.extractjson(self.json_file, 'status')
+            assert 2 == sn.count(sn.extractjson(self.json_file, 'results'))
+
+
 class TestNumericFunctions(unittest.TestCase):
     def test_avg(self):
         res = sn.evaluate(sn.avg([1, 2, 3, 4]))
@@ -736,3 +1267,7 @@ class TestNumericFunctions(unittest.TestCase):
         # Check with empty container
         with pytest.raises(SanityError):
             sn.evaluate(sn.avg([]))
+
+        # Check with a generator and an array
+        assert 2.5 == sn.evaluate(sn.avg(x for x in range(1, 5)))
+        assert 2.5 == sn.evaluate(sn.avg(array.array('d', [1, 2, 3, 4])))
@@ -4,25 +4,37 @@
 # SPDX-License-Identifier: BSD-3-Clause
 
 import abc
+import http.server
+import json
 import os
 import pytest
 import re
 import socket
+import socketserver
 import tempfile
+import threading
 import time
 import unittest
+import urllib.parse
 from datetime import datetime
 
 import reframe.core.runtime as rt
 import reframe.utility.os_ext as os_ext
 import unittests.fixtures as fixtures
 from reframe.core.environments import Environment
-from reframe.core.exceptions import JobError, JobNotStartedError
+from reframe.core.exceptions import (ConfigError, JobBlockedError, JobError,
+                                     JobNotStartedError)
 from reframe.core.launchers.local import LocalLauncher
 from reframe.core.launchers.registry import getlauncher
-from reframe.core.schedulers import Job
+from reframe.core.schedulers import (AdaptivePollInterval, Job,
+                                     JobSubmissionPool)
+from reframe.core.schedulers.pbs import PBS_OUTPUT_WRITEBACK_WAIT
 from reframe.core.schedulers.registry import getscheduler
-from reframe.core.schedulers.slurm import _SlurmNode, _create_nodes
+from reframe.core.schedulers.slurm import (JobArrayBatcher, SlurmAllocation,
+                                           _NodeInventory, _SlurmNode)
+from reframe.core.schedulers.slurmrest import (SlurmRestClient,
+                                               _RestJobTable,
+                                               _RestNodeInventory)
 
 
 class _TestJob(abc.ABC):
@@ -398,6 +410,19 @@ class TestSlurmJob(_TestJob, unittest.TestCase):
         with open(self.testjob.script_filename) as fp:
             assert re.search(r'--hint=nomultithread', fp.read()) is not None
 
+    def test_prepare_with_dependencies(self):
+        parents = [Job.create(getscheduler('slurm')(),
+                              getlauncher('local')(), name='parent')
+                   for i in range(2)]
+        parents[0].jobid = 1
+        parents[1].scheduler._submitted_as_array_task(parents[1], 2, 3)
+        self.testjob.scheduler.add_dependencies(*parents)
+        assert ['1', '2_3'] == self.testjob.scheduler.dependencies
+        super().test_prepare()
+        with open(self.testjob.script_filename) as fp:
+            assert re.search(r'^#SBATCH --dependency=afterok:1:2_3$',
+                             fp.read(), re.MULTILINE) is not None
+
     def test_submit(self):
         super().test_submit()
         assert 0 == self.testjob.exitcode
@@ -417,9 +442,11 @@ class TestSlurmJob(_TestJob, unittest.TestCase):
         self.testjob.num_tasks = 0
         self.testjob._sched_flex_alloc_nodes = 'all'
 
-        # Monkey patch `allnodes()` to simulate extraction of
+        # Monkey patch the node inventory to simulate extraction of
         # slurm nodes through the use of `scontrol show`
-        self.testjob.scheduler.allnodes = lambda: set()
+        inventory = _NodeInventory()
+        inventory._query_nodes = lambda: []
+        self.testjob.scheduler._node_inventory = inventory
 
         # monkey patch `_get_default_partition()` to simulate extraction
         # of the default partition through the use of `scontrol show`
@@ -530,102 +557,203 @@ class TestPbsJob(_TestJob, unittest.TestCase):
         pytest.skip("PBS minimum time limit is 60s")
 
 
+class TestPbsBatchedPolling(unittest.TestCase):
+    def create_job(self, jobid):
+        job = Job.create(getscheduler('pbs')(), getlauncher('local')(),
+                         name='testjob_%s' % jobid, workdir=self.workdir)
+        job.jobid = jobid
+        job.scheduler._pbs_server = 'pbs01'
+        job.scheduler._query_states = self.query_states
+        return job
+
+    def query_states(self, jobids):
+        self.queried_jobids.append(list(jobids))
+        return json.dumps({
+            'pbs_version': '19.1.3',
+            'Jobs': {
+                '1.pbs01': {
+                    'job_state': 'F',
+                    'Exit_status': 0,
+                    'exec_host': 'nid00001/0*2+nid00002/0*2',
+                    'stime': 'Mon Oct 12 10:00:00 2020',
+                    'obittime': 'Mon Oct 12 10:05:00 2020'
+                },
+                '2.pbs01': {
+                    'job_state': 'R',
+                    'exec_host': 'nid00003/0+nid00003/1'
+                },
+                '3.pbs01': {
+                    'job_state': 'F',
+                    'Exit_status': 3
+                },
+                '4.pbs01': {
+                    'job_state': 'Q'
+                }
+            }
+        })
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(dir='unittests')
+        self.queried_jobids = []
+        self.jobs = [self.create_job(jobid) for jobid in (1, 2, 3, 4, 5)]
+
+    def tearDown(self):
+        os_ext.rmtree(self.workdir)
+
+    def test_poll(self):
+        self.jobs[0].scheduler.poll(*self.jobs)
+        assert [['1.pbs01', '2.pbs01', '3.pbs01',
+                 '4.pbs01', '5.pbs01']] == self.queried_jobids
+        assert ([True, False, True, False, False] ==
+                [j.finished() for j in self.jobs])
+        assert 1 == len(self.queried_jobids)
+        assert 'FINISHED' == self.jobs[0].state
+        assert 0 == self.jobs[0].exitcode
+        assert ['nid00001', 'nid00002'] == self.jobs[0].nodelist
+        assert 300 == (self.jobs[0].completion_time -
+                       self.jobs[0].scheduler.start_time(self.jobs[0]))
+        assert 'RUNNING' == self.jobs[1].state
+        assert self.jobs[1].exitcode is None
+        assert ['nid00003'] == self.jobs[1].nodelist
+        assert self.jobs[1].scheduler.started(self.jobs[1])
+        assert 3 == self.jobs[2].exitcode
+        assert 'QUEUED' == self.jobs[3].state
+        assert not self.jobs[3].scheduler.started(self.jobs[3])
+        assert self.jobs[4].state is None
+
+    def test_finished_without_poll(self):
+        assert self.jobs[0].finished()
+        assert [['1.pbs01']] == self.queried_jobids
+
+    def write_output(self, job):
+        for filename in (job.stdout, job.stderr):
+            with open(os.path.join(job.workdir, filename), 'w'):
+                pass
+
+    def test_invalid_qstat_output(self):
+        self.jobs[0].scheduler._query_states = lambda jobids: 'qstat: error'
+        self.jobs[0].scheduler.poll(self.jobs[0])
+        assert not self.jobs[0].finished()
+
+        # Without JSON output, e.g., with Torque, the job finishes once its
+        # output has been written back
+        self.write_output(self.jobs[0])
+        assert not self.jobs[0].finished()
+        self.jobs[0].scheduler._time_finished -= PBS_OUTPUT_WRITEBACK_WAIT + 1
+        assert self.jobs[0].finished()
+        assert 'COMPLETED' == self.jobs[0].state
+
+    def test_job_not_reported(self):
+        # Job 5 is not reported, e.g., because it has been purged already
+        job = self.jobs[4]
+        job.scheduler.poll(job)
+        assert not job.finished()
+        assert job.state is None
+
+        self.write_output(job)
+        job.scheduler.poll(job)
+        assert not job.finished()
+        job.scheduler._time_finished -= PBS_OUTPUT_WRITEBACK_WAIT + 1
+        job.scheduler.poll(job)
+        assert job.finished()
+        assert 'COMPLETED' == job.state
+        assert job.exitcode is None
+
+
 class TestSlurmFlexibleNodeAllocation(unittest.TestCase):
-    def create_dummy_nodes(obj):
-        node_descriptions = ['NodeName=nid00001 Arch=x86_64 CoresPerSocket=12 '
-                             'CPUAlloc=0 CPUErr=0 CPUTot=24 CPULoad=0.00 '
-                             'AvailableFeatures=f1,f2 ActiveFeatures=f1,f2 '
-                             'Gres=gpu_mem:16280,gpu:1 NodeAddr=nid00001 '
-                             'NodeHostName=nid00001 Version=10.00 OS=Linux '
-                             'RealMemory=32220 AllocMem=0 FreeMem=10000 '
-                             'Sockets=1 Boards=1 State=MAINT+DRAIN '
-                             'ThreadsPerCore=2 TmpDisk=0 Weight=1 Owner=N/A '
-                             'MCS_label=N/A Partitions=p1,p2,pdef '
-                             'BootTime=01 Jan 2018 '
-                             'SlurmdStartTime=01 Jan 2018 '
-                             'CfgTRES=cpu=24,mem=32220M '
-                             'AllocTRES= CapWatts=n/a CurrentWatts=100 '
-                             'LowestJoules=100000000 ConsumedJoules=0 '
-                             'ExtSensorsJoules=n/s ExtSensorsWatts=0 '
-                             'ExtSensorsTemp=n/s Reason=Foo/ '
-                             'failed [reframe_user@01 Jan 2018]',
-
-                             'NodeName=nid00002 Arch=x86_64 CoresPerSocket=12 '
-                             'CPUAlloc=0 CPUErr=0 CPUTot=24 CPULoad=0.00 '
-                             'AvailableFeatures=f2,f3 ActiveFeatures=f2,f3 '
-                             'Gres=gpu_mem:16280,gpu:1 NodeAddr=nid00002 '
-                             'NodeHostName=nid00002 Version=10.00 OS=Linux '
-                             'RealMemory=32220 AllocMem=0 FreeMem=10000 '
-                             'Sockets=1 Boards=1 State=MAINT+DRAIN '
-                             'ThreadsPerCore=2 TmpDisk=0 Weight=1 Owner=N/A '
-                             'MCS_label=N/A Partitions=p2,p3,pdef '
-                             'BootTime=01 Jan 2018 '
-                             'SlurmdStartTime=01 Jan 2018 '
-                             'CfgTRES=cpu=24,mem=32220M '
-                             'AllocTRES= CapWatts=n/a CurrentWatts=100 '
-                             'LowestJoules=100000000 ConsumedJoules=0 '
-                             'ExtSensorsJoules=n/s ExtSensorsWatts=0 '
-                             'ExtSensorsTemp=n/s Reason=Foo/ '
-                             'failed [reframe_user@01 Jan 2018]',
-
-                             'Node invalid_node1 not found',
-
-                             'NodeName=nid00003 Arch=x86_64 CoresPerSocket=12 '
-                             'CPUAlloc=0 CPUErr=0 CPUTot=24 CPULoad=0.00 '
-                             'AvailableFeatures=f1,f3 ActiveFeatures=f1,f3 '
-                             'Gres=gpu_mem:16280,gpu:1 NodeAddr=nid00003'
-                             'NodeHostName=nid00003 Version=10.00 OS=Linux '
-                             'RealMemory=32220 AllocMem=0 FreeMem=10000 '
-                             'Sockets=1 Boards=1 State=IDLE '
-                             'ThreadsPerCore=2 TmpDisk=0 Weight=1 Owner=N/A '
-                             'MCS_label=N/A Partitions=p1,p3,pdef '
-                             'BootTime=01 Jan 2018 '
-                             'SlurmdStartTime=01 Jan 2018 '
-                             'CfgTRES=cpu=24,mem=32220M '
-                             'AllocTRES= CapWatts=n/a CurrentWatts=100 '
-                             'LowestJoules=100000000 ConsumedJoules=0 '
-                             'ExtSensorsJoules=n/s ExtSensorsWatts=0 '
-                             'ExtSensorsTemp=n/s Reason=Foo/ '
-                             'failed [reframe_user@01 Jan 2018]',
-
-                             'NodeName=nid00004 Arch=x86_64 CoresPerSocket=12 '
-                             'CPUAlloc=0 CPUErr=0 CPUTot=24 CPULoad=0.00 '
-                             'AvailableFeatures=f1,f4 ActiveFeatures=f1,f4 '
-                             'Gres=gpu_mem:16280,gpu:1 NodeAddr=nid00003'
-                             'NodeHostName=nid00003 Version=10.00 OS=Linux '
-                             'RealMemory=32220 AllocMem=0 FreeMem=10000 '
-                             'Sockets=1 Boards=1 State=IDLE '
-                             'ThreadsPerCore=2 TmpDisk=0 Weight=1 Owner=N/A '
-                             'MCS_label=N/A Partitions=p1,p3,pdef '
-                             'BootTime=01 Jan 2018 '
-                             'SlurmdStartTime=01 Jan 2018 '
-                             'CfgTRES=cpu=24,mem=32220M '
-                             'AllocTRES= CapWatts=n/a CurrentWatts=100 '
-                             'LowestJoules=100000000 ConsumedJoules=0 '
-                             'ExtSensorsJoules=n/s ExtSensorsWatts=0 '
-                             'ExtSensorsTemp=n/s Reason=Foo/ ',
-
-                             'NodeName=nid00005 Arch=x86_64 CoresPerSocket=12 '
-                             'CPUAlloc=0 CPUErr=0 CPUTot=24 CPULoad=0.00 '
-                             'AvailableFeatures=f5 ActiveFeatures=f5 '
-                             'Gres=gpu_mem:16280,gpu:1 NodeAddr=nid00003'
-                             'NodeHostName=nid00003 Version=10.00 OS=Linux '
-                             'RealMemory=32220 AllocMem=0 FreeMem=10000 '
-                             'Sockets=1 Boards=1 State=ALLOCATED '
-                             'ThreadsPerCore=2 TmpDisk=0 Weight=1 Owner=N/A '
-                             'MCS_label=N/A Partitions=p1,p3 '
-                             'BootTime=01 Jan 2018 '
-                             'SlurmdStartTime=01 Jan 2018 '
-                             'CfgTRES=cpu=24,mem=32220M '
-                             'AllocTRES= CapWatts=n/a CurrentWatts=100 '
-                             'LowestJoules=100000000 ConsumedJoules=0 '
-                             'ExtSensorsJoules=n/s ExtSensorsWatts=0 '
-                             'ExtSensorsTemp=n/s Reason=Foo/ '
-                             'failed [reframe_user@01 Jan 2018]',
-
-                             'Node invalid_node2 not found']
-
-        return _create_nodes(node_descriptions)
+    def dummy_node_descriptions(self):
+        return ['NodeName=nid00001 Arch=x86_64 CoresPerSocket=12 '
+                'CPUAlloc=0 CPUErr=0 CPUTot=24 CPULoad=0.00 '
+                'AvailableFeatures=f1,f2 ActiveFeatures=f1,f2 '
+                'Gres=gpu_mem:16280,gpu:1 NodeAddr=nid00001 '
+                'NodeHostName=nid00001 Version=10.00 OS=Linux '
+                'RealMemory=32220 AllocMem=0 FreeMem=10000 '
+                'Sockets=1 Boards=1 State=MAINT+DRAIN '
+                'ThreadsPerCore=2 TmpDisk=0 Weight=1 Owner=N/A '
+                'MCS_label=N/A Partitions=p1,p2,pdef '
+                'BootTime=01 Jan 2018 '
+                'SlurmdStartTime=01 Jan 2018 '
+                'CfgTRES=cpu=24,mem=32220M '
+                'AllocTRES= CapWatts=n/a CurrentWatts=100 '
+                'LowestJoules=100000000 ConsumedJoules=0 '
+                'ExtSensorsJoules=n/s ExtSensorsWatts=0 '
+                'ExtSensorsTemp=n/s Reason=Foo/ '
+                'failed [reframe_user@01 Jan 2018]',
+
+                'NodeName=nid00002 Arch=x86_64 CoresPerSocket=12 '
+                'CPUAlloc=0 CPUErr=0 CPUTot=24 CPULoad=0.00 '
+                'AvailableFeatures=f2,f3 ActiveFeatures=f2,f3 '
+                'Gres=gpu_mem:16280,gpu:1 NodeAddr=nid00002 '
+                'NodeHostName=nid00002 Version=10.00 OS=Linux '
+                'RealMemory=32220 AllocMem=0 FreeMem=10000 '
+                'Sockets=1 Boards=1 State=MAINT+DRAIN '
+                'ThreadsPerCore=2 TmpDisk=0 Weight=1 Owner=N/A '
+                'MCS_label=N/A Partitions=p2,p3,pdef '
+                'BootTime=01 Jan 2018 '
+                'SlurmdStartTime=01 Jan 2018 '
+                'CfgTRES=cpu=24,mem=32220M '
+                'AllocTRES= CapWatts=n/a CurrentWatts=100 '
+                'LowestJoules=100000000 ConsumedJoules=0 '
+                'ExtSensorsJoules=n/s ExtSensorsWatts=0 '
+                'ExtSensorsTemp=n/s Reason=Foo/ '
+                'failed [reframe_user@01 Jan 2018]',
+
+                'Node invalid_node1 not found',
+
+                'NodeName=nid00003 Arch=x86_64 CoresPerSocket=12 '
+                'CPUAlloc=0 CPUErr=0 CPUTot=24 CPULoad=0.00 '
+                'AvailableFeatures=f1,f3 ActiveFeatures=f1,f3 '
+                'Gres=gpu_mem:16280,gpu:1 NodeAddr=nid00003'
+                'NodeHostName=nid00003 Version=10.00 OS=Linux '
+                'RealMemory=32220 AllocMem=0 FreeMem=10000 '
+                'Sockets=1 Boards=1 State=IDLE '
+                'ThreadsPerCore=2 TmpDisk=0 Weight=1 Owner=N/A '
+                'MCS_label=N/A Partitions=p1,p3,pdef '
+                'BootTime=01 Jan 2018 '
+                'SlurmdStartTime=01 Jan 2018 '
+                'CfgTRES=cpu=24,mem=32220M '
+                'AllocTRES= CapWatts=n/a CurrentWatts=100 '
+                'LowestJoules=100000000 ConsumedJoules=0 '
+                'ExtSensorsJoules=n/s ExtSensorsWatts=0 '
+                'ExtSensorsTemp=n/s Reason=Foo/ '
+                'failed [reframe_user@01 Jan 2018]',
+
+                'NodeName=nid00004 Arch=x86_64 CoresPerSocket=12 '
+                'CPUAlloc=0 CPUErr=0 CPUTot=24 CPULoad=0.00 '
+                'AvailableFeatures=f1,f4 ActiveFeatures=f1,f4 '
+                'Gres=gpu_mem:16280,gpu:1 NodeAddr=nid00003'
+                'NodeHostName=nid00003 Version=10.00 OS=Linux '
+                'RealMemory=32220 AllocMem=0 FreeMem=10000 '
+                'Sockets=1 Boards=1 State=IDLE '
+                'ThreadsPerCore=2 TmpDisk=0 Weight=1 Owner=N/A '
+                'MCS_label=N/A Partitions=p1,p3,pdef '
+                'BootTime=01 Jan 2018 '
+                'SlurmdStartTime=01 Jan 2018 '
+                'CfgTRES=cpu=24,mem=32220M '
+                'AllocTRES= CapWatts=n/a CurrentWatts=100 '
+                'LowestJoules=100000000 ConsumedJoules=0 '
+                'ExtSensorsJoules=n/s ExtSensorsWatts=0 '
+                'ExtSensorsTemp=n/s Reason=Foo/ ',
+
+                'NodeName=nid00005 Arch=x86_64 CoresPerSocket=12 '
+                'CPUAlloc=0 CPUErr=0 CPUTot=24 CPULoad=0.00 '
+                'AvailableFeatures=f5 ActiveFeatures=f5 '
+                'Gres=gpu_mem:16280,gpu:1 NodeAddr=nid00003'
+                'NodeHostName=nid00003 Version=10.00 OS=Linux '
+                'RealMemory=32220 AllocMem=0 FreeMem=10000 '
+                'Sockets=1 Boards=1 State=ALLOCATED '
+                'ThreadsPerCore=2 TmpDisk=0 Weight=1 Owner=N/A '
+                'MCS_label=N/A Partitions=p1,p3 '
+                'BootTime=01 Jan 2018 '
+                'SlurmdStartTime=01 Jan 2018 '
+                'CfgTRES=cpu=24,mem=32220M '
+                'AllocTRES= CapWatts=n/a CurrentWatts=100 '
+                'LowestJoules=100000000 ConsumedJoules=0 '
+                'ExtSensorsJoules=n/s ExtSensorsWatts=0 '
+                'ExtSensorsTemp=n/s Reason=Foo/ '
+                'failed [reframe_user@01 Jan 2018]',
+
+                'Node invalid_node2 not found']
 
     def create_reservation_nodes(self, res):
         return {n for n in self.testjob.scheduler.allnodes()
@@ -635,9 +763,12 @@ class TestSlurmFlexibleNodeAllocation(unittest.TestCase):
         return {n for n in self.testjob.scheduler.allnodes() if n.name == name}
 
     def setUp(self):
-        # Monkey patch scheduler to simulate retrieval of nodes from Slurm
+        # Monkey patch the node inventory of the scheduler to simulate
+        # retrieval of nodes from Slurm
+        inventory = _NodeInventory()
+        inventory._query_nodes = self.dummy_node_descriptions
         patched_sched = getscheduler('slurm')()
-        patched_sched.allnodes = self.create_dummy_nodes
+        patched_sched._node_inventory = inventory
         patched_sched._get_default_partition = lambda: 'pdef'
 
         self.workdir = tempfile.mkdtemp(dir='unittests')
@@ -819,6 +950,349 @@ class TestSlurmFlexibleNodeAllocation(unittest.TestCase):
         self.testjob.prepare(['hostname'])
 
 
+class TestSlurmBatchedPolling(unittest.TestCase):
+    def create_job(self, jobid):
+        job = Job.create(getscheduler('slurm')(), getlauncher('local')(),
+                         name='testjob_%s' % jobid, workdir=self.workdir)
+        job.jobid = jobid
+
+        # Monkey patch the per-job query to make sure it is not called after
+        # a batched poll
+        job.scheduler._update_state = self.fail_single_query
+        return job
+
+    def fail_single_query(self, job):
+        raise AssertionError('job %s queried separately' % job.jobid)
+
+    def query_states(self, jobids):
+        self.num_queries += 1
+        self.queried_jobids.append(list(jobids))
+        return ('1|COMPLETED|0:0|nid00001\n'
+                '1.batch|COMPLETED|0:0|nid00001\n'
+                '2|RUNNING|0:0|nid0000[2-3]\n'
+                '3_0|COMPLETED|0:0|nid00004\n'
+                '3_1|FAILED|1:0|nid00005\n')
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(dir='unittests')
+        self.num_queries = 0
+        self.queried_jobids = []
+        self.jobs = [self.create_job(jobid) for jobid in (1, 2, 3, 4)]
+
+        # Monkey patch the scheduler used for polling to simulate sacct
+        self.scheduler = self.jobs[0].scheduler
+        self.scheduler._query_states = self.query_states
+
+    def tearDown(self):
+        os_ext.rmtree(self.workdir)
+
+    def test_poll(self):
+        self.scheduler.poll(*self.jobs)
+        assert self.num_queries == 1
+        assert self.queried_jobids == [[1, 2, 3, 4]]
+        assert [j.finished() for j in self.jobs] == [True, False, True, False]
+        assert self.jobs[0].state == 'COMPLETED'
+        assert self.jobs[0].exitcode == 0
+        assert self.jobs[1].state == 'RUNNING'
+        assert self.jobs[1].exitcode is None
+        assert self.jobs[1].nodelist == ['nid00002', 'nid00003']
+        assert self.jobs[2].state == 'COMPLETED,FAILED'
+        assert self.jobs[2].exitcode == 1
+        assert self.jobs[3].state is None
+
+    def test_poll_no_jobs(self):
+        self.scheduler.poll()
+        assert self.num_queries == 0
+
+    def test_poll_unstarted_jobs(self):
+        self.jobs[1].jobid = None
+        self.scheduler.poll(*self.jobs)
+        assert self.queried_jobids == [[1, 3, 4]]
+
+    def test_polled_state_consumed(self):
+        self.scheduler.poll(self.jobs[0])
+        assert self.jobs[0].finished()
+
+        # The next call to finished() must query the job's state again
+        with pytest.raises(AssertionError):
+            self.jobs[0].finished()
+
+
+class TestSlurmJobArrays(unittest.TestCase):
+    def create_job(self, name, time_limit='5m', num_tasks=1):
+        job = Job.create(getscheduler('slurm')(), getlauncher('local')(),
+                         name=name, workdir=self.workdir)
+        job.num_tasks = num_tasks
+        job.time_limit = time_limit
+        job.scheduler.defer_submission(self.batcher)
+
+        # Monkey patch the job submission to simulate sbatch
+        job.scheduler._submit_script = self.submit_script
+        with os_ext.change_dir(self.workdir):
+            job.prepare(['echo %s' % name])
+            job.submit()
+
+        return job
+
+    def submit_script(self, script_filename, cwd=None):
+        if self.submit_error:
+            raise JobError('sbatch failed')
+
+        self.submitted.append(script_filename)
+        return 100 + len(self.submitted)
+
+    def setUp(self):
+        self.workdir = os.path.abspath(tempfile.mkdtemp(dir='unittests'))
+        self.batcher = JobArrayBatcher()
+        self.submitted = []
+        self.submit_error = False
+        self.jobs = [self.create_job('job0'),
+                     self.create_job('job1', time_limit='8m'),
+                     self.create_job('job2', time_limit='2h'),
+                     self.create_job('job3', num_tasks=2)]
+
+    def tearDown(self):
+        os_ext.rmtree(self.workdir)
+
+    def test_flush(self):
+        assert 4 == self.batcher.num_pending
+        assert all(j.jobid is None for j in self.jobs)
+        assert [] == self.batcher.flush()
+        assert 0 == self.batcher.num_pending
+
+        # The first two jobs are submitted as a job array
+        assert 3 == len(self.submitted)
+        assert self.jobs[0].jobid == self.jobs[1].jobid == 101
+        assert '101_0' == self.jobs[0].scheduler._jobspec(self.jobs[0])
+        assert '101_1' == self.jobs[1].scheduler._jobspec(self.jobs[1])
+        assert '102' == self.jobs[2].scheduler._jobspec(self.jobs[2])
+        assert '103' == self.jobs[3].scheduler._jobspec(self.jobs[3])
+        assert self.submitted[1:] == [self.jobs[2].script_filename,
+                                      self.jobs[3].script_filename]
+        with open(self.submitted[0]) as fp:
+            dispatcher = fp.read()
+
+        assert '#SBATCH --array=0-1\n' in dispatcher
+        assert '#SBATCH --time=0:8:0\n' in dispatcher
+        assert '#SBATCH --ntasks=1\n' in dispatcher
+        assert re.search(r'^    1\) cd %s && bash job1.sh >job1.out '
+                         r'2>job1.err ;;$' % self.workdir,
+                         dispatcher, re.MULTILINE)
+
+    def test_flush_failure(self):
+        self.submit_error = True
+        failures = self.batcher.flush()
+        assert self.jobs == [job for job, _ in failures]
+        assert all(isinstance(e, JobError) for _, e in failures)
+
+    def test_array_task_state(self):
+        def query_states(jobids):
+            assert [101] == list(jobids)
+            return ('101_0|COMPLETED|0:0|nid00001\n'
+                    '101_0.batch|COMPLETED|0:0|nid00001\n'
+                    '101_[1-3]|PENDING|0:0|None assigned\n')
+
+        self.batcher.flush()
+        scheduler = self.jobs[0].scheduler
+        scheduler._query_states = query_states
+        scheduler.poll(self.jobs[0], self.jobs[1])
+        assert self.jobs[0].finished()
+        assert 'COMPLETED' == self.jobs[0].state
+        assert 0 == self.jobs[0].exitcode
+        assert not self.jobs[1].finished()
+        assert 'PENDING' == self.jobs[1].state
+
+    def test_cancel_pending(self):
+        # Cancelling a job before the flush drops it from its job array
+        self.jobs[1].cancel()
+        assert self.jobs[1].jobid is None
+        assert 3 == self.batcher.num_pending
+        self.batcher.flush()
+        assert 3 == len(self.submitted)
+        assert self.jobs[1].jobid is None
+        assert '101' == self.jobs[0].scheduler._jobspec(self.jobs[0])
+
+        # The withdrawn job was never submitted
+        with pytest.raises(JobNotStartedError):
+            self.jobs[1].cancel()
+
+    def test_user_job_array(self):
+        job = Job.create(getscheduler('slurm')(), getlauncher('local')(),
+                         name='userarray', workdir=self.workdir,
+                         sched_options=['--array=0-3'])
+        assert not self.batcher.accepts(job)
+
+
+class TestSlurmAllocation(unittest.TestCase):
+    def setUp(self):
+        self.allocation = SlurmAllocation(4, ['--partition=foo'])
+
+        # Monkey patch the allocation to simulate salloc and squeue
+        self.allocation._submit_allocation = lambda: 1234
+        self.allocation._allocated_nodes = lambda: ['nid001', 'nid002',
+                                                    'nid003', 'nid004']
+        self.released = []
+        self.allocation.release = self.release
+
+    def release(self):
+        self.released.append(self.allocation.jobid)
+
+    def test_acquire(self):
+        self.allocation.acquire()
+        assert 1234 == self.allocation.jobid
+        assert 4 == self.allocation.num_free_nodes
+
+    def test_acquire_nodes_failure(self):
+        def _allocated_nodes():
+            raise JobError('squeue failed')
+
+        self.allocation._allocated_nodes = _allocated_nodes
+        with pytest.raises(JobError):
+            self.allocation.acquire()
+
+        # The allocation must not be left behind
+        assert [1234] == self.released
+
+    def test_revoke(self):
+        # The request is withdrawn before salloc is ever run
+        allocation = SlurmAllocation(4, ['--partition=foo'])
+        allocation.revoke()
+        with pytest.raises(JobError):
+            allocation.acquire()
+
+        assert allocation.jobid is None
+
+    def test_allocate(self):
+        self.allocation.acquire()
+        assert ['nid001', 'nid002'] == self.allocation.allocate(2)
+        assert ['nid003'] == self.allocation.allocate(1)
+        assert self.allocation.allocate(2) is None
+        assert 1 == self.allocation.num_free_nodes
+
+        # Released nodes are handed out in allocation order
+        self.allocation.deallocate(['nid001', 'nid002'])
+        assert ['nid001', 'nid002', 'nid004'] == self.allocation.allocate(3)
+        assert 0 == self.allocation.num_free_nodes
+
+
+class TestAdaptivePollInterval(unittest.TestCase):
+    def setUp(self):
+        self.job = Job.create(getscheduler('slurm')(),
+                              getlauncher('local')(), 'testjob')
+        self.poll_interval = AdaptivePollInterval(self.job, min_interval=1,
+                                                  max_interval=60)
+
+    def set_elapsed(self, seconds, started=True):
+        t_submit = time.time() - seconds
+        self.poll_interval._t_submit = t_submit
+        if started:
+            self.poll_interval._t_start = t_submit
+
+    def test_unknown_runtime(self):
+        self.set_elapsed(0)
+        assert 1 == self.poll_interval(True)
+        self.set_elapsed(100)
+        assert 25 <= self.poll_interval(True) < 26
+        self.set_elapsed(1000)
+        assert 60 == self.poll_interval(True)
+
+    def test_default_max_interval(self):
+        # Finished jobs are noticed within a few seconds by default
+        poll_interval = AdaptivePollInterval(self.job, min_interval=1)
+        poll_interval._t_submit = poll_interval._t_start = time.time() - 1000
+        assert 5 == poll_interval(True)
+
+    def test_time_limit(self):
+        self.job.time_limit = '10m'
+        self.set_elapsed(590)
+        assert 9 < self.poll_interval(True) <= 10
+
+    def test_expected_runtime(self):
+        self.job.expected_runtime = 100
+        self.set_elapsed(10)
+        assert 44 < self.poll_interval(True) <= 45
+        self.set_elapsed(99)
+        assert 1 == self.poll_interval(True)
+
+        # The job takes longer than expected
+        self.set_elapsed(110)
+        assert 5 <= self.poll_interval(True) < 6
+
+    def test_pending(self):
+        self.job.expected_runtime = 10
+        self.set_elapsed(1000, started=False)
+        assert 5 == self.poll_interval(False)
+
+        # The job starts running now
+        assert 4 < self.poll_interval(True) <= 5
+        assert self.poll_interval._t_start is not None
+
+    def test_slurm_started(self):
+        assert self.job.scheduler.started(self.job) is None
+        self.job.state = 'PENDING'
+        assert not self.job.scheduler.started(self.job)
+        self.job.state = 'RUNNING'
+        assert self.job.scheduler.started(self.job)
+
+
+class TestJobSubmissionPool(unittest.TestCase):
+    def create_job(self, name):
+        job = Job.create(getscheduler('slurm')(), getlauncher('local')(),
+                         name=name, workdir=self.workdir)
+        job.scheduler._submit_script = self.submit_script
+        job.defer_submission(self.pool)
+        return job
+
+    def submit_script(self, script_filename, cwd=None):
+        self.release.wait(10)
+        if script_filename == 'bad.sh':
+            raise JobError('sbatch failed')
+
+        self.submitted.append((script_filename, cwd))
+        return 100 + len(self.submitted)
+
+    def setUp(self):
+        self.workdir = os.path.abspath(tempfile.mkdtemp(dir='unittests'))
+        self.pool = JobSubmissionPool(max_workers=2)
+        self.submitted = []
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+        self.pool.shutdown()
+        os_ext.rmtree(self.workdir)
+
+    def test_submit(self):
+        jobs = [self.create_job('job%s' % i) for i in range(3)]
+        with os_ext.change_dir(self.workdir):
+            for job in jobs:
+                job.submit()
+
+        # Submission must not block the caller
+        assert 3 == self.pool.num_pending
+        assert all(self.pool.is_pending(j) for j in jobs)
+        assert all(j.jobid is None for j in jobs)
+        assert [] == self.pool.completed()
+
+        self.release.set()
+        completed = self.pool.completed(wait=True)
+        assert 0 == self.pool.num_pending
+        assert set(jobs) == {job for job, _ in completed}
+        assert all(exc is None for _, exc in completed)
+        assert {101, 102, 103} == {j.jobid for j in jobs}
+        assert all(cwd == self.workdir for _, cwd in self.submitted)
+        assert all(j.submit_dir == self.workdir for j in jobs)
+
+    def test_submit_error(self):
+        job = self.create_job('bad')
+        job.submit()
+        self.release.set()
+        [(failed_job, exc)] = self.pool.completed(wait=True)
+        assert failed_job is job
+        assert isinstance(exc, JobError)
+        assert job.jobid is None
+
+
 class TestSlurmNode(unittest.TestCase):
     def setUp(self):
         allocated_node_description = (
@@ -963,3 +1437,492 @@ class TestSlurmNode(unittest.TestCase):
         assert not self.allocated_node.is_down()
         assert not self.idle_node.is_down()
         assert self.no_partition_node.is_down()
+
+
+class TestNodeInventory(unittest.TestCase):
+    def setUp(self):
+        self.inventory = _NodeInventory()
+        self.num_queries = 0
+        self.inventory._query_nodes = self.query_nodes
+
+    def query_nodes(self):
+        self.num_queries += 1
+        return ['NodeName=nid00001 ActiveFeatures=f1,f2 '
+                'State=IDLE Partitions=p1,p2',
+                'NodeName=nid00002 ActiveFeatures=f2 '
+                'State=ALLOCATED Partitions=p1',
+                'NodeName=nid00003 ActiveFeatures=f1 '
+                'State=IDLE+DRAIN Partitions=p2',
+                'Node invalid_node not found']
+
+    def names(self, nodes):
+        return {n.name for n in nodes}
+
+    def test_nodes(self):
+        assert ({'nid00001', 'nid00002', 'nid00003'} ==
+                self.names(self.inventory.nodes()))
+
+    def test_nodes_cached(self):
+        self.inventory.nodes()
+        self.inventory.select(partitions={'p1'})
+        self.inventory.nodes_by_name('nid00001')
+        assert self.num_queries == 1
+
+        self.inventory.invalidate()
+        self.inventory.nodes()
+        assert self.num_queries == 2
+
+    def test_current_nodes_by_name(self):
+        self.inventory.nodes()
+        self.inventory._query_nodes_by_name = lambda nodespec: [
+            'NodeName=nid00003 ActiveFeatures=f1 State=IDLE Partitions=p2'
+        ]
+
+        # The current state is retrieved without touching the cache
+        nodes = self.inventory.current_nodes_by_name('nid00003')
+        assert {'nid00003'} == self.names(nodes)
+        assert not any(n.is_down() for n in nodes)
+        assert all(n.is_down()
+                   for n in self.inventory.nodes_by_name('nid00003'))
+        assert self.num_queries == 1
+
+    def test_nodes_expired(self):
+        self.inventory.ttl = 0
+        self.inventory.nodes()
+        self.inventory.nodes()
+        assert self.num_queries == 2
+
+    def test_shared_inventory(self):
+        sched_a = getscheduler('slurm')()
+        sched_b = getscheduler('slurm')()
+        assert sched_a._node_inventory is sched_b._node_inventory
+
+    def test_select(self):
+        assert ({'nid00001', 'nid00002'} ==
+                self.names(self.inventory.select(partitions={'p1'})))
+        assert ({'nid00001'} ==
+                self.names(self.inventory.select(partitions={'p1', 'p2'})))
+        assert ({'nid00001', 'nid00003'} ==
+                self.names(self.inventory.select(features={'f1'})))
+        assert ({'nid00003'} ==
+                self.names(self.inventory.select(partitions={'p2'},
+                                                 states={'DRAIN'})))
+        assert set() == self.inventory.select(partitions={'foo'})
+
+    def test_nodes_by_name(self):
+        assert {'nid00001'} == self.names(
+            self.inventory.nodes_by_name('nid0000[1,9]'))
+
+    def test_nodes_by_name_invalid(self):
+        with pytest.raises(JobError):
+            self.inventory.nodes_by_name('nid0000[1')
+
+    def test_reservation_nodes(self):
+        self.inventory._query_reservation = lambda res: 'nid0000[2-3]'
+        assert {'nid00002', 'nid00003'} == self.names(
+            self.inventory.reservation_nodes('dummy'))
+
+    def test_default_partition(self):
+        self.inventory._query_partitions = lambda: (
+            'PartitionName=p1 Default=NO State=UP\n'
+            'PartitionName=p2 Default=YES State=UP\n'
+        )
+        assert 'p2' == self.inventory.default_partition()
+
+
+class _SlurmRestdHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.server.num_connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self.server.requests.append(('GET', self.path, None))
+        resource = self.path.split('/', 3)[3]
+        if resource.startswith('jobs'):
+            query = urllib.parse.parse_qs(urllib.parse.urlsplit(
+                resource).query)
+            self.server.clock += 1
+            jobs = []
+            for jobid, info in self.server.jobs.items():
+                # Record the time of the latest change of each job
+                data = json.dumps(info, sort_keys=True)
+                last_data, changed = self.server.changes.get(jobid, (None, 0))
+                if data != last_data:
+                    changed = self.server.clock
+                    self.server.changes[jobid] = (data, changed)
+
+                if ('update_time' not in query or
+                    changed > int(query['update_time'][0])):
+                    jobs.append(info)
+
+            self.reply(200, {'jobs': jobs, 'last_update': self.server.clock,
+                             'errors': []})
+        elif resource == 'nodes':
+            self.reply(200, {'nodes': self.server.nodes, 'errors': []})
+        elif resource.startswith('node/'):
+            name = resource.split('/')[1]
+            self.reply(200, {'nodes': [n for n in self.server.nodes
+                                       if n['name'] == name],
+                             'errors': []})
+        elif resource == 'partitions':
+            self.reply(200, {'partitions': [
+                {'name': 'p1', 'flags': []},
+                {'name': 'p2', 'flags': ['default']}
+            ], 'errors': []})
+        elif resource == 'reservation/res1':
+            self.reply(200, {'reservations': [{'name': 'res1',
+                                               'node_list': 'nid0000[2-3]'}],
+                             'errors': []})
+        else:
+            self.reply(404, {'errors': [{'error': 'not found'}]})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(
+            int(self.headers['Content-Length'])).decode())
+        self.server.requests.append(('POST', self.path, body))
+        if self.server.drop_posts:
+            # Drop the connection without replying
+            self.close_connection = True
+            return
+
+        if body['job'].get('partition') == 'invalid':
+            self.reply(500, {'errors': [{'error': 'invalid partition'}]})
+            return
+
+        jobid = 100 + len(self.server.jobs)
+        self.server.jobs[jobid] = {'job_id': jobid, 'job_state': 'PENDING',
+                                   'exit_code': 0, 'nodes': '',
+                                   'state_reason': 'Priority'}
+        self.reply(200, {'job_id': jobid, 'errors': []})
+
+    def do_DELETE(self):
+        self.server.requests.append(('DELETE', self.path, None))
+        jobid = int(self.path.rsplit('/', 1)[1])
+        self.server.jobs[jobid]['job_state'] = 'CANCELLED'
+        self.reply(200, {'errors': []})
+
+
+class _SlurmRestdServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    '''A stand-in for slurmrestd keeping its jobs in memory.'''
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _SlurmRestdHandler)
+        self.num_connections = 0
+        self.requests = []
+        self.jobs = {}
+        self.drop_posts = False
+        self.clock = 0
+        self.changes = {}
+        self.nodes = [
+            {'name': 'nid00001', 'partitions': ['p1', 'p2'],
+             'active_features': 'f1,f2', 'state': 'idle',
+             'state_flags': []},
+            {'name': 'nid00002', 'partitions': ['p1'],
+             'active_features': 'f2', 'state': 'allocated',
+             'state_flags': []},
+            {'name': 'nid00003', 'partitions': ['p2'],
+             'active_features': 'f1', 'state': 'idle',
+             'state_flags': ['DRAIN']}
+        ]
+
+    @property
+    def url(self):
+        return 'http://%s:%s' % self.server_address
+
+
+class _UnixSlurmRestdServer(socketserver.ThreadingMixIn,
+                            socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path):
+        super().__init__(path, _UnixSlurmRestdHandler)
+        self.num_connections = 0
+        self.requests = []
+        self.jobs = {}
+        self.drop_posts = False
+        self.clock = 0
+        self.changes = {}
+        self.nodes = []
+
+
+class _UnixSlurmRestdHandler(_SlurmRestdHandler):
+    def address_string(self):
+        return 'localhost'
+
+
+class TestSlurmRestJob(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(dir='unittests')
+        self.server = _SlurmRestdServer()
+        threading.Thread(target=self.server.serve_forever,
+                         daemon=True).start()
+        self.client = SlurmRestClient(self.server.url, token='secret',
+                                      user='reframe')
+        self.job_table = _RestJobTable(self.client)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+        os_ext.rmtree(self.workdir)
+
+    def create_job(self, name):
+        scheduler = getscheduler('slurmrest')()
+        scheduler._client = self.client
+        scheduler._job_table = self.job_table
+        scheduler._node_inventory = _RestNodeInventory(self.client)
+        job = Job.create(scheduler, getlauncher('local')(),
+                         name=name, workdir=self.workdir,
+                         script_filename=os.path.join(self.workdir,
+                                                      name + '.sh'))
+        job.time_limit = '1h2m3s'
+        return job
+
+    def submit(self, job):
+        job.prepare(['hostname'], [])
+        job.submit()
+
+    def test_submit(self):
+        job = self.create_job('job1')
+        job.num_tasks = 4
+        job.num_tasks_per_node = 2
+        job.options = ['--gres=gpu:1', '--foo=bar']
+        job._sched_nodelist = 'nid0000[1-2]'
+        job._sched_partition = 'p1'
+        job._sched_exclusive_access = True
+        self.submit(job)
+        assert 100 == job.jobid
+
+        method, path, body = self.server.requests[-1]
+        assert 'POST' == method
+        assert '/slurm/v0.0.38/job/submit' == path
+        assert body['script'].startswith('#!/bin/bash')
+        properties = body['job']
+        assert 'job1' == properties['name']
+        assert 4 == properties['tasks']
+        assert 2 == properties['tasks_per_node']
+        assert 'p1' == properties['partition']
+        assert ['nid00001', 'nid00002'] == properties['required_nodes']
+        assert 63 == properties['time_limit']
+        assert 'true' == properties['exclusive']
+        assert 'gres:gpu:1' == properties['tres_per_node']
+        assert job.stdout == properties['standard_output']
+        assert os.getcwd() == properties['current_working_directory']
+        assert 'PATH' in properties['environment']
+        assert 'foo' not in properties
+
+    def test_submit_error(self):
+        job = self.create_job('job1')
+        job._sched_partition = 'invalid'
+        with pytest.raises(JobError, match='invalid partition'):
+            self.submit(job)
+
+    def test_poll(self):
+        jobs = [self.create_job('job%s' % i) for i in range(3)]
+        for job in jobs:
+            self.submit(job)
+
+        self.server.jobs[100].update(job_state='COMPLETED',
+                                     nodes='nid0000[1-2]',
+                                     start_time=10, end_time=20)
+        self.server.jobs[101].update(job_state='RUNNING', nodes='nid00003')
+        self.server.jobs[102].update(job_state='FAILED', exit_code=2,
+                                     start_time=10, end_time=30)
+
+        # A job of another user
+        self.server.jobs[1] = {'job_id': 1, 'job_state': 'RUNNING',
+                               'exit_code': 0, 'nodes': 'nid00001'}
+        self.server.requests.clear()
+        jobs[0].scheduler.poll(*jobs)
+
+        # All jobs are queried at once and only our own jobs are kept
+        assert [('GET', '/slurm/v0.0.38/jobs', None)] == self.server.requests
+        assert {100, 101, 102} == set(self.job_table._jobs)
+        assert [True, False, True] == [j.finished() for j in jobs]
+        assert 'COMPLETED' == jobs[0].state
+        assert 0 == jobs[0].exitcode
+        assert ['nid00001', 'nid00002'] == jobs[0].nodelist
+        assert 20 == jobs[0].completion_time
+        assert 10 == jobs[0].scheduler.start_time(jobs[0])
+        assert 'RUNNING' == jobs[1].state
+        assert jobs[1].completion_time is None
+        assert 2 == jobs[2].exitcode
+
+        # Only the jobs changed since the previous poll are transferred
+        self.server.jobs[101].update(job_state='COMPLETED', end_time=40)
+        self.server.requests.clear()
+        jobs[1].scheduler.poll(jobs[1])
+        assert [('GET', '/slurm/v0.0.38/jobs?update_time=%s' %
+                 (self.server.clock - 1), None)] == self.server.requests
+        assert jobs[1].finished()
+        assert 'COMPLETED' == jobs[1].state
+        assert 'COMPLETED' == self.job_table._jobs[100][100]['job_state']
+
+    def test_poll_purged_jobs(self):
+        jobs = [self.create_job('job%s' % i) for i in range(3)]
+        for job in jobs:
+            self.submit(job)
+
+        # Jobs purged by slurmctld are looked up in the accounting
+        for jobid in (100, 101, 102):
+            del self.server.jobs[jobid]
+
+        jobs[0].scheduler._query_accounting = lambda jobids: (
+            'JobID|State|ExitCode|NodeList\n'
+            '100|FAILED|3:0|nid00001\n'
+            '100.batch|FAILED|3:0|nid00001\n'
+            '101|CANCELLED by 1000|0:0|nid0000[2-3]\n'
+        )
+        jobs[0].scheduler.poll(*jobs)
+        assert [True, True, True] == [j.finished() for j in jobs]
+        assert 'FAILED' == jobs[0].state
+        assert 3 == jobs[0].exitcode
+        assert ['nid00001'] == jobs[0].nodelist
+        assert 'CANCELLED' == jobs[1].state
+        assert ['nid00002', 'nid00003'] == jobs[1].nodelist
+
+        # Jobs missing from the accounting, too, are assumed completed
+        assert 'COMPLETED' == jobs[2].state
+        assert 0 == jobs[2].exitcode
+
+    def test_poll_purged_after_update(self):
+        job = self.create_job('job1')
+        self.submit(job)
+        self.server.jobs[100]['job_state'] = 'RUNNING'
+        job.scheduler.poll(job)
+        assert 'RUNNING' == job.state
+
+        # Purged jobs are not reported as changed; they are noticed by the
+        # next query of all the jobs
+        del self.server.jobs[100]
+        job.scheduler._query_accounting = lambda jobids: ''
+        job.scheduler.poll(job)
+        assert 'RUNNING' == job.state
+
+        self.job_table.full_query_interval = 0
+        job.scheduler.poll(job)
+        assert 'COMPLETED' == job.state
+
+    def test_blocked_job(self):
+        job = self.create_job('job1')
+        self.submit(job)
+        self.server.jobs[100]['state_reason'] = 'PartitionDown'
+        job.scheduler._update_state_count = -1
+        with pytest.raises(JobBlockedError):
+            job.finished()
+
+        assert ('DELETE', '/slurm/v0.0.38/job/100',
+                None) == self.server.requests[-1]
+
+    def test_blocked_job_node_back(self):
+        job = self.create_job('job1')
+        self.submit(job)
+
+        # The cached node information still shows the node as drained
+        inventory = job.scheduler._node_inventory
+        assert any(n.is_down() for n in inventory.nodes_by_name('nid00003'))
+        self.server.nodes[2]['state_flags'] = []
+        self.server.jobs[100]['state_reason'] = ('ReqNodeNotAvail, '
+                                                 'UnavailableNodes:nid00003')
+        job.scheduler._update_state_count = -1
+        assert not job.finished()
+        assert ('GET', '/slurm/v0.0.38/node/nid00003',
+                None) == self.server.requests[-1]
+
+        # The node is down indeed
+        self.server.nodes[2]['state_flags'] = ['DRAIN']
+        job.scheduler._update_state_count = -1
+        with pytest.raises(JobBlockedError):
+            job.finished()
+
+    def test_cancel(self):
+        job = self.create_job('job1')
+        self.submit(job)
+        job.cancel()
+        assert ('DELETE', '/slurm/v0.0.38/job/100',
+                None) == self.server.requests[-1]
+        assert job.finished()
+        assert 'CANCELLED' == job.state
+
+    def test_connection_reuse(self):
+        for i in range(3):
+            self.submit(self.create_job('job%s' % i))
+
+        assert 1 == self.client.num_connections
+        assert 1 == self.server.num_connections
+
+    def test_stale_connection(self):
+        self.client.jobs()
+
+        # Close the connections of the server behind the client's back
+        for conn in self.client._idle:
+            conn.sock.shutdown(socket.SHUT_RDWR)
+
+        assert ([], 2) == self.client.jobs()
+        assert 2 == self.client.num_connections
+
+    def test_submission_not_retried(self):
+        self.client.nodes()
+        self.server.drop_posts = True
+        with pytest.raises(JobError):
+            self.submit(self.create_job('job1'))
+
+        # The submission must not be sent again over a new connection
+        assert 1 == len([r for r in self.server.requests if r[0] == 'POST'])
+
+    def test_dropped_idle_connection(self):
+        self.client.nodes()
+
+        # The server drops the idle connection before the submission
+        for conn in self.client._idle:
+            conn.sock.shutdown(socket.SHUT_RDWR)
+
+        self.submit(self.create_job('job1'))
+        assert 2 == self.client.num_connections
+
+    def test_nodes(self):
+        inventory = _RestNodeInventory(self.client)
+        nodes = {n.name: n for n in inventory.nodes()}
+        assert {'nid00001', 'nid00002', 'nid00003'} == set(nodes)
+        assert {'p1', 'p2'} == nodes['nid00001'].partitions
+        assert {'f1', 'f2'} == nodes['nid00001'].active_features
+        assert nodes['nid00001'].is_available()
+        assert {'IDLE', 'DRAIN'} == nodes['nid00003'].states
+        assert nodes['nid00003'].is_down()
+        assert 'p2' == inventory.default_partition()
+        assert {'nid00002', 'nid00003'} == {
+            n.name for n in inventory.reservation_nodes('res1')
+        }
+
+    def test_unix_socket(self):
+        sockname = os.path.join(os.path.abspath(self.workdir), 'slurmrestd')
+        server = _UnixSlurmRestdServer(sockname)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            client = SlurmRestClient('unix://' + sockname)
+            assert [] == client.nodes()
+            assert [] == client.nodes()
+            assert 1 == server.num_connections
+            client.close()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_invalid_url(self):
+        with pytest.raises(ConfigError):
+            SlurmRestClient('ftp://localhost')
@@ -495,6 +495,35 @@ class TestMiscUtilities(unittest.TestCase):
         with pytest.raises(TypeError):
             util.toalphanum(12)
 
+    def test_expand_hostlist(self):
+        assert [] == util.expand_hostlist('')
+        assert ['nid001'] == util.expand_hostlist('nid001')
+        assert (['nid00408', 'nid00411', 'nid00412', 'nid00413'] ==
+                util.expand_hostlist('nid00[408,411-413]'))
+        assert (['c0n08', 'c0n09', 'c0n10', 'c1n08', 'c1n09', 'c1n10',
+                 'login'] == util.expand_hostlist('c[0-1]n[08-10],login'))
+        assert ['n9', 'n10'] == util.expand_hostlist('n[9-10]')
+        for hostlist in ('nid[001', 'nid001]', 'nid[[1]]',
+                         'nid[a-b]', 'nid[3-1]', 'nid[1-]'):
+            with pytest.raises(ValueError):
+                util.expand_hostlist(hostlist)
+
+    def test_compress_hostlist(self):
+        assert '' == util.compress_hostlist([])
+        assert 'nid001' == util.compress_hostlist(['nid001'])
+        assert ('login,nid[00408,00411-00413]' ==
+                util.compress_hostlist(['nid00413', 'login', 'nid00411',
+                                        'nid00412', 'nid00408', 'nid00412']))
+        assert 'n[8-11]' == util.compress_hostlist(['n8', 'n9', 'n10',
+                                                    'n11'])
+        assert 'n[08-10]' == util.compress_hostlist(['n08', 'n09', 'n10'])
+        assert 'n1,n[01-02]' == util.compress_hostlist(['n1', 'n01', 'n02'])
+
+    def test_hostlist_roundtrip(self):
+        hostnames = ['nid%05d' % i for i in range(0, 5000, 3)]
+        assert hostnames == util.expand_hostlist(
+            util.compress_hostlist(hostnames))
+
 
 class TestScopedDict(unittest.TestCase):
     def test_construction(self):